@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+DEFAULT_ARCHIVE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ytdlp-gui", "archive.sqlite3")
+
+def categories_key(segment_types: Optional[List[str]]) -> str:
+    """Canonical form of a segment category selection, used as part of the archive key."""
+    return ','.join(sorted(set(segment_types or [])))
+
+def segments_fingerprint(segments: List[Tuple[float, float]]) -> str:
+    """Short hash of the segments that were removed from a file."""
+    normalized = sorted((round(start, 2), round(end, 2)) for start, end in segments)
+    return hashlib.sha1(json.dumps(normalized).encode('utf-8')).hexdigest()[:16]
+
+class ArchiveIndex:
+    """
+    Persistent index of processed videos keyed by (video ID, format, segment categories).
+
+    Each row records the output path, its size and mtime, the cut state ('cut' or 'uncut')
+    and a fingerprint of the removed segments, so a sync can tell new or changed entries
+    from ones that are already on disk.
+    """
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS archive (
+            video_id TEXT NOT NULL,
+            format TEXT NOT NULL,
+            categories TEXT NOT NULL,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            cut_state TEXT NOT NULL,
+            segments TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (video_id, format, categories))""")
+        self.conn.commit()
+
+    def record(self, video_id: str, format: str, categories: str, path: str, cut_state: str, segments: str):
+        """
+        Record a processed file. Does nothing if the file does not exist.
+
+        Args:
+            video_id (str): The YouTube video ID.
+            format (str): 'mp3' or 'mp4'.
+            categories (str): Result of categories_key() for the job.
+            path (str): Path of the output file.
+            cut_state (str): 'cut' if segments were removed, 'uncut' otherwise.
+            segments (str): Result of segments_fingerprint() for the removed segments.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO archive VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                              (video_id, format, categories, os.path.abspath(path), stat.st_size, stat.st_mtime, cut_state, segments, time.time()))
+            self.conn.commit()
+
+    def get(self, video_id: str, format: str, categories: str) -> Optional[dict]:
+        with self.lock:
+            self.conn.row_factory = sqlite3.Row
+            row = self.conn.execute("SELECT * FROM archive WHERE video_id = ? AND format = ? AND categories = ?",
+                                    (video_id, format, categories)).fetchone()
+            self.conn.row_factory = None
+        return dict(row) if row else None
+
+    def is_current(self, video_id: str, format: str, categories: str, segments: Optional[str] = None) -> bool:
+        """
+        Check whether a video is already processed and unchanged on disk.
+
+        Args:
+            video_id (str): The YouTube video ID.
+            format (str): 'mp3' or 'mp4'.
+            categories (str): Result of categories_key() for the job.
+            segments (Optional[str]): Fingerprint of the segments that would be removed now;
+                                      a different fingerprint means the entry changed.
+
+        Returns:
+            bool: True if the entry can be skipped.
+        """
+        entry = self.get(video_id, format, categories)
+        if entry is None or (segments is not None and entry['segments'] != segments):
+            return False
+        try:
+            stat = os.stat(entry['path'])
+        except OSError:
+            return False
+        return stat.st_size == entry['size']
+
+    def reconcile(self) -> int:
+        """
+        Drop rows whose file is gone or has a different size, and refresh changed mtimes.
+
+        Only stat() is used, so this stays cheap for large archives.
+
+        Returns:
+            int: Number of rows removed.
+        """
+        with self.lock:
+            rows = self.conn.execute("SELECT video_id, format, categories, path, size, mtime FROM archive").fetchall()
+        stale = []
+        touched = []
+        for video_id, format, categories, path, size, mtime in rows:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stale.append((video_id, format, categories))
+                continue
+            if stat.st_size != size:
+                stale.append((video_id, format, categories))
+            elif stat.st_mtime != mtime:
+                touched.append((stat.st_mtime, video_id, format, categories))
+        with self.lock:
+            self.conn.executemany("DELETE FROM archive WHERE video_id = ? AND format = ? AND categories = ?", stale)
+            self.conn.executemany("UPDATE archive SET mtime = ? WHERE video_id = ? AND format = ? AND categories = ?", touched)
+            self.conn.commit()
+        return len(stale)
+
+_archive = None
+_archive_lock = threading.Lock()
+
+def get_archive() -> ArchiveIndex:
+    """Return the shared archive index, opening it on first use."""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = ArchiveIndex()
+        return _archive
@@ -0,0 +1,126 @@
+"""
+Startup benchmark for the GUI.
+
+Measures how long `import gui` takes with `python -X importtime`, checks that the heavy
+backends are not imported before the window shows, and times a fresh process from launch
+to the first paint of the main window. Exits with status 1 when a budget is exceeded, so it
+can run in CI:
+
+    python bench_startup.py --runs 5
+    QT_QPA_PLATFORM=offscreen python bench_startup.py
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+IMPORT_BUDGET_SECONDS = 0.25       # Cumulative import time of the gui module
+FIRST_PAINT_BUDGET_SECONDS = 1.5   # Process launch to the first paint of the window
+
+# Modules the window must not wait for; they are imported in the background after it shows
+HEAVY_MODULES = ('yt_dlp', 'requests', 'pyperclip')
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_FIRST_PAINT_SCRIPT = """
+import sys
+from PyQt5.QtCore import QEvent, QObject
+from PyQt5.QtWidgets import QApplication
+import gui
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if obj is window and event.type() == QEvent.Paint:
+            print('painted', flush=True)
+            app.exit(0)
+        return False
+
+app = QApplication(sys.argv)
+window = gui.YouTubeDownloaderGUI()
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+app.exec_()
+"""
+
+def measure_imports(module: str = 'gui') -> Dict[str, float]:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Args:
+        module (str): Module to import.
+
+    Returns:
+        Dict[str, float]: Cumulative import time in seconds of every module imported.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=REPO_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative) / 1000000
+    return times
+
+def measure_first_paint(timeout: float = 30.0) -> float:
+    """
+    Launch the GUI in a fresh process and time it until the window first paints.
+
+    Returns:
+        float: Seconds from launch to the first paint event.
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', _FIRST_PAINT_SCRIPT], cwd=REPO_DIR,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        line = process.stdout.readline()
+        elapsed = time.perf_counter() - started
+        process.wait(timeout)
+    finally:
+        if process.poll() is None:
+            process.kill()
+    if line.strip() != 'painted':
+        raise RuntimeError("The window did not paint")
+    return elapsed
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure GUI import time and time to first paint.")
+    parser.add_argument('--runs', type=int, default=3, help="Runs of each measurement; the median is reported")
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET_SECONDS)
+    parser.add_argument('--paint-budget', type=float, default=FIRST_PAINT_BUDGET_SECONDS)
+    parser.add_argument('--top', type=int, default=10, help="Slowest imports to list")
+    parser.add_argument('--no-paint', action='store_true', help="Skip the first-paint measurement")
+    args = parser.parse_args(argv)
+
+    failed = False
+    runs = [measure_imports('gui') for _ in range(args.runs)]
+    import_seconds = statistics.median(times['gui'] for times in runs)
+    print(f"import gui: {import_seconds * 1000:.0f}ms (budget {args.import_budget * 1000:.0f}ms)")
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1], reverse=True)
+    for name, seconds in [item for item in slowest if item[0] != 'gui'][:args.top]:
+        print(f"  {seconds * 1000:7.1f}ms  {name}")
+    if import_seconds > args.import_budget:
+        print("FAIL: import time over budget")
+        failed = True
+    heavy = sorted({name.split('.')[0] for name in runs[-1]} & set(HEAVY_MODULES))
+    if heavy:
+        print(f"FAIL: imported before the window shows: {', '.join(heavy)}")
+        failed = True
+
+    if not args.no_paint:
+        paint_seconds = statistics.median(measure_first_paint() for _ in range(args.runs))
+        print(f"first paint: {paint_seconds * 1000:.0f}ms (budget {args.paint_budget * 1000:.0f}ms)")
+        if paint_seconds > args.paint_budget:
+            print("FAIL: time to first paint over budget")
+            failed = True
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
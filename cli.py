@@ -0,0 +1,320 @@
+"""
+Headless entry point: runs the download pipeline without the GUI.
+
+URLs come from the command line, an input file (one per line, '-' for stdin), or a local
+HTTP endpoint in daemon mode. Progress, results and per-job timings are written to stdout as
+JSON lines; messages printed by the pipeline go to stderr. Per-stage totals are served as
+Prometheus metrics at GET /metrics in daemon mode, or written to --metrics-file.
+
+    python cli.py URL [URL ...] --format both --jobs 4
+    python cli.py --input-file urls.txt --output-dir /srv/media
+    python cli.py --serve 127.0.0.1:8765
+    curl -d '{"url": "https://youtu.be/..."}' http://127.0.0.1:8765/jobs
+"""
+import argparse
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, TextIO
+from progress import ProgressEvent, ProgressThrottle
+from tracing import get_tracer, job_context, job_summary
+
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.expanduser("~"), "Downloads", "YouTube")
+DEFAULT_SERVE_PORT = 8765
+
+_PLAYLIST_RE = re.compile(r'[?&]list=([^&]+)')
+
+class JsonLines:
+    """Thread-safe writer of one JSON object per line."""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def write(self, event: str, **fields):
+        record = {'event': event, 'time': round(time.time(), 3), **fields}
+        line = json.dumps(record, default=str)
+        with self.lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+class CliJob:
+    def __init__(self, job_id: int, url: str, options: dict):
+        self.job_id = job_id
+        self.url = url
+        self.options = options
+        self.status = 'queued'
+        self.result = None
+        self.queued_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # First and last progress event of each stage, for the per-stage timings
+        self.stage_times: Dict[str, List[float]] = {}
+        self.percent: Optional[float] = None
+
+    def timings(self) -> dict:
+        timings = {'wait': round((self.started_at or self.queued_at) - self.queued_at, 3)}
+        if self.started_at is not None:
+            timings['wall'] = round((self.finished_at or time.time()) - self.started_at, 3)
+        for stage, (first, last) in self.stage_times.items():
+            timings[stage] = round(last - first, 3)
+        return timings
+
+    def to_dict(self) -> dict:
+        return {'job': self.job_id, 'url': self.url, 'status': self.status, 'percent': self.percent,
+                'result': self.result, 'timings': self.timings()}
+
+class JobRunner:
+    """
+    Runs URLs through process_video / process_playlist with bounded concurrency.
+
+    Args:
+        options (dict): Default pipeline options of every job.
+        jobs (int): Jobs run at the same time.
+        out (JsonLines): Where events are written.
+        progress_rate (float): Maximum progress events per second per job.
+        metrics_file (Optional[str]): File rewritten with the Prometheus metrics after each job.
+    """
+
+    def __init__(self, options: dict, jobs: int, out: JsonLines, progress_rate: float = 2.0, metrics_file: Optional[str] = None):
+        self.options = options
+        self.metrics_file = metrics_file
+        self.out = out
+        self.progress_rate = progress_rate
+        self.executor = ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="cli-job")
+        self.counter = itertools.count(1)
+        self.lock = threading.Lock()
+        self.jobs: Dict[int, CliJob] = {}
+        self.futures = []
+
+    def submit(self, url: str, overrides: Optional[dict] = None) -> CliJob:
+        options = dict(self.options, **(overrides or {}))
+        with self.lock:
+            job = CliJob(next(self.counter), url, options)
+            self.jobs[job.job_id] = job
+        self.out.write('queued', job=job.job_id, url=url, format=options['format'])
+        self.futures.append(self.executor.submit(self._run, job))
+        return job
+
+    def wait(self) -> bool:
+        """Wait for every submitted job. Returns True if all of them succeeded."""
+        for future in list(self.futures):
+            future.result()
+        return all(job.status == 'done' for job in self.jobs.values())
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+    def _run(self, job: CliJob):
+        import main as pipeline
+        job.status = 'running'
+        job.started_at = time.time()
+        self.out.write('started', job=job.job_id, url=job.url)
+        throttle = ProgressThrottle(lambda event: self._progress(job, event), self.progress_rate)
+
+        def progress_callback(message):
+            if isinstance(message, ProgressEvent):
+                times = job.stage_times.setdefault(message.stage, [time.time(), time.time()])
+                times[1] = time.time()
+                throttle(message)
+            else:
+                self.out.write('log', job=job.job_id, message=str(message))
+
+        options = job.options
+        trace_job = f"cli-{job.job_id}"
+        try:
+            playlist = _PLAYLIST_RE.search(job.url) is not None
+            with job_context(trace_job):
+                if playlist:
+                    results, stats = pipeline.process_playlist(job.url, options['output_path'], options['format'], options['use_sponsorblock'], options['segment_types'],
+                                                               progress_callback, concurrency=options['playlist_concurrency'], sync=options['sync'],
+                                                               encode_workers=options['encode_workers'], mp3_output_path=options['mp3_output_path'])
+                else:
+                    result = pipeline.process_video(job.url, options['output_path'], options['format'], options['use_sponsorblock'], options['segment_types'],
+                                                    progress_callback, options['download_sections'], encode_workers=options['encode_workers'],
+                                                    mp3_output_path=options['mp3_output_path'])
+            if playlist:
+                job.result = results
+                job.status = 'done'
+                extra = {'throughput': {stage: stats[stage] for stage in ('download', 'cut') if stage in stats}}
+            else:
+                job.result = result
+                job.status = 'done' if result else 'failed'
+                extra = {}
+        except Exception as e:
+            job.status = 'failed'
+            extra = {'error': f"{type(e).__name__}: {e}"}
+        job.finished_at = time.time()
+        # Where the job's time went, by stage, from the tracing spans
+        spans = [span.to_dict() for span in get_tracer().job_spans(trace_job)]
+        self.out.write('finished', job=job.job_id, url=job.url, status=job.status, result=job.result, timings=job.timings(),
+                       summary=job_summary(trace_job), spans=spans, **extra)
+        if self.metrics_file:
+            try:
+                get_tracer().write_prometheus(self.metrics_file)
+            except OSError as e:
+                print(f"Unable to write metrics to {self.metrics_file}: {e}")
+
+    def _progress(self, job: CliJob, event: ProgressEvent):
+        job.percent = event.percent
+        self.out.write('progress', job=job.job_id, stage=event.stage, label=event.label or None,
+                       percent=None if event.percent is None else round(event.percent, 1),
+                       done=event.done, total=event.total, speed=event.speed,
+                       eta=None if event.eta is None else round(event.eta, 1))
+
+def _make_handler(runner: JobRunner):
+    class JobHandler(BaseHTTPRequestHandler):
+        """
+        POST /jobs with {"url": ...} or {"urls": [...]} and optional options; GET /jobs, /jobs/<id> or /metrics.
+
+        output_path and mp3_output_path in a request must lie inside the daemon's output folders.
+        """
+
+        def do_POST(self):
+            if self.path.rstrip('/') != '/jobs':
+                return self._reply(404, {'error': 'not found'})
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+            except ValueError:
+                return self._reply(400, {'error': 'invalid JSON'})
+            urls = body.get('urls') or ([body['url']] if body.get('url') else [])
+            if not urls:
+                return self._reply(400, {'error': 'url or urls required'})
+            overrides = {key: body[key] for key in ('format', 'use_sponsorblock', 'segment_types') if key in body}
+            for key in ('output_path', 'mp3_output_path'):
+                if key in body:
+                    # Clients may pick a folder, but only inside the one the daemon was started with
+                    path = _output_subdir(runner.options[key], body[key])
+                    if path is None:
+                        return self._reply(400, {'error': f"{key} must be inside {runner.options[key]}"})
+                    overrides[key] = path
+            jobs = [runner.submit(url, overrides) for url in urls]
+            self._reply(202, {'jobs': [job.job_id for job in jobs]})
+
+        def do_GET(self):
+            parts = self.path.strip('/').split('/')
+            if parts == ['metrics']:
+                return self._reply_text(200, get_tracer().prometheus_text())
+            if parts == ['jobs']:
+                with runner.lock:
+                    jobs = list(runner.jobs.values())
+                return self._reply(200, {'jobs': [job.to_dict() for job in jobs]})
+            if len(parts) == 2 and parts[0] == 'jobs' and parts[1].isdigit():
+                job = runner.jobs.get(int(parts[1]))
+                if job is not None:
+                    return self._reply(200, job.to_dict())
+            self._reply(404, {'error': 'not found'})
+
+        def _reply(self, status: int, payload: dict):
+            data = json.dumps(payload, default=str).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _reply_text(self, status: int, text: str):
+            data = text.encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            # Requests are logged to stderr, away from the JSON lines on stdout
+            sys.stderr.write(f"{self.address_string()} {format % args}\n")
+
+    return JobHandler
+
+def _output_subdir(base: str, path: str) -> Optional[str]:
+    """Resolve a path requested over HTTP against an output folder; None if it lies outside of it."""
+    base = os.path.realpath(base)
+    resolved = os.path.realpath(os.path.join(base, str(path)))
+    return resolved if os.path.commonpath([base, resolved]) == base else None
+
+def read_urls(path: str) -> List[str]:
+    """Read URLs from a file, one per line; blank lines and '#' comments are skipped."""
+    stream = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        return [line.strip() for line in stream if line.strip() and not line.lstrip().startswith('#')]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def parse_address(value: str):
+    host, _, port = value.rpartition(':')
+    return host or '127.0.0.1', int(port or DEFAULT_SERVE_PORT)
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Download YouTube videos and playlists without the GUI, with SponsorBlock segments cut out.")
+    parser.add_argument('urls', nargs='*', help="Video or playlist URLs")
+    parser.add_argument('-i', '--input-file', help="File with one URL per line, '-' for stdin")
+    parser.add_argument('--serve', metavar='[HOST:]PORT', help=f"Accept jobs over HTTP (POST /jobs) instead of exiting when done; default port {DEFAULT_SERVE_PORT}")
+    parser.add_argument('-f', '--format', choices=['mp4', 'mp3', 'both'], default='mp4')
+    parser.add_argument('-o', '--output-dir', default=DEFAULT_OUTPUT_DIR, help="Output folder (MP4s for 'both')")
+    parser.add_argument('--mp3-output-dir', help="Output folder of the MP3s with --format both")
+    parser.add_argument('-j', '--jobs', type=int, default=2, help="Jobs run at the same time")
+    parser.add_argument('--playlist-concurrency', type=int, default=3, help="Videos of a playlist downloaded at the same time")
+    parser.add_argument('--encode-workers', type=int, help="ffmpeg processes per re-encode")
+    parser.add_argument('--no-sponsorblock', action='store_true', help="Do not cut SponsorBlock segments")
+    parser.add_argument('--categories', help="Comma-separated SponsorBlock categories to cut (default: all)")
+    parser.add_argument('--sections', action='store_true', help="Download only the parts of a video that are kept")
+    parser.add_argument('--sync', action='store_true', help="Skip playlist entries already downloaded with the same segments")
+    parser.add_argument('--progress-rate', type=float, default=2.0, help="Maximum progress lines per second per job")
+    parser.add_argument('--trace-file', help="Append every stage timing span to this file as JSON lines")
+    parser.add_argument('--metrics-file', help="Rewrite this file with per-stage Prometheus metrics after each job")
+    args = parser.parse_args(argv)
+
+    urls = list(args.urls)
+    if args.input_file:
+        urls.extend(read_urls(args.input_file))
+    if not urls and not args.serve:
+        parser.error("no URLs given; pass URLs, --input-file or --serve")
+
+    # The pipeline reports with print(); keep stdout for the JSON lines
+    out = JsonLines(sys.stdout)
+    sys.stdout = sys.stderr
+
+    from sponser import ALL_SEGMENT_TYPES
+    options = {
+        'format': args.format,
+        'output_path': args.output_dir,
+        'mp3_output_path': args.mp3_output_dir or args.output_dir,
+        'use_sponsorblock': not args.no_sponsorblock,
+        'segment_types': args.categories.split(',') if args.categories else list(ALL_SEGMENT_TYPES),
+        'download_sections': args.sections,
+        'playlist_concurrency': args.playlist_concurrency,
+        'sync': args.sync,
+        'encode_workers': args.encode_workers,
+    }
+    if args.trace_file:
+        get_tracer().set_trace_file(args.trace_file)
+    runner = JobRunner(options, args.jobs, out, args.progress_rate, args.metrics_file)
+    for url in urls:
+        runner.submit(url)
+
+    if args.serve:
+        server = ThreadingHTTPServer(parse_address(args.serve), _make_handler(runner))
+        out.write('listening', address=f"{server.server_address[0]}:{server.server_address[1]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            runner.shutdown()
+        return 0
+
+    succeeded = runner.wait()
+    runner.shutdown()
+    return 0 if succeeded else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,67 +1,353 @@
-
+import bisect
+import json
+import mmap
+import os
+import shutil
 import subprocess
-from typing import List, Tuple
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from mediainfo import MediaInfo
+from progress import ProgressEvent, ProgressMessage, parse_ffmpeg_progress
+from tracing import span
 
-def cut_segments_mp3(input_file: str, output_file: str, segments_to_remove: List[Tuple[float, float]]) -> bool:
-    """
-    Cut out specific segments from an mp3 file using ffmpeg.
+# Encoders used to re-encode boundary GOPs so they match the copied stream
+SMART_CUT_ENCODERS = {
+    'h264': ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '18'],
+    'hevc': ['-c:v', 'libx265', '-preset', 'veryfast', '-crf', '20'],
+    'vp9': ['-c:v', 'libvpx-vp9', '-b:v', '0', '-crf', '24', '-row-mt', '1'],
+    'av1': ['-c:v', 'libsvtav1', '-crf', '28'],
+}
 
-    Args:
-        input_file (str): Path to the input file.
-        output_file (str): Path to save the output file.
-        segments_to_remove (List[Tuple[float, float]]): List of (start, end) timestamps to remove.
+# Intermediate container for the pieces; MPEG-TS keeps SPS/PPS in-band for h264/hevc
+SMART_CUT_CONTAINERS = {
+    'h264': 'ts',
+    'hevc': 'ts',
+    'vp9': 'mkv',
+    'av1': 'mkv',
+}
 
-    Returns:
-        bool: True if successful, False otherwise.
-    """
-    # Get the duration of the input file
+# Pixel formats the boundary encoders reproduce; other sources (e.g. 10-bit HDR) would end up
+# with GOPs of two formats in one stream, so they are re-encoded in full
+SMART_CUT_PIX_FMTS = ('yuv420p',)
+
+# Audio codecs of sources the smart cut takes; others are re-encoded in full
+SMART_CUT_AUDIO_CODECS = ('aac',)
+
+# ffprobe's h264 profile names and the libx264 profile producing the same constraints
+H264_PROFILES = {
+    'Constrained Baseline': 'baseline',
+    'Baseline': 'baseline',
+    'Main': 'main',
+    'High': 'high',
+}
+
+# Encoder for the parallel mode; every chunk uses the same settings so they concat without re-encoding
+PARALLEL_ENCODER = ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '18', '-pix_fmt', 'yuv420p']
+
+# ffmpeg processes used by the parallel mode by default
+ENCODE_WORKERS = max(1, os.cpu_count() or 1)
+
+# Shortest chunk (in seconds) the parallel mode hands to a worker; shorter ones cost more in startup than they gain
+PARALLEL_MIN_CHUNK = 10.0
+
+# Pieces shorter than this (in seconds) are not worth a separate ffmpeg call
+_EPSILON = 0.001
+
+def _get_duration(input_file: str) -> Optional[float]:
     duration_cmd = [
-        'ffprobe', 
-        '-v', 'error', 
-        '-show_entries', 'format=duration', 
-        '-of', 'default=noprint_wrappers=1:nokey=1', 
+        'ffprobe',
+        '-v', 'error',
+        '-show_entries', 'format=duration',
+        '-of', 'default=noprint_wrappers=1:nokey=1',
         input_file
     ]
     try:
-        duration = float(subprocess.check_output(duration_cmd).decode('utf-8').strip())
-    except subprocess.CalledProcessError:
+        with span('probe'):
+            return float(subprocess.check_output(duration_cmd).decode('utf-8').strip())
+    except (subprocess.CalledProcessError, ValueError):
         print(f"Error: Unable to get duration of {input_file}")
-        return False
+        return None
 
-    # Sort segments to remove and merge overlapping segments
-    segments_to_remove.sort(key=lambda x: x[0])
+def merge_segments(segments_to_remove: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """
+    Sort segments and merge the ones that overlap.
+
+    Args:
+        segments_to_remove (List[Tuple[float, float]]): List of (start, end) timestamps to remove.
+
+    Returns:
+        List[Tuple[float, float]]: Sorted, non-overlapping segments.
+    """
     merged_segments = []
-    for segment in segments_to_remove:
+    for segment in sorted(segments_to_remove, key=lambda x: x[0]):
         if not merged_segments or segment[0] > merged_segments[-1][1]:
-            merged_segments.append(segment)
+            merged_segments.append(tuple(segment))
         else:
             merged_segments[-1] = (merged_segments[-1][0], max(merged_segments[-1][1], segment[1]))
+    return merged_segments
 
-    # Calculate segments to keep
-    segments_to_keep = []
+def segments_to_keep(segments_to_remove: List[Tuple[float, float]], duration: float) -> List[Tuple[float, float]]:
+    """
+    Calculate the complement of the segments to remove.
+
+    Args:
+        segments_to_remove (List[Tuple[float, float]]): List of (start, end) timestamps to remove.
+        duration (float): Total duration of the media in seconds.
+
+    Returns:
+        List[Tuple[float, float]]: List of (start, end) timestamps to keep.
+    """
+    # Segments are clipped to the media first, so ones past the end cannot produce inverted ranges
+    clipped = [(max(0, start), min(end, duration)) for start, end in segments_to_remove]
+    keep = []
     last_end = 0
-    for start, end in merged_segments:
+    for start, end in merge_segments([(start, end) for start, end in clipped if end > start]):
+        if last_end >= duration:
+            break
         if start > last_end:
-            segments_to_keep.append((last_end, start))
+            keep.append((last_end, start))
         last_end = max(last_end, end)
     if last_end < duration:
-        segments_to_keep.append((last_end, duration))
+        keep.append((last_end, duration))
+    return keep
 
-    # Prepare ffmpeg filter complex
+def cut_duration(input_file: str, media_info: Optional[MediaInfo], segments_to_remove: List[Tuple[float, float]]) -> Optional[float]:
+    """
+    Duration to plan a cut with.
+
+    The duration from yt-dlp is rounded to whole seconds, so the last kept range would end up
+    to a second early. The file is probed unless the duration is exact or the segments cut
+    away the end of the media anyway. The probed duration is stored on media_info.
+
+    Args:
+        input_file (str): Path to the input file.
+        media_info (Optional[MediaInfo]): Metadata from the download stage.
+        segments_to_remove (List[Tuple[float, float]]): List of (start, end) timestamps to remove.
+
+    Returns:
+        Optional[float]: Duration in seconds, or None if it cannot be read.
+    """
+    duration = media_info.duration if media_info else None
+    if duration is not None:
+        merged = merge_segments(segments_to_remove)
+        if media_info.duration_exact or (merged and merged[-1][1] >= duration + 1):
+            return duration
+    probed = _get_duration(input_file)
+    if probed is None:
+        return duration
+    if media_info is not None:
+        media_info.duration = probed
+        media_info.duration_exact = True
+    return probed
+
+def removed_duration(segments_to_remove: List[Tuple[float, float]], duration: Optional[float] = None) -> float:
+    """
+    Total time the segments remove once merged and clipped to the media.
+
+    Args:
+        segments_to_remove (List[Tuple[float, float]]): List of (start, end) timestamps to remove.
+        duration (Optional[float]): Total duration of the media in seconds, if known.
+
+    Returns:
+        float: Removed time in seconds.
+    """
+    end_limit = duration if duration is not None else float('inf')
+    return sum(max(0.0, min(end, end_limit) - max(start, 0.0)) for start, end in merge_segments(segments_to_remove))
+
+def _copy_uncut(input_file: str, output_file: str) -> bool:
+    # Nothing to remove: the output is the input, no ffmpeg run needed
+    print("Segments cover no time after merging, skipping ffmpeg.")
+    try:
+        shutil.copyfile(input_file, output_file)
+        return True
+    except OSError as e:
+        print(f"Error occurred while copying {input_file}: {e}")
+        return False
+
+def _run_ffmpeg(command: List[str], on_progress: Optional[Callable[[float, Optional[float]], None]] = None) -> bool:
+    if on_progress is None:
+        try:
+            subprocess.run(command, check=True, stderr=subprocess.PIPE)
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error occurred while cutting segments: {e.stderr.decode()}")
+            return False
+
+    # Read machine-readable progress from stdout; stderr goes to a file so it cannot fill a pipe
+    command = [command[0], '-progress', 'pipe:1', '-nostats'] + command[1:]
+    with tempfile.TemporaryFile() as errors:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=errors, universal_newlines=True)
+        try:
+            state = {}
+            for line in process.stdout:
+                if parse_ffmpeg_progress(line, state) and 'seconds' in state:
+                    on_progress(state['seconds'], state.get('speed'))
+        except BaseException:
+            # E.g. the job was cancelled from the progress callback
+            process.kill()
+            process.wait()
+            raise
+        if process.wait() != 0:
+            errors.seek(0)
+            print(f"Error occurred while cutting segments: {errors.read().decode('utf-8', 'replace')}")
+            return False
+    return True
+
+def _cut_progress(progress_callback: Optional[Callable[[ProgressMessage], None]], total: Optional[float]) -> Optional[Callable[[float, Optional[float]], None]]:
+    # Turn ffmpeg's (media seconds written, speed) reports into cut-stage progress events
+    if progress_callback is None:
+        return None
+    return lambda seconds, speed: progress_callback(ProgressEvent('cut', seconds, total, speed))
+
+def audio_trim_filter(keep: List[Tuple[float, float]], stream: str = '0:a') -> str:
+    """
+    Build a filter graph that keeps the given ranges of an audio stream and joins them.
+
+    Args:
+        keep (List[Tuple[float, float]]): List of (start, end) timestamps to keep.
+        stream (str): Input stream specifier to trim.
+
+    Returns:
+        str: Filter graph producing the [outa] label.
+    """
     filter_complex = []
-    for i, (seg_start, seg_end) in enumerate(segments_to_keep):
-        filter_complex.append(f"[0:a]atrim=start={seg_start}:end={seg_end},asetpts=PTS-STARTPTS[a{i}]")
+    for i, (seg_start, seg_end) in enumerate(keep):
+        filter_complex.append(f"[{stream}]atrim=start={seg_start}:end={seg_end},asetpts=PTS-STARTPTS[a{i}]")
 
-    if len(segments_to_keep) > 1:
-        filter_complex.append(f"{''.join([f'[a{i}]' for i in range(len(segments_to_keep))])}concat=n={len(segments_to_keep)}:v=0:a=1[outa]")
+    if len(keep) > 1:
+        filter_complex.append(f"{''.join([f'[a{i}]' for i in range(len(keep))])}concat=n={len(keep)}:v=0:a=1[outa]")
     else:
         filter_complex.append(f"[a0]anull[outa]")
 
-    filter_complex_str = ';'.join(filter_complex)
+    return ';'.join(filter_complex)
+
+def write_concat_list(paths: List[str], list_file: str):
+    """
+    Write a list file for ffmpeg's concat demuxer.
+
+    Args:
+        paths (List[str]): Paths of the files to join, in order.
+        list_file (str): Path of the list file to write.
+    """
+    with open(list_file, 'w', encoding='utf-8') as f:
+        for path in paths:
+            escaped = path.replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+def extract_audio_mp3(input_file: str, output_file: str, bitrate: str = '192k', keep: Optional[List[Tuple[float, float]]] = None,
+                      progress_callback: Optional[Callable[[ProgressMessage], None]] = None) -> bool:
+    """
+    Extract the audio of a file into an mp3.
+
+    Args:
+        input_file (str): Path to the input file.
+        output_file (str): Path to save the mp3.
+        bitrate (str): Target audio bitrate.
+        keep (Optional[List[Tuple[float, float]]]): Only keep these (start, end) ranges, trimmed
+                    in the same ffmpeg run. The whole audio is kept if None.
+        progress_callback (Callable[[ProgressMessage], None], optional): Receives cut-stage progress events.
+
+    Returns:
+        bool: True if successful, False otherwise.
+    """
+    total = sum(end - start for start, end in keep) if keep is not None else None
+    command = ['ffmpeg', '-y', '-i', input_file]
+    if keep is not None:
+        command += ['-filter_complex', audio_trim_filter(keep), '-map', '[outa]']
+    else:
+        command += ['-map', '0:a:0']
+    command += ['-vn', '-c:a', 'libmp3lame', '-b:a', bitrate, output_file]
+    return _run_ffmpeg(command, _cut_progress(progress_callback, total))
+
+def cut_segments_both(input_file: str, mp4_output_file: str, mp3_output_file: str, segments_to_remove: List[Tuple[float, float]], mode: str = 'smart',
+                      media_info: Optional[MediaInfo] = None, workers: Optional[int] = None,
+                      progress_callback: Optional[Callable[[ProgressMessage], None]] = None) -> Tuple[bool, bool]:
+    """
+    Cut segments out of a video and write both the cut mp4 and the matching mp3.
+
+    The duration is read once and both outputs use the same kept ranges. The mp3 is encoded
+    straight from the source audio rather than from the cut mp4, so it is transcoded only once.
+
+    Args:
+        input_file (str): Path to the input file.
+        mp4_output_file (str): Path to save the cut mp4.
+        mp3_output_file (str): Path to save the cut mp3.
+        segments_to_remove (List[Tuple[float, float]]): List of (start, end) timestamps to remove.
+        mode (str): Cut mode of the mp4, see cut_segments_mp4.
+        media_info (Optional[MediaInfo]): Metadata from the download stage.
+        workers (Optional[int]): ffmpeg processes used by the parallel mode.
+        progress_callback (Callable[[ProgressMessage], None], optional): Receives cut-stage progress events.
+
+    Returns:
+        Tuple[bool, bool]: Whether the mp4 and the mp3 were written.
+    """
+    media_info = media_info or MediaInfo(input_file)
+    if cut_duration(input_file, media_info, segments_to_remove) is None:
+        return False, False
+
+    keep = segments_to_keep(segments_to_remove, media_info.duration)
+    mp3_success = extract_audio_mp3(input_file, mp3_output_file, keep=keep, progress_callback=progress_callback)
+    mp4_success = cut_segments_mp4(input_file, mp4_output_file, segments_to_remove, mode=mode, media_info=media_info, workers=workers,
+                                   progress_callback=progress_callback)
+    return mp4_success, mp3_success
+
+def cut_segments_mp3(input_file: str, output_file: str, segments_to_remove: List[Tuple[float, float]], mode: str = 'copy', media_info: Optional[MediaInfo] = None,
+                     progress_callback: Optional[Callable[[ProgressMessage], None]] = None) -> bool:
+    """
+    Cut out specific segments from an mp3 file.
+
+    Args:
+        input_file (str): Path to the input file.
+        output_file (str): Path to save the output file.
+        segments_to_remove (List[Tuple[float, float]]): List of (start, end) timestamps to remove.
+        mode (str): 'copy' to keep whole MP3 frames without re-encoding,
+                    'reencode' to decode and encode again through the atrim/concat filter.
+                    Copy mode falls back to 'reencode' when the file cannot be parsed.
+        media_info (Optional[MediaInfo]): Metadata from the download stage; saves the ffprobe run.
+        progress_callback (Callable[[ProgressMessage], None], optional): Receives cut-stage progress
+                    events while ffmpeg re-encodes.
+
+    Returns:
+        bool: True if successful, False otherwise.
+    """
+    duration = cut_duration(input_file, media_info, segments_to_remove) if media_info else None
+    if removed_duration(segments_to_remove, duration) <= _EPSILON:
+        return _copy_uncut(input_file, output_file)
+
+    if mode == 'copy':
+        if _copy_cut_mp3(input_file, output_file, segments_to_remove):
+            print(f"Successfully cut segments and saved to {output_file}")
+            return True
+        print("Frame copy unavailable for this file, falling back to re-encode.")
+        if os.path.exists(output_file):
+            os.remove(output_file)
+    elif mode != 'reencode':
+        print(f"Unknown cut mode: {mode}, using re-encode.")
+
+    print(f"Cut mode: reencode")
+    return _reencode_cut_mp3(input_file, output_file, segments_to_remove, duration, progress_callback)
+
+def _reencode_cut_mp3(input_file: str, output_file: str, segments_to_remove: List[Tuple[float, float]], duration: Optional[float] = None,
+                      progress_callback: Optional[Callable[[ProgressMessage], None]] = None) -> bool:
+    # Get the duration of the input file
+    if duration is None:
+        duration = _get_duration(input_file)
+    if duration is None:
+        return False
+
+    # Calculate segments to keep
+    keep = segments_to_keep(segments_to_remove, duration)
+
+    # Prepare ffmpeg filter complex
+    filter_complex_str = audio_trim_filter(keep)
 
     # Prepare ffmpeg command
     command = [
         'ffmpeg',
+        '-y',
         '-i', input_file,
         '-filter_complex', filter_complex_str,
         '-map', '[outa]',
@@ -69,15 +355,13 @@ def cut_segments_mp3(input_file: str, output_file: str, segments_to_remove: List
     ]
 
     # Execute ffmpeg command
-    try:
-        subprocess.run(command, check=True, stderr=subprocess.PIPE)
+    if _run_ffmpeg(command, _cut_progress(progress_callback, sum(end - start for start, end in keep))):
         print(f"Successfully cut segments and saved to {output_file}")
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"Error occurred while cutting segments: {e.stderr.decode()}")
-        return False
+    return False
 
-def cut_segments_mp4(input_file: str, output_file: str, segments_to_remove: List[Tuple[float, float]]) -> bool:
+def cut_segments_mp4(input_file: str, output_file: str, segments_to_remove: List[Tuple[float, float]], mode: str = 'smart', media_info: Optional[MediaInfo] = None,
+                     workers: Optional[int] = None, progress_callback: Optional[Callable[[ProgressMessage], None]] = None) -> bool:
     """
     Cut out specific segments from an mp4 file using ffmpeg.
 
@@ -85,52 +369,155 @@ def cut_segments_mp4(input_file: str, output_file: str, segments_to_remove: List
         input_file (str): Path to the input file.
         output_file (str): Path to save the output file.
         segments_to_remove (List[Tuple[float, float]]): List of (start, end) timestamps to remove.
+        mode (str): 'smart' to stream-copy whole GOPs and re-encode only the cut boundaries,
+                    'parallel' to re-encode the kept ranges in chunks on several ffmpeg processes,
+                    'reencode' to push the whole file through the trim/concat filter.
+                    Smart mode falls back to 'reencode' for sources the boundary encoders cannot
+                    match (codec, pixel format, audio codec) and to 'parallel' if it fails;
+                    'parallel' falls back to 'reencode'.
+        media_info (Optional[MediaInfo]): Metadata from the download stage; saves the ffprobe run
+                    for the duration, and a smart cut of an unsupported codec skips its stream probe.
+                    Keyframes probed by a smart cut are stored on it.
+        workers (Optional[int]): ffmpeg processes used by the parallel mode. Defaults to ENCODE_WORKERS.
+        progress_callback (Callable[[ProgressMessage], None], optional): Receives cut-stage progress
+                    events parsed from ffmpeg's -progress output.
 
     Returns:
         bool: True if successful, False otherwise.
     """
     # Get the duration of the input file
-    duration_cmd = [
-        'ffprobe', 
-        '-v', 'error', 
-        '-show_entries', 'format=duration', 
-        '-of', 'default=noprint_wrappers=1:nokey=1', 
-        input_file
-    ]
-    try:
-        duration = float(subprocess.check_output(duration_cmd).decode('utf-8').strip())
-    except subprocess.CalledProcessError:
-        print(f"Error: Unable to get duration of {input_file}")
+    duration = cut_duration(input_file, media_info, segments_to_remove)
+    if duration is None:
         return False
 
-    # Sort segments to remove and merge overlapping segments
-    segments_to_remove.sort(key=lambda x: x[0])
-    merged_segments = []
-    for segment in segments_to_remove:
-        if not merged_segments or segment[0] > merged_segments[-1][1]:
-            merged_segments.append(segment)
-        else:
-            merged_segments[-1] = (merged_segments[-1][0], max(merged_segments[-1][1], segment[1]))
+    if removed_duration(segments_to_remove, duration) <= _EPSILON:
+        return _copy_uncut(input_file, output_file)
 
     # Calculate segments to keep
-    segments_to_keep = []
-    last_end = 0
-    for start, end in merged_segments:
-        if start > last_end:
-            segments_to_keep.append((last_end, start))
-        last_end = max(last_end, end)
-    if last_end < duration:
-        segments_to_keep.append((last_end, duration))
+    keep = segments_to_keep(segments_to_remove, duration)
+    started = time.monotonic()
+
+    if mode == 'smart':
+        smart_encoder = _smart_cut_encoder(input_file, media_info)
+        if smart_encoder is None:
+            # The full re-encode keeps the source's pixel format; the parallel mode's fixed 8-bit h264 would not
+            print("Smart cut unavailable for this file, falling back to full re-encode.")
+            mode = 'reencode'
+        elif _smart_cut_mp4(input_file, output_file, keep, *smart_encoder, media_info, progress_callback):
+            print(f"Cut mode: smart (stream copy with boundary re-encode)")
+            print(f"Successfully cut segments and saved to {output_file}")
+            _report_speed(keep, started)
+            return True
+        else:
+            print("Smart cut failed for this file, falling back to parallel re-encode.")
+            if os.path.exists(output_file):
+                os.remove(output_file)
+            mode = 'parallel'
+
+    if mode == 'parallel':
+        workers = max(1, workers or ENCODE_WORKERS)
+        if _parallel_cut_mp4(input_file, output_file, keep, workers, progress_callback):
+            print(f"Cut mode: parallel ({workers} workers)")
+            print(f"Successfully cut segments and saved to {output_file}")
+            _report_speed(keep, started)
+            return True
+        print("Parallel re-encode failed, falling back to a single ffmpeg process.")
+        if os.path.exists(output_file):
+            os.remove(output_file)
+    elif mode != 'reencode':
+        print(f"Unknown cut mode: {mode}, using full re-encode.")
 
+    print(f"Cut mode: reencode")
+    if _reencode_cut_mp4(input_file, output_file, keep, progress_callback):
+        _report_speed(keep, started)
+        return True
+    return False
+
+def _report_speed(keep: List[Tuple[float, float]], started: float):
+    elapsed = time.monotonic() - started
+    kept = sum(end - start for start, end in keep)
+    if elapsed > 0:
+        print(f"Cut speed: {kept / elapsed:.1f}x realtime ({kept:.1f}s of media in {elapsed:.1f}s)")
+
+def _plan_parallel_chunks(keep: List[Tuple[float, float]], workers: int, min_chunk: float = PARALLEL_MIN_CHUNK) -> List[Tuple[float, float]]:
+    # Split the kept ranges into about one chunk per worker, so a single long range
+    # still spreads over every worker; chunks never get shorter than min_chunk
+    total = sum(end - start for start, end in keep)
+    target = max(min_chunk, total / max(1, workers))
+    chunks = []
+    for start, end in keep:
+        count = max(1, min(round((end - start) / target), int((end - start) // min_chunk)))
+        step = (end - start) / count
+        chunks.extend((start + i * step, end if i == count - 1 else start + (i + 1) * step) for i in range(count))
+    return chunks
+
+def _parallel_cut_mp4(input_file: str, output_file: str, keep: List[Tuple[float, float]], workers: int,
+                      progress_callback: Optional[Callable[[ProgressMessage], None]] = None) -> bool:
+    chunks = _plan_parallel_chunks(keep, workers)
+    total = sum(end - start for start, end in keep)
+    # Split the cores between the processes instead of letting each encoder grab all of them
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    work_dir = tempfile.mkdtemp(prefix='parallelcut_', dir=os.path.dirname(os.path.abspath(output_file)))
+    try:
+        pieces = [os.path.join(work_dir, f"chunk_{i:04d}.mkv") for i in range(len(chunks))]
+        chunk_done = [0.0] * len(chunks)
+        progress_lock = threading.Lock()
+        started = time.monotonic()
+
+        def chunk_progress(i):
+            # The job's progress is the media time written by all chunk encoders together
+            if progress_callback is None:
+                return None
+            def on_progress(seconds, speed):
+                with progress_lock:
+                    chunk_done[i] = seconds
+                    done = sum(chunk_done)
+                elapsed = time.monotonic() - started
+                progress_callback(ProgressEvent('cut', done, total, done / elapsed if elapsed > 0 else None))
+            return on_progress
+
+        def encode(i):
+            start, end = chunks[i]
+            # Input seeking: each process decodes from the keyframe before its chunk, not from zero
+            command = ['ffmpeg', '-y', '-v', 'error', '-ss', f"{start:.6f}", '-i', input_file, '-t', f"{end - start:.6f}",
+                       '-map', '0:v:0', '-an'] + PARALLEL_ENCODER + ['-threads', str(threads), pieces[i]]
+            return _run_ffmpeg(command, chunk_progress(i))
+
+        print(f"Parallel cut: encoding {len(chunks)} chunks on {workers} workers")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            if not all(executor.map(encode, range(len(chunks)))):
+                return False
+
+        list_file = os.path.join(work_dir, 'chunks.txt')
+        write_concat_list(pieces, list_file)
+
+        # Chunks share encoder settings, so they join without re-encoding. Audio is trimmed in
+        # one pass over the whole file, which avoids encoder priming gaps at every chunk boundary.
+        command = [
+            'ffmpeg', '-y',
+            '-f', 'concat', '-safe', '0', '-i', list_file,
+            '-i', input_file,
+            '-filter_complex', audio_trim_filter(keep, '1:a'),
+            '-map', '0:v:0',
+            '-map', '[outa]',
+            '-c:v', 'copy',
+            '-c:a', 'aac', '-b:a', '192k',
+            output_file
+        ]
+        return _run_ffmpeg(command)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def _reencode_cut_mp4(input_file: str, output_file: str, keep: List[Tuple[float, float]], progress_callback: Optional[Callable[[ProgressMessage], None]] = None) -> bool:
     # Prepare ffmpeg filter complex
     filter_complex = []
-    for i, (seg_start, seg_end) in enumerate(segments_to_keep):
+    for i, (seg_start, seg_end) in enumerate(keep):
         filter_complex.append(f"[0:v]trim=start={seg_start}:end={seg_end},setpts=PTS-STARTPTS[v{i}]")
         filter_complex.append(f"[0:a]atrim=start={seg_start}:end={seg_end},asetpts=PTS-STARTPTS[a{i}]")
 
-    if len(segments_to_keep) > 1:
-        filter_complex.append(f"{''.join([f'[v{i}]' for i in range(len(segments_to_keep))])}concat=n={len(segments_to_keep)}:v=1:a=0[outv]")
-        filter_complex.append(f"{''.join([f'[a{i}]' for i in range(len(segments_to_keep))])}concat=n={len(segments_to_keep)}:v=0:a=1[outa]")
+    if len(keep) > 1:
+        filter_complex.append(f"{''.join([f'[v{i}]' for i in range(len(keep))])}concat=n={len(keep)}:v=1:a=0[outv]")
+        filter_complex.append(f"{''.join([f'[a{i}]' for i in range(len(keep))])}concat=n={len(keep)}:v=0:a=1[outa]")
     else:
         filter_complex.append(f"[v0]null[outv]")
         filter_complex.append(f"[a0]anull[outa]")
@@ -140,6 +527,7 @@ def cut_segments_mp4(input_file: str, output_file: str, segments_to_remove: List
     # Prepare ffmpeg command
     command = [
         'ffmpeg',
+        '-y',
         '-i', input_file,
         '-filter_complex', filter_complex_str,
         '-map', '[outv]',
@@ -148,10 +536,285 @@ def cut_segments_mp4(input_file: str, output_file: str, segments_to_remove: List
     ]
 
     # Execute ffmpeg command
-    try:
-        subprocess.run(command, check=True, stderr=subprocess.PIPE)
+    if _run_ffmpeg(command, _cut_progress(progress_callback, sum(end - start for start, end in keep))):
         print(f"Successfully cut segments and saved to {output_file}")
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"Error occurred while cutting segments: {e.stderr.decode()}")
+    return False
+
+def get_keyframes(input_file: str) -> List[float]:
+    """
+    List the keyframe timestamps of the first video stream.
+
+    Only packet headers are read, so this does not decode the video.
+
+    Args:
+        input_file (str): Path to the input file.
+
+    Returns:
+        List[float]: Sorted keyframe timestamps in seconds, empty on failure.
+    """
+    command = [
+        'ffprobe',
+        '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,flags',
+        '-of', 'csv=print_section=0',
+        input_file
+    ]
+    try:
+        with span('probe'):
+            output = subprocess.check_output(command).decode('utf-8')
+    except subprocess.CalledProcessError:
+        print(f"Error: Unable to read keyframes of {input_file}")
+        return []
+
+    keyframes = []
+    for line in output.splitlines():
+        fields = line.strip().split(',')
+        if len(fields) < 2 or 'K' not in fields[1]:
+            continue
+        try:
+            keyframes.append(float(fields[0]))
+        except ValueError:
+            continue
+    return sorted(keyframes)
+
+def _probe_streams(input_file: str) -> Optional[dict]:
+    # Codec parameters of the first video and audio streams, from the stream headers only
+    command = [
+        'ffprobe',
+        '-v', 'error',
+        '-show_entries', 'stream=codec_type,codec_name,profile,level,pix_fmt',
+        '-of', 'json',
+        input_file
+    ]
+    try:
+        with span('probe'):
+            streams = json.loads(subprocess.check_output(command).decode('utf-8')).get('streams', [])
+    except (subprocess.CalledProcessError, ValueError):
+        return None
+    video = next((stream for stream in streams if stream.get('codec_type') == 'video'), {})
+    audio = next((stream for stream in streams if stream.get('codec_type') == 'audio'), {})
+    return {'vcodec': video.get('codec_name'), 'profile': video.get('profile'), 'level': video.get('level'),
+            'pix_fmt': video.get('pix_fmt'), 'acodec': audio.get('codec_name')}
+
+def _smart_cut_encoder(input_file: str, media_info: Optional[MediaInfo] = None) -> Optional[Tuple[str, List[str]]]:
+    """
+    Pick the encoder for the boundary GOPs of a smart cut.
+
+    The re-encoded GOPs are joined with the copied ones under -c copy, so they must match the
+    source's codec, pixel format and, for h264, profile and level.
+
+    Returns:
+        Optional[Tuple[str, List[str]]]: The codec and the encoder arguments, or None if the
+            boundary encoders cannot reproduce the source's streams.
+    """
+    if media_info and media_info.vcodec and media_info.vcodec not in SMART_CUT_ENCODERS:
+        print(f"Smart cut does not support video codec: {media_info.vcodec}")
+        return None
+    streams = _probe_streams(input_file)
+    if streams is None:
+        return None
+    codec = streams['vcodec']
+    if codec not in SMART_CUT_ENCODERS:
+        print(f"Smart cut does not support video codec: {codec}")
+        return None
+    if streams['pix_fmt'] not in SMART_CUT_PIX_FMTS:
+        print(f"Smart cut does not support pixel format: {streams['pix_fmt']}")
+        return None
+    if streams['acodec'] not in SMART_CUT_AUDIO_CODECS:
+        print(f"Smart cut does not support audio codec: {streams['acodec']}")
+        return None
+    encoder = SMART_CUT_ENCODERS[codec] + ['-pix_fmt', streams['pix_fmt']]
+    if codec == 'h264':
+        profile = H264_PROFILES.get(streams['profile'])
+        if profile is None:
+            print(f"Smart cut does not support h264 profile: {streams['profile']}")
+            return None
+        encoder += ['-profile:v', profile]
+        if streams['level'] and streams['level'] > 0:
+            encoder += ['-level', f"{streams['level'] / 10:.1f}"]
+    return codec, encoder
+
+def _plan_smart_cut(keep: List[Tuple[float, float]], keyframes: List[float]) -> List[Tuple[str, float, float]]:
+    # Split every kept range into (action, start, end) pieces: whole GOPs between the
+    # first and last keyframe inside the range are copied, the partial GOPs around them
+    # are re-encoded.
+    plan = []
+    for start, end in keep:
+        inner = keyframes[bisect.bisect_left(keyframes, start - _EPSILON):bisect.bisect_right(keyframes, end + _EPSILON)]
+        if len(inner) < 2:
+            plan.append(('encode', start, end))
+            continue
+        first_key, last_key = inner[0], inner[-1]
+        if first_key - start > _EPSILON:
+            plan.append(('encode', start, first_key))
+        plan.append(('copy', first_key, last_key))
+        if end - last_key > _EPSILON:
+            plan.append(('encode', last_key, end))
+    return plan
+
+def _smart_cut_mp4(input_file: str, output_file: str, keep: List[Tuple[float, float]], codec: str, encoder: List[str], media_info: Optional[MediaInfo] = None,
+                   progress_callback: Optional[Callable[[ProgressMessage], None]] = None) -> bool:
+    keyframes = media_info.keyframes if media_info and media_info.keyframes else get_keyframes(input_file)
+    if not keyframes:
+        return False
+    if media_info is not None:
+        media_info.keyframes = keyframes
+
+    plan = _plan_smart_cut(keep, keyframes)
+    copied = sum(end - start for action, start, end in plan if action == 'copy')
+    total = sum(end - start for start, end in keep)
+    print(f"Smart cut: stream-copying {copied:.1f}s of {total:.1f}s, re-encoding the rest")
+
+    container = SMART_CUT_CONTAINERS[codec]
+    work_dir = tempfile.mkdtemp(prefix='smartcut_', dir=os.path.dirname(os.path.abspath(output_file)))
+    try:
+        pieces = []
+        for i, (action, start, end) in enumerate(plan):
+            piece = os.path.join(work_dir, f"piece_{i:04d}.{container}")
+            command = ['ffmpeg', '-y', '-v', 'error', '-ss', f"{start:.6f}", '-i', input_file, '-t', f"{end - start:.6f}", '-map', '0:v:0']
+            if action == 'copy':
+                command += ['-c', 'copy', '-avoid_negative_ts', 'make_zero']
+            else:
+                command += encoder
+            command.append(piece)
+            if not _run_ffmpeg(command):
+                return False
+            pieces.append(piece)
+
+        list_file = os.path.join(work_dir, 'pieces.txt')
+        write_concat_list(pieces, list_file)
+
+        # Join the video pieces and trim the audio in the same pass; audio is cheap to re-encode
+        command = [
+            'ffmpeg', '-y',
+            '-f', 'concat', '-safe', '0', '-i', list_file,
+            '-i', input_file,
+            '-filter_complex', audio_trim_filter(keep, '1:a'),
+            '-map', '0:v:0',
+            '-map', '[outa]',
+            '-c:v', 'copy',
+            '-c:a', 'aac', '-b:a', '192k',
+            output_file
+        ]
+        return _run_ffmpeg(command, _cut_progress(progress_callback, total))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+# MPEG audio bitrate tables in kbps, indexed by (version is MPEG-1, layer)
+_MP3_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# Sample rates indexed by the two version bits of the header
+_MP3_SAMPLE_RATES = {
+    0: [11025, 12000, 8000],   # MPEG-2.5
+    2: [22050, 24000, 16000],  # MPEG-2
+    3: [44100, 48000, 32000],  # MPEG-1
+}
+
+def _parse_mp3_header(header: bytes) -> Optional[Tuple[int, int, int]]:
+    # Returns (frame_length, samples_per_frame, sample_rate) or None if not a valid frame header
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+    version_bits = (header[1] >> 3) & 0x03
+    layer = 4 - ((header[1] >> 1) & 0x03)
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    padding = (header[2] >> 1) & 0x01
+    if version_bits == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    is_mpeg1 = version_bits == 3
+    bitrate = _MP3_BITRATES[(is_mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version_bits][sample_rate_index]
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate
+    if layer == 3 and not is_mpeg1:
+        return 72 * bitrate // sample_rate + padding, 576, sample_rate
+    return 144 * bitrate // sample_rate + padding, 1152, sample_rate
+
+def _is_mp3_info_frame(data, offset: int) -> bool:
+    # Xing/Info/VBRI headers describe the original stream length and would be wrong after a cut
+    is_mpeg1 = ((data[offset + 1] >> 3) & 0x03) == 3
+    mono = (data[offset + 3] >> 6) == 3
+    side_info = (17 if mono else 32) if is_mpeg1 else (9 if mono else 17)
+    tag = data[offset + 4 + side_info:offset + 8 + side_info]
+    return tag in (b'Xing', b'Info') or data[offset + 36:offset + 40] == b'VBRI'
+
+def _scan_mp3_frames(data) -> Tuple[int, int, List[Tuple[int, int]], int, int]:
+    # Returns (audio_start, audio_end, [(offset, length)], samples_per_frame, sample_rate)
+    audio_start = 0
+    if data[:3] == b'ID3' and len(data) >= 10:
+        tag_size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        audio_start = 10 + tag_size + (10 if data[5] & 0x10 else 0)
+    audio_end = len(data)
+    if audio_end - audio_start >= 128 and data[audio_end - 128:audio_end - 125] == b'TAG':
+        audio_end -= 128
+
+    frames = []
+    samples_per_frame = sample_rate = 0
+    offset = audio_start
+    while offset + 4 <= audio_end:
+        parsed = _parse_mp3_header(data[offset:offset + 4])
+        if parsed is None or offset + parsed[0] > audio_end or (frames and parsed[1:] != (samples_per_frame, sample_rate)):
+            # Not a frame boundary; skip ahead byte by byte until we are back in sync
+            offset += 1
+            continue
+        length, spf, rate = parsed
+        if not frames:
+            # Confirm the first sync with the header that should follow it
+            if offset + length < audio_end and _parse_mp3_header(data[offset + length:offset + length + 4]) is None:
+                offset += 1
+                continue
+            samples_per_frame, sample_rate = spf, rate
+        frames.append((offset, length))
+        offset += length
+
+    if frames and _is_mp3_info_frame(data, frames[0][0]):
+        frames = frames[1:]
+    return audio_start, audio_end, frames, samples_per_frame, sample_rate
+
+def _copy_cut_mp3(input_file: str, output_file: str, segments_to_remove: List[Tuple[float, float]]) -> bool:
+    # Keep whole frames whose midpoint lies inside a kept range. MP3 frames decode
+    # independently apart from the bit reservoir, so at most one frame per join may
+    # glitch, and every cut lands within half a frame of the requested time.
+    try:
+        with open(input_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            audio_start, audio_end, frames, samples_per_frame, sample_rate = _scan_mp3_frames(data)
+            if not frames:
+                print(f"Error: No MP3 frames found in {input_file}")
+                return False
+
+            frame_duration = samples_per_frame / sample_rate
+            duration = len(frames) * frame_duration
+            keep = segments_to_keep(segments_to_remove, duration)
+
+            # Byte ranges of contiguous kept frames, and the actual cut points they produce
+            byte_ranges = []
+            max_error = 0.0
+            for start, end in keep:
+                first = max(0, int(round(start / frame_duration)))
+                last = min(len(frames), int(round(end / frame_duration)))
+                if last <= first:
+                    continue
+                max_error = max(max_error, abs(first * frame_duration - start), abs(last * frame_duration - end))
+                byte_ranges.append((frames[first][0], frames[last - 1][0] + frames[last - 1][1]))
+
+            with open(output_file, 'wb') as out:
+                out.write(data[:audio_start])
+                for range_start, range_end in byte_ranges:
+                    out.write(data[range_start:range_end])
+                out.write(data[audio_end:])
+    except (OSError, ValueError) as e:
+        print(f"Error occurred while cutting segments: {e}")
         return False
+
+    print(f"Cut mode: copy (frame size {frame_duration * 1000:.1f} ms, max cut error {max_error * 1000:.1f} ms)")
+    return True
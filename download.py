@@ -1,9 +1,25 @@
 import os
+import shutil
+import subprocess
+import tempfile
+import threading
 import yt_dlp
-from typing import Callable, List
-from yt_dlp.utils import DownloadError
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from yt_dlp.extractor.youtube import YoutubeIE
+from yt_dlp.utils import DownloadCancelled, DownloadError, YoutubeDLError, download_range_func, sanitize_filename
+from cutseg import segments_to_keep, write_concat_list
+from infocache import get_info_cache
+from mediainfo import MediaInfo
+from progress import ProgressEvent, ProgressMessage, labelled
+from tracing import Span, current_job, job_context, span, start_span
+from postprocessor import SponsorBlockCutPP
+from sponser import ALL_SEGMENT_TYPES, get_sponsor_segments_batch
+from ydlpool import get_ydl_pool
 
-def download_video(url: str, output_path: str, format: str, progress_callback: Callable[[str], None] = None) -> str:
+def download_video(url: str, output_path: str, format: str, progress_callback: Callable[[ProgressMessage], None] = None) -> MediaInfo:
     """
     Download a video from YouTube using yt-dlp.
     
@@ -11,11 +27,80 @@ def download_video(url: str, output_path: str, format: str, progress_callback: C
         url (str): The YouTube video URL.
         output_path (str): The path where the video will be saved.
         format (str): The desired format ('mp3' or 'mp4').
-        progress_callback (Callable[[str], None], optional): A callback function to report progress.
+        progress_callback (Callable[[ProgressMessage], None], optional): A callback function to report progress,
+            called with text messages and ProgressEvents.
     
+    Returns:
+        MediaInfo: The exact path of the downloaded file with its duration and codecs,
+                   as reported by yt-dlp, for the cut stage.
+    """
+    overrides = {'outtmpl': os.path.join(output_path, '%(title)s.%(ext)s')}
+    with _traced_download(lambda d: _progress_hook(d, progress_callback)) as progress_hook:
+        with get_ydl_pool().acquire('mp3' if format == 'mp3' else 'mp4', overrides, progress_hook=progress_hook) as ydl:
+            info = _resolve_info(ydl, url, download=True)
+        media_info = _downloaded_media(info, output_path, format)
+        _remember_info(info, media_info.file_path)
+        return media_info
+
+def download_and_cut(url: str, output_path: str, format: str, segments_to_remove: List[Tuple[float, float]], progress_callback: Callable[[ProgressMessage], None] = None, stage_gate=None,
+                     encode_workers: Optional[int] = None, stage_callback: Optional[Callable[[str, str], None]] = None) -> str:
+    """
+    Download a video and remove segments in the same yt-dlp postprocessor chain.
+
+    mp3 audio is extracted and cut by a single ffmpeg invocation, so it is written once.
+    mp4 is cut in place right after yt-dlp's stream-copy merge, so a video with segments is
+    still written twice (merge, then cut).
+
+    Args:
+        url (str): The YouTube video URL.
+        output_path (str): The path where the video will be saved.
+        format (str): The desired format ('mp3' or 'mp4').
+        segments_to_remove (List[Tuple[float, float]]): List of (start, end) timestamps to remove.
+        progress_callback (Callable[[ProgressMessage], None], optional): A callback function to report progress,
+            called with text messages and ProgressEvents.
+        stage_gate (optional): Scheduler gate; the cut waits for a CPU slot before running.
+        encode_workers (Optional[int]): ffmpeg processes used if the mp4 cut has to re-encode.
+        stage_callback (Callable[[str, str], None], optional): Called with ('cut', path) once the output file is final,
+            unless the cut failed and the uncut file was kept.
+
     Returns:
         str: The path of the downloaded file.
     """
+    overrides = {'outtmpl': os.path.join(output_path, '%(title)s.%(ext)s')}
+    cut_pp = SponsorBlockCutPP(None, segments_to_remove, format, stage_gate=stage_gate, encode_workers=encode_workers,
+                               progress_callback=progress_callback, stage_callback=stage_callback)
+    # The cut runs inside extract_info, so its span nests in the download's
+    with _traced_download(lambda d: _progress_hook(d, progress_callback)) as progress_hook:
+        with get_ydl_pool().acquire('audio' if format == 'mp3' else 'mp4', overrides, progress_hook=progress_hook,
+                                    postprocessors=[(cut_pp, 'post_process')]) as ydl:
+            info = _resolve_info(ydl, url, download=True)
+        file_path = _downloaded_media(info, output_path, format).file_path
+        _remember_info(info, file_path)
+        return file_path
+
+def download_video_ranges(url: str, output_path: str, format: str, segments_to_remove: List[Tuple[float, float]], progress_callback: Callable[[ProgressMessage], None] = None) -> Optional[str]:
+    """
+    Download only the parts of a video that lie outside the given segments.
+
+    The kept ranges are fetched with yt-dlp's range download support, so removed
+    sections never hit the network or the disk, and then joined without re-encoding.
+    Ranges are cut by ffmpeg at the nearest keyframe.
+
+    Args:
+        url (str): The YouTube video URL.
+        output_path (str): The path where the video will be saved.
+        format (str): The desired format ('mp3' or 'mp4').
+        segments_to_remove (List[Tuple[float, float]]): List of (start, end) timestamps to skip.
+        progress_callback (Callable[[ProgressMessage], None], optional): A callback function to report progress,
+            called with text messages and ProgressEvents.
+
+    Returns:
+        Optional[str]: The path of the downloaded file, or None if range download is not
+                       possible for this video and the caller should download it in full.
+    """
+    os.makedirs(output_path, exist_ok=True)
+    section_dir = tempfile.mkdtemp(prefix='sections_', dir=os.path.abspath(output_path))
+    section_files = []
     ydl_opts = {
         'format': 'bestaudio/best' if format == 'mp3' else 'bestvideo+bestaudio/best',
         'postprocessors': [{
@@ -23,86 +108,321 @@ def download_video(url: str, output_path: str, format: str, progress_callback: C
             'preferredcodec': 'mp3',
             'preferredquality': '192',
         }] if format == 'mp3' else [],
-        'outtmpl': os.path.join(output_path, '%(title)s.%(ext)s'),
-        'progress_hooks': [lambda d: _progress_hook(d, progress_callback)],
+        'outtmpl': os.path.join(section_dir, 'section_%(section_start)s.%(ext)s'),
+        # download_span is bound below, before the first section downloads
+        'progress_hooks': [lambda d: _progress_hook(d, progress_callback), lambda d: _count_bytes(d, download_span)],
+        'post_hooks': [section_files.append],
     }
 
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(url, download=True)
-        if 'entries' in info:
-            # It's a playlist
-            info = info['entries'][0]
-        
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            with span('extract'):
+                info = _resolve_info(ydl, url, download=False)
+            duration = info.get('duration')
+            if not duration:
+                return None
+
+            keep = segments_to_keep(segments_to_remove, duration)
+            if not keep:
+                return None
+            kept_seconds = sum(end - start for start, end in keep)
+            with span('download') as download_span:
+                _download_ranges(ydl, info, keep)
+
+        if len(section_files) != len(keep):
+            return None
+
         file_extension = 'mp3' if format == 'mp3' else 'mp4'
-        filename = f"{info['title']}.{file_extension}"
-        return os.path.join(output_path, filename)
+        file_path = os.path.join(output_path, f"{sanitize_filename(info['title'])}.{file_extension}")
+        if len(section_files) == 1:
+            shutil.move(section_files[0], file_path)
+        else:
+            list_file = os.path.join(section_dir, 'sections.txt')
+            write_concat_list(section_files, list_file)
+            command = ['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_file, '-c', 'copy', file_path]
+            with span('cut', media_seconds=kept_seconds):
+                subprocess.run(command, check=True, stderr=subprocess.PIPE)
+        _remember_info(info, file_path)
+        return file_path
+    except (DownloadError, subprocess.CalledProcessError, OSError) as e:
+        if progress_callback:
+            progress_callback(f"Range download failed: {e}")
+        return None
+    finally:
+        shutil.rmtree(section_dir, ignore_errors=True)
+
+def _download_ranges(ydl: yt_dlp.YoutubeDL, info: dict, keep: List[Tuple[float, float]]) -> dict:
+    # yt-dlp ends every range at most at the info dict's duration, which is whole seconds and
+    # can cut off the end of the file. It leaves a range open (section_end None) only when the
+    # duration is unknown, so the last range is run without one when it reaches the end.
+    if keep[-1][1] >= info['duration']:
+        keep = keep[:-1] + [(keep[-1][0], float('inf'))]
+        info = dict(info, duration=None)
+    ydl.params['download_ranges'] = download_range_func(None, keep)
+    return ydl.process_ie_result(info, download=True)
+
+def _downloaded_media(info: dict, output_path: str, format: str) -> MediaInfo:
+    # yt-dlp records the final path after merging and postprocessing; the title-based name
+    # is only a fallback, since it ignores filename sanitizing
+    media_info = MediaInfo.from_info_dict(info)
+    if not media_info.file_path:
+        file_extension = 'mp3' if format == 'mp3' else 'mp4'
+        media_info.file_path = os.path.join(output_path, f"{info['title']}.{file_extension}")
+    return media_info
+
+def _resolve_info(ydl: yt_dlp.YoutubeDL, url: str, video_id: Optional[str] = None, download: bool = True) -> Optional[dict]:
+    # Serve the info dict from the cache while its format URLs are still signed; if the
+    # cached entry no longer works, drop it and extract again
+    video_id = video_id or YoutubeIE.get_temp_id(url)
+    cache = get_info_cache()
+    cached = cache.get(video_id) if video_id else None
+    if cached is not None:
+        try:
+            info = ydl.process_ie_result(cached, download=download)
+        except DownloadError:
+            info = None
+        # With ignoreerrors yt-dlp reports a failure and returns instead of raising, so a
+        # download counts only if it produced a file
+        if info and (not download or _downloaded_path(info)):
+            return info
+        cache.invalidate(video_id)
+    info = ydl.extract_info(url, download=download)
+    if info and 'entries' in info:
+        # It's a playlist
+        info = info['entries'][0]
+    return info
+
+def _downloaded_path(info: dict) -> Optional[str]:
+    requested_downloads = info.get('requested_downloads') or []
+    return (requested_downloads[0] if requested_downloads else info).get('filepath')
+
+def _remember_info(info: dict, file_path: Optional[str] = None):
+    if info and info.get('id') and info.get('formats'):
+        get_info_cache().put(info['id'], info, file_path)
+
+@contextmanager
+def _traced_download(progress_hook: Callable[[dict], None]) -> Iterator[Callable[[dict], None]]:
+    # yt-dlp extracts and downloads in one call; the extraction is taken to end at the first
+    # progress event, or with the call if none came (e.g. the file was already there).
+    # Yields the progress hook to pass to yt-dlp.
+    with span('download') as download_span:
+        extract_span = start_span('extract')
+
+        def hook(d):
+            extract_span.end()
+            _count_bytes(d, download_span)
+            progress_hook(d)
 
-def _progress_hook(d: dict, callback: Callable[[str], None] = None):
+        try:
+            yield hook
+        except BaseException as e:
+            if extract_span.wall is None:
+                extract_span.error = type(e).__name__
+            raise
+        finally:
+            extract_span.end()
+
+def _count_bytes(d: dict, download_span: Span):
+    if d['status'] == 'finished':
+        download_span.add_bytes(d.get('total_bytes') or d.get('downloaded_bytes') or 0)
+
+def _progress_hook(d: dict, callback: Callable[[ProgressMessage], None] = None):
     if d['status'] == 'downloading':
-        percent = d['_percent_str']
+        # Built from yt-dlp's raw numbers; the formatted strings carry terminal colors
         if callback:
-            callback(f"Downloading: {percent}")
+            callback(ProgressEvent('download', d.get('downloaded_bytes'), d.get('total_bytes') or d.get('total_bytes_estimate'),
+                                   d.get('speed'), d.get('eta')))
     elif d['status'] == 'finished':
         if callback:
             callback(f"Download completed. Converting...")
 
-def download_playlist(url: str, output_path: str, format: str, progress_callback: Callable[[str], None] = None) -> List[str]:
+# Most entries whose segments are looked up in one batch
+PREFETCH_CHUNK = 50
+# Most url/url_transparent results followed before a playlist URL is given up on
+MAX_REDIRECTS = 5
+
+def iter_playlist_entries(url: str) -> Iterator[dict]:
+    """
+    Yield the entries of a playlist as they are listed, without resolving them.
+
+    Uses flat, lazy extraction, so only the playlist pages are fetched and the first entry is
+    available after the first page. Each entry carries at least 'id' and 'url'.
+
+    Args:
+        url (str): The YouTube playlist URL. A single video URL yields that video.
+
+    Returns:
+        Iterator[dict]: Unresolved playlist entries.
+
+    Raises:
+        DownloadError: The URL redirects more than MAX_REDIRECTS times.
+    """
+    ydl_opts = {
+        'extract_flat': 'in_playlist',
+        'lazy_playlist': True,
+        'quiet': True,
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False, process=False)
+        # Without processing, a watch?v=...&list=... or youtu.be/...?list=... URL comes back as
+        # a redirect to the playlist instead of the playlist itself
+        redirects = 0
+        while info.get('_type') in ('url', 'url_transparent'):
+            if redirects == MAX_REDIRECTS:
+                raise DownloadError(f"Too many redirects for {url}")
+            redirects += 1
+            info = ydl.extract_info(info['url'], download=False, process=False, ie_key=info.get('ie_key'))
+        if 'entries' not in info:
+            # It's a single video, not a playlist; it is already resolved
+            yield info
+            return
+        for entry in info['entries']:
+            yield entry
+
+def _download_entry(ydl: yt_dlp.YoutubeDL, entry: Optional[dict], output_path: str, format: str, progress_callback: Callable[[ProgressMessage], None] = None) -> Optional[MediaInfo]:
+    if not entry:
+        if progress_callback:
+            progress_callback("Skipped unavailable video")
+        return None
+    try:
+        # Resolve the entry only now, right before its download
+        if entry.get('formats'):
+            info = ydl.process_ie_result(entry, download=True)
+        else:
+            info = _resolve_info(ydl, entry.get('webpage_url') or entry['url'], entry.get('id'), download=True)
+        if not info or not _downloaded_path(info):
+            # ignoreerrors: yt-dlp already reported why, without raising
+            raise DownloadError(f"Unable to download {entry.get('url')}")
+        media_info = _downloaded_media(info, output_path, format)
+        _remember_info(info, media_info.file_path)
+        if progress_callback:
+            progress_callback(f"Successfully downloaded: {info['title']}")
+        return media_info
+    except DownloadError as e:
+        if progress_callback:
+            progress_callback(f"Error downloading video: {e}. Skipping to next video.")
+        return None
+
+def _download_entries(entries: Iterable[Optional[dict]], profile: str, overrides: dict, output_path: str, format: str, progress_callback: Callable[[ProgressMessage], None] = None,
+                      concurrency: int = 1, entry_callback: Callable[[int, str, MediaInfo], None] = None, prefetch_segments: bool = False,
+                      skip_entry: Callable[[dict], bool] = None, check_cancelled: Callable[[], None] = None) -> List[Optional[MediaInfo]]:
+    # Each entry borrows a YoutubeDL from the shared pool for the duration of its download.
+    # The progress hook runs on the worker thread, so a thread-local label tells entries apart.
+    local = threading.local()
+    concurrency = max(1, concurrency)
+
+    def labelled_callback(message):
+        if progress_callback:
+            progress_callback(labelled(message, getattr(local, 'label', '')))
+
+    # Worker threads start with an empty context; their spans belong to the caller's job
+    job = current_job()
+
+    def worker(index, entry):
+        local.label = f"[{index}] "
+        if entry and skip_entry and skip_entry(entry):
+            labelled_callback(f"Already up to date: {entry.get('title') or entry.get('id')}")
+            return None
+        try:
+            with job_context(job), _traced_download(lambda d: _progress_hook(d, labelled_callback)) as progress_hook:
+                with get_ydl_pool().acquire(profile, overrides, progress_hook=progress_hook) as ydl:
+                    media_info = _download_entry(ydl, entry, output_path, format, labelled_callback)
+        except DownloadCancelled:
+            raise
+        except (YoutubeDLError, OSError) as e:
+            labelled_callback(f"Error downloading video: {e}. Skipping to next video.")
+            return None
+        if media_info and entry_callback:
+            entry_callback(index, entry.get('id'), media_info)
+        return media_info
+
+    def prefetch(video_ids):
+        if progress_callback:
+            progress_callback(f"Prefetching sponsor segments for {len(video_ids)} videos...")
+        try:
+            with job_context(job), span('segments'):
+                get_sponsor_segments_batch(video_ids, ALL_SEGMENT_TYPES)
+        except Exception as e:
+            # The cut stage looks the segments up one by one instead
+            print(f"Error prefetching sponsor segments: {e}")
+
+    results = []
+    pending = deque()
+    # Segment lookups run on their own thread beside the downloads: IDs are batched while
+    # the previous lookup is busy, and sent as soon as it is done or the batch is full
+    prefetcher = ThreadPoolExecutor(max_workers=1) if prefetch_segments else None
+    lookups = []
+    batch = []
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        # Entries are submitted as they are listed and pulled from the (possibly lazy) iterable
+        # only as workers free up; results are collected oldest first so they stay in playlist order
+        for index, entry in enumerate(entries, 1):
+            if check_cancelled:
+                check_cancelled()
+            if prefetcher is not None and entry and entry.get('id'):
+                batch.append(entry['id'])
+                if len(batch) >= PREFETCH_CHUNK or not lookups or lookups[-1].done():
+                    lookups.append(prefetcher.submit(prefetch, batch))
+                    batch = []
+            if len(pending) >= 2 * concurrency:
+                results.append(pending.popleft().result())
+            pending.append(executor.submit(worker, index, entry))
+        if batch:
+            lookups.append(prefetcher.submit(prefetch, batch))
+        while pending:
+            results.append(pending.popleft().result())
+    except BaseException:
+        # Cancelled or failed: downloads and lookups not started yet are dropped
+        for future in list(pending) + lookups:
+            future.cancel()
+        raise
+    finally:
+        executor.shutdown(wait=True)
+        if prefetcher is not None:
+            prefetcher.shutdown(wait=True)
+    return results
+
+def download_playlist(url: str, output_path: str, format: str, progress_callback: Callable[[ProgressMessage], None] = None, prefetch_segments: bool = False, concurrency: int = 1, entry_callback: Callable[[int, str, MediaInfo], None] = None, skip_entry: Callable[[dict], bool] = None,
+                      check_cancelled: Callable[[], None] = None) -> List[str]:
     """
     Download all videos from a YouTube playlist.
+
+    Entries are streamed from a flat, lazy extraction and each one is resolved just before
+    its download, so the first download starts after the first playlist page however long
+    the playlist is.
     
     Args:
         url (str): The YouTube playlist URL.
         output_path (str): The path where the videos will be saved.
         format (str): The desired format ('mp3' or 'mp4').
-        progress_callback (Callable[[str], None], optional): A callback function to report progress.
+        progress_callback (Callable[[ProgressMessage], None], optional): A callback function to report progress,
+            called with text messages and ProgressEvents.
+        prefetch_segments (bool): Look up the SponsorBlock segments of the entries in batches as
+                                  they are listed, so later per-video lookups are served from the cache.
+        concurrency (int): Number of entries downloaded at the same time, each with a YoutubeDL
+                           instance borrowed from the shared pool. Progress messages are prefixed with [index].
+        entry_callback (Callable[[int, str, MediaInfo], None], optional): Called with (index, video ID, MediaInfo)
+                           as soon as each entry has been downloaded, from the downloading thread.
+        skip_entry (Callable[[dict], bool], optional): Called with each unresolved entry before it is
+                           downloaded; entries for which it returns True are skipped.
+        check_cancelled (Callable[[], None], optional): Called before each entry is queued; raises to
+                           stop the playlist. Cancellation raised from a progress callback must be a
+                           DownloadCancelled, the only exception yt-dlp does not skip with ignoreerrors.
     
     Returns:
-        List[str]: A list of paths of the downloaded files.
+        List[str]: A list of paths of the downloaded files, in playlist order.
     """
-    ydl_opts = {
-        'format': 'bestaudio/best' if format == 'mp3' else 'bestvideo+bestaudio/best',
-        'postprocessors': [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '192',
-        }] if format == 'mp3' else [],
+    overrides = {
         'outtmpl': os.path.join(output_path, '%(title)s.%(ext)s'),
-        'progress_hooks': [lambda d: _progress_hook(d, progress_callback)],
         'ignoreerrors': True,  # This will make yt-dlp continue downloading even if some videos fail
     }
 
-    downloaded_files = []
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        try:
-            info = ydl.extract_info(url, download=False)
-            if 'entries' in info:
-                for entry in info['entries']:
-                    if entry:
-                        try:
-                            video_url = entry['webpage_url']
-                            ydl.download([video_url])
-                            file_extension = 'mp3' if format == 'mp3' else 'mp4'
-                            filename = f"{entry['title']}.{file_extension}"
-                            file_path = os.path.join(output_path, filename)
-                            downloaded_files.append(file_path)
-                            if progress_callback:
-                                progress_callback(f"Successfully downloaded: {entry['title']}")
-                        except DownloadError as e:
-                            if progress_callback:
-                                progress_callback(f"Error downloading video: {e}. Skipping to next video.")
-                            continue
-                    else:
-                        if progress_callback:
-                            progress_callback("Skipped unavailable video")
-            else:
-                # It's a single video, not a playlist
-                ydl.download([url])
-                file_extension = 'mp3' if format == 'mp3' else 'mp4'
-                filename = f"{info['title']}.{file_extension}"
-                file_path = os.path.join(output_path, filename)
-                downloaded_files.append(file_path)
-        except DownloadError as e:
-            if progress_callback:
-                progress_callback(f"Error downloading playlist: {e}")
-
-    return downloaded_files
+    try:
+        results = _download_entries(iter_playlist_entries(url), 'mp3' if format == 'mp3' else 'mp4', overrides, output_path, format, progress_callback,
+                                    concurrency, entry_callback, prefetch_segments, skip_entry, check_cancelled)
+    except DownloadError as e:
+        if progress_callback:
+            progress_callback(f"Error downloading playlist: {e}")
+        return []
+    return [media_info.file_path for media_info in results if media_info]
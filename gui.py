@@ -1,17 +1,29 @@
 import sys
 import os
-import pyperclip
 import re
 import json
+import multiprocessing
+import queue
+import logging
+import threading
+import time
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, 
                              QPushButton, QLabel, QLineEdit, QCheckBox, 
-                             QTextEdit, QFileDialog, QStackedWidget, QListWidget, QListWidgetItem)
+                             QPlainTextEdit, QComboBox, QFileDialog, QStackedWidget)
 from PyQt5.QtGui import QPalette, QColor, QPainter, QBrush
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QRect, QTimer
 
-from main import process_video
-from download import download_playlist
-from sponser import get_sponsor_segments  # Add this import
+import scheduler
+from scheduler import JobScheduler
+from progress import ProgressEvent, ProgressThrottle
+from archive import get_archive
+from infocache import get_info_cache
+from journal import get_journal
+from ydlpool import get_ydl_pool
+from joblist import DownloadListModel, DownloadListView
+from workerpool import WorkerError, close_worker_pool, get_worker_pool
+from tracing import Span, get_tracer, job_context, job_summary
+from logsink import DEFAULT_LOG_CAPACITY, DEFAULT_LOG_FILE_BACKUPS, DEFAULT_LOG_FILE_BYTES, LEVELS, LogSink, add_log_file, get_logger
 
 class CheckeredClickableArea(QWidget):
     clicked = pyqtSignal()
@@ -47,29 +59,22 @@ class CheckeredClickableArea(QWidget):
         if event.button() == Qt.LeftButton:
             self.clicked.emit()
 
-class TextSpinner(QLabel):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.spinner_chars = ['|', '/', '-', '\\']
-        self.current_char = 0
-        self.percentage = ""
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_spinner)
-        self.timer.start(100)  # Update every 100ms
-
-    def update_spinner(self):
-        self.setText(f"{self.spinner_chars[self.current_char]} {self.percentage}")
-        self.current_char = (self.current_char + 1) % len(self.spinner_chars)
+def load_pipeline():
+    """
+    Import the download pipeline and return the main module.
 
-    def set_percentage(self, percentage):
-        self.percentage = percentage
-        self.update_spinner()
+    The pipeline pulls in yt-dlp and requests, which take longer to import than
+    the window takes to paint. The GUI imports it in a background thread once the window shows;
+    a job started before that finishes waits for the same import.
+    """
+    import main
+    return main
 
 class DownloadThread(QThread):
-    update_progress = pyqtSignal(str, float)  # url, percentage
+    update_progress = pyqtSignal(str, float, str)  # url, percentage, stage
     finished = pyqtSignal(str, str)  # url, result
 
-    def __init__(self, url, output_path, format, use_sponsorblock, is_playlist=False, segment_types=None):
+    def __init__(self, url, output_path, format, use_sponsorblock, is_playlist=False, segment_types=None, download_sections=False, stage_gate=None, playlist_concurrency=1, sync=False, encode_workers=None, mp3_output_path=None, progress_rate=10.0, worker_pool=None, trace_job=None):
         QThread.__init__(self)
         self.url = url
         self.output_path = output_path
@@ -77,50 +82,157 @@ class DownloadThread(QThread):
         self.use_sponsorblock = use_sponsorblock
         self.is_playlist = is_playlist
         self.segment_types = segment_types or []
+        self.download_sections = download_sections
+        self.stage_gate = stage_gate
+        self.playlist_concurrency = playlist_concurrency
+        self.sync = sync
+        self.encode_workers = encode_workers
+        self.mp3_output_path = mp3_output_path
+        self.worker_pool = worker_pool
+        # Job name of the timing spans, for the summary logged when the job ends
+        self.trace_job = trace_job
+        # Progress arrives per chunk, often hundreds of times a second; only a few reach the GUI thread
+        self.progress_throttle = ProgressThrottle(self.emit_progress, progress_rate)
 
     def run(self):
+        try:
+            self._run()
+        finally:
+            if self.stage_gate is not None:
+                self.stage_gate.leave()
+
+    def _run(self):
         if self.is_playlist:
             try:
-                results = download_playlist(self.url, self.output_path, self.format, self.progress_callback)
-                successful_downloads = 0
-                for result in results:
-                    try:
-                        process_video(result, self.output_path, self.format, self.use_sponsorblock, self.segment_types, self.progress_callback)
-                        successful_downloads += 1
-                    except Exception as e:
-                        self.update_progress.emit(self.url, -1)
-                self.finished.emit(self.url, f"Playlist download completed: {successful_downloads}/{len(results)} videos")
+                results, stats = self._call('process_playlist', url=self.url, output_path=self.output_path, format=self.format, use_sponsorblock=self.use_sponsorblock,
+                                            segment_types=self.segment_types, concurrency=self.playlist_concurrency, sync=self.sync,
+                                            encode_workers=self.encode_workers, mp3_output_path=self.mp3_output_path)
+                self.finished.emit(self.url, f"Playlist download completed: {len(results)} videos "
+                                             f"(download {stats['download']['per_minute']:.1f}/min, cut {stats['cut']['per_minute']:.1f}/min)")
+            except scheduler.JobCancelled:
+                self.finished.emit(self.url, "Cancelled")
             except Exception as e:
-                self.update_progress.emit(self.url, -1)
+                self.update_progress.emit(self.url, -1, "")
                 self.finished.emit(self.url, "Failed")
         else:
             try:
-                result = process_video(self.url, self.output_path, self.format, self.use_sponsorblock, self.segment_types, self.progress_callback)
+                result = self._call('process_video', url=self.url, output_path=self.output_path, format=self.format, use_sponsorblock=self.use_sponsorblock,
+                                    segment_types=self.segment_types, download_sections=self.download_sections,
+                                    encode_workers=self.encode_workers, mp3_output_path=self.mp3_output_path)
                 self.finished.emit(self.url, result)
+            except scheduler.JobCancelled:
+                self.finished.emit(self.url, "Cancelled")
             except Exception as e:
-                self.update_progress.emit(self.url, -1)
+                self.update_progress.emit(self.url, -1, "")
                 self.finished.emit(self.url, "Failed")
 
+    def _call(self, kind, **kwargs):
+        # Run a pipeline function in this thread, or in a worker process when the pool is enabled
+        if self.worker_pool is not None:
+            return self._call_in_worker(kind, kwargs)
+        with job_context(self.trace_job):
+            return getattr(load_pipeline(), kind)(progress_callback=self.progress_callback, stage_gate=self.stage_gate, **kwargs)
+
+    def _call_in_worker(self, kind, kwargs):
+        job = self.worker_pool.submit(kind, kwargs, key=self.url)
+        # Set once this job is over here, e.g. when its worker died, so a slot granted later is given back
+        job_done = threading.Event()
+        try:
+            while True:
+                try:
+                    event, payload = job.events.get(timeout=0.5)
+                except queue.Empty:
+                    if self.stage_gate is not None:
+                        self.stage_gate.check_cancelled()
+                    continue
+                if event == 'progress':
+                    self.progress_callback(payload)
+                elif event == 'log':
+                    get_logger().debug(payload)
+                elif event == 'trace':
+                    for data in payload:
+                        get_tracer().add(Span.from_dict(data, job=self.trace_job))
+                elif event == 'leave':
+                    if self.stage_gate is not None:
+                        self.stage_gate.leave()
+                elif event == 'acquire':
+                    # Waits on its own thread: the worker's other threads keep reporting and releasing meanwhile
+                    threading.Thread(target=self._acquire_for_worker, args=(job, payload, job_done), daemon=True).start()
+                elif event == 'release':
+                    if self.stage_gate is not None:
+                        self.stage_gate.release(payload)
+                elif event == 'stage':
+                    # The worker waits for the slot; the scheduler's limits are held on this side
+                    try:
+                        if self.stage_gate is not None:
+                            self.stage_gate.enter(payload)
+                    except scheduler.JobCancelled:
+                        job.reply(False)
+                        raise
+                    job.reply(True)
+                elif event == 'result':
+                    return payload
+                elif event == 'cancelled':
+                    raise scheduler.JobCancelled()
+                elif event == 'error':
+                    get_logger().error(f"Worker failed on {self.url}: {payload}")
+                    raise WorkerError(payload)
+        except scheduler.JobCancelled:
+            job.cancel()
+            job.wait_stopped()
+            raise
+        finally:
+            job_done.set()
+
+    def _acquire_for_worker(self, job, stage, job_done):
+        try:
+            if self.stage_gate is not None:
+                self.stage_gate.acquire(stage)
+        except scheduler.JobCancelled:
+            job.reply(False)
+            return
+        if job_done.is_set():
+            # The job ended while this waited, and the scheduler may already have released its
+            # slots; nobody would give this one back
+            if self.stage_gate is not None:
+                self.stage_gate.release(stage)
+            return
+        job.reply(True)
+
     def progress_callback(self, message):
-        if "Downloading:" in message:
-            try:
-                percentage_match = re.search(r'\[0;94m\s*(\d+\.\d+)%\[0m', message)
-                if percentage_match:
-                    percentage = float(percentage_match.group(1))
-                    self.update_progress.emit(self.url, percentage)
-            except ValueError:
-                pass
+        if self.stage_gate is not None:
+            # Stops a cancelled job at its next progress update
+            self.stage_gate.check_cancelled()
+        if isinstance(message, ProgressEvent):
+            self.progress_throttle(message)
+        else:
+            get_logger().debug(message)
+
+    def emit_progress(self, event):
+        if event.percent is not None:
+            self.update_progress.emit(self.url, event.percent, event.stage)
 
 class YouTubeDownloaderGUI(QWidget):
     def __init__(self):
         super().__init__()
         self.config_file = 'config.json'
         self.load_config()
+        self.scheduler = JobScheduler(self.config.get('max_network_jobs', 2), self.config.get('max_cpu_jobs', max(1, (os.cpu_count() or 2) // 2)))
+        self.scheduler.queue_changed.connect(self.update_queue_status)
+        self.scheduler.job_cancelled.connect(self.on_job_cancelled)
+        self.scheduler.job_finished.connect(lambda job_id: self.jobs.pop(job_id, None))
+        self.jobs = {}
+        self.journal_ids = {}
+        self.setup_logging()
         self.initUI()
-        self.download_threads = []
+        threading.Thread(target=self.reconcile_archive, daemon=True).start()
+        # Import the heavy backends once the event loop runs and the window has painted
+        QTimer.singleShot(self.config.get('warmup_delay_ms', 300), self.warm_up_pipeline)
         self.active_downloads = set()
         self.active_playlist_ids = set()
         self.active_video_ids = set()
+        if self.config.get('resume_jobs', True):
+            QTimer.singleShot(0, self.resume_jobs)
 
     def load_config(self):
         if os.path.exists(self.config_file):
@@ -132,6 +244,23 @@ class YouTubeDownloaderGUI(QWidget):
                 'mp4_output': os.path.join(os.path.expanduser("~"), "Downloads", "YouTube_MP4")
             }
 
+    def setup_logging(self):
+        self.logger = get_logger()
+        self.log_sink = LogSink(self.config.get('log_capacity', DEFAULT_LOG_CAPACITY), LEVELS.get(self.config.get('log_level', 'INFO'), logging.INFO))
+        self.logger.addHandler(self.log_sink)
+        if self.config.get('log_file'):
+            add_log_file(self.config['log_file'], self.config.get('log_file_max_bytes', DEFAULT_LOG_FILE_BYTES), self.config.get('log_file_backups', DEFAULT_LOG_FILE_BACKUPS))
+        if self.config.get('trace_file'):
+            # Every timing span as a JSON line, for offline analysis
+            get_tracer().set_trace_file(self.config['trace_file'])
+
+    def write_metrics(self, path):
+        # Per-stage totals in the Prometheus text format
+        try:
+            get_tracer().write_prometheus(path)
+        except OSError as e:
+            self.logger.warning(f"Unable to write metrics to {path}: {e}")
+
     def save_config(self):
         with open(self.config_file, 'w') as f:
             json.dump(self.config, f)
@@ -180,9 +309,17 @@ class YouTubeDownloaderGUI(QWidget):
         self.mp4_check = QCheckBox("MP4")
         self.sponsorblock_check = QCheckBox("Use SponsorBlock")
         self.sponsorblock_check.setChecked(True)
+        self.sections_check = QCheckBox("Skip sponsor bytes")
+        self.sections_check.setToolTip("Look up segments first and only download the kept ranges")
         checkbox_layout.addWidget(self.mp3_check)
         checkbox_layout.addWidget(self.mp4_check)
         checkbox_layout.addWidget(self.sponsorblock_check)
+        checkbox_layout.addWidget(self.sections_check)
+        self.sync_check = QCheckBox("Sync playlists")
+        self.sync_check.setToolTip("Only process playlist entries that are new or changed since the last run")
+        self.sync_check.setChecked(self.config.get('sync_mode', False))
+        self.sync_check.stateChanged.connect(self.on_sync_changed)
+        checkbox_layout.addWidget(self.sync_check)
         layout.addLayout(checkbox_layout)
 
         # Connect checkbox signals
@@ -210,19 +347,54 @@ class YouTubeDownloaderGUI(QWidget):
         self.console_button.setStyleSheet("background-color: #4b4b4b;")
         layout.addWidget(self.console_button)
 
+        # Queue status and controls
+        queue_layout = QHBoxLayout()
+        self.queue_label = QLabel("Queued: 0 | Running: 0 | Avg wait: 0.0s")
+        queue_layout.addWidget(self.queue_label)
+        self.pause_button = QPushButton("Pause Queue")
+        self.pause_button.clicked.connect(self.toggle_pause)
+        self.pause_button.setStyleSheet("background-color: #4b4b4b;")
+        queue_layout.addWidget(self.pause_button)
+        self.cancel_button = QPushButton("Cancel Selected")
+        self.cancel_button.clicked.connect(self.cancel_selected)
+        self.cancel_button.setStyleSheet("background-color: #4b4b4b;")
+        queue_layout.addWidget(self.cancel_button)
+        layout.addLayout(queue_layout)
+
         # Stacked widget for console output and download list
         self.stacked_widget = QStackedWidget()
         
         # Download list
-        self.download_list = QListWidget()
+        self.download_model = DownloadListModel(self)
+        self.download_list = DownloadListView()
+        self.download_list.setModel(self.download_model)
         self.download_list.setStyleSheet("background-color: #3b3b3b; border: 1px solid #555555;")
         self.stacked_widget.addWidget(self.download_list)
 
-        # Console output
-        self.progress_text = QTextEdit()
+        # Console output; the widget holds at most as many lines as the log buffer
+        console_widget = QWidget()
+        console_layout = QVBoxLayout(console_widget)
+        console_layout.setContentsMargins(0, 0, 0, 0)
+        level_layout = QHBoxLayout()
+        level_layout.addWidget(QLabel("Log level:"))
+        self.log_level_combo = QComboBox()
+        self.log_level_combo.addItems(list(LEVELS))
+        self.log_level_combo.setCurrentText(self.config.get('log_level', 'INFO'))
+        self.log_level_combo.currentTextChanged.connect(self.on_log_level_changed)
+        level_layout.addWidget(self.log_level_combo)
+        level_layout.addStretch()
+        console_layout.addLayout(level_layout)
+        self.progress_text = QPlainTextEdit()
         self.progress_text.setReadOnly(True)
+        self.progress_text.setMaximumBlockCount(self.log_sink.capacity)
         self.progress_text.setStyleSheet("background-color: #3b3b3b; border: 1px solid #555555;")
-        self.stacked_widget.addWidget(self.progress_text)
+        console_layout.addWidget(self.progress_text)
+        self.stacked_widget.addWidget(console_widget)
+
+        # Log lines are appended in batches rather than one relayout per message
+        self.log_timer = QTimer(self)
+        self.log_timer.timeout.connect(self.flush_log)
+        self.log_timer.start(self.config.get('log_flush_ms', 200))
 
         layout.addWidget(self.stacked_widget)
 
@@ -240,7 +412,44 @@ class YouTubeDownloaderGUI(QWidget):
             self.stacked_widget.setCurrentIndex(0)
             self.console_button.setText("Show Console")
 
+    def flush_log(self):
+        lines = self.log_sink.drain()
+        if not lines:
+            return
+        scrollbar = self.progress_text.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 4
+        self.progress_text.appendPlainText('\n'.join(lines))
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def on_log_level_changed(self, level_name):
+        self.log_sink.set_view_level(LEVELS[level_name])
+        self.config['log_level'] = level_name
+        self.save_config()
+        # Redraw from the ring buffer so lines of the newly selected levels show up
+        self.log_sink.drain()
+        self.progress_text.setPlainText('\n'.join(self.log_sink.lines()))
+        self.progress_text.verticalScrollBar().setValue(self.progress_text.verticalScrollBar().maximum())
+
+    def get_worker_pool(self):
+        # With the 'process' backend jobs run in worker processes and this interpreter only renders
+        if self.config.get('backend', 'thread') != 'process':
+            return None
+        return get_worker_pool(self.config.get('worker_processes', self.scheduler.max_running), self.config.get('progress_rate_hz', 10.0))
+
+    def warm_up_pipeline(self):
+        if self.get_worker_pool() is not None:
+            # The workers import the pipeline; the GUI process never needs it
+            return
+
+        def warm_up():
+            started = time.perf_counter()
+            load_pipeline()
+            self.logger.debug(f"Download pipeline loaded in {time.perf_counter() - started:.2f}s")
+        threading.Thread(target=warm_up, daemon=True).start()
+
     def paste_url(self):
+        import pyperclip
         url = pyperclip.paste()
         self.start_download(url)
 
@@ -257,61 +466,104 @@ class YouTubeDownloaderGUI(QWidget):
         self.config['mp4_output'] = self.mp4_output.text()
         self.save_config()
 
+    def on_sync_changed(self):
+        self.config['sync_mode'] = self.sync_check.isChecked()
+        self.save_config()
+
+    def reconcile_archive(self):
+        # Runs off the GUI thread; only stat()s the recorded files
+        removed = get_archive().reconcile()
+        if removed:
+            self.logger.info(f"Archive index: dropped {removed} entries whose files are gone or changed")
+
     def start_download(self, url):
         if not url:
-            self.progress_text.append("Please paste a YouTube URL.")
+            self.logger.warning("Please paste a YouTube URL.")
             return
 
+        if self.mp3_check.isChecked() and self.mp4_check.isChecked():
+            # One download produces both outputs
+            format = "both"
+        else:
+            format = "mp3" if self.mp3_check.isChecked() else "mp4"
+        options = {
+            'format': format,
+            'output_path': self.mp3_output.text() if format == "mp3" else self.mp4_output.text(),
+            'mp3_output_path': self.mp3_output.text(),
+            'use_sponsorblock': self.sponsorblock_check.isChecked(),
+            'segment_types': [segment_type for segment_type, checkbox in self.segment_checkboxes.items() if checkbox.isChecked()],
+            'download_sections': self.sections_check.isChecked(),
+            'sync': self.sync_check.isChecked(),
+        }
+        self.queue_download(url, options)
+
+    def resume_jobs(self):
+        # Jobs still in the journal were interrupted by a crash or by closing the app
+        for journal_id, url, options in get_journal().unfinished_jobs():
+            self.logger.info(f"Resuming interrupted download: {url}")
+            self.queue_download(url, options, journal_id)
+
+    def queue_download(self, url, options, journal_id=None):
+        """
+        Queue a download job.
+
+        Args:
+            url (str): The video or playlist URL.
+            options (dict): format, output_path, mp3_output_path, use_sponsorblock, segment_types,
+                download_sections and sync, as chosen in the window when the job was created.
+            journal_id (int, optional): Journal ID of a resumed job; new jobs are added to the journal.
+        """
         is_playlist, playlist_id = self.is_playlist_url(url)
         video_id = self.extract_video_id(url)
         
         if is_playlist:
             if playlist_id in self.active_playlist_ids:
-                self.progress_text.append(f"Already downloading playlist: {playlist_id}")
+                self.logger.info(f"Already downloading playlist: {playlist_id}")
                 return
             self.active_playlist_ids.add(playlist_id)
         elif video_id:
+            # Repeated videos still get a job: the in-flight registry attaches it to the running
+            # one (or to a playlist containing the video), so nothing is downloaded twice
             if video_id in self.active_video_ids:
-                self.progress_text.append(f"Already downloading video: {video_id}")
-                return
+                self.logger.info(f"Already downloading video: {video_id}. The new request will share it.")
             self.active_video_ids.add(video_id)
         else:
-            self.progress_text.append("Invalid YouTube URL.")
+            self.logger.warning("Invalid YouTube URL.")
             return
 
-        format = "mp3" if self.mp3_check.isChecked() else "mp4"
-        output_path = self.mp3_output.text() if format == "mp3" else self.mp4_output.text()
-
-        use_sponsorblock = self.sponsorblock_check.isChecked()
-        selected_segment_types = [segment_type for segment_type, checkbox in self.segment_checkboxes.items() if checkbox.isChecked()]
-
-        thread = DownloadThread(url, output_path, format, use_sponsorblock, is_playlist, selected_segment_types)
-        thread.update_progress.connect(self.update_progress)
-        thread.finished.connect(lambda result, u=url, pid=playlist_id, vid=video_id: 
-                                self.download_finished(result, u, pid, vid))
-        thread.start()
-
-        self.download_threads.append(thread)
+        format = options['format']
+        output_path = options['output_path']
+        mp3_output_path = options['mp3_output_path']
+        use_sponsorblock = options['use_sponsorblock']
+        selected_segment_types = options['segment_types']
+        download_sections = options['download_sections']
+        sync = options['sync']
+        playlist_concurrency = self.config.get('playlist_concurrency', 3) if is_playlist else 1
+        # Each CPU slot gets its share of the cores for parallel re-encodes
+        encode_workers = self.config.get('encode_workers', max(1, (os.cpu_count() or 1) // self.scheduler.slots.limits['cpu']))
+
+        def make_thread(job_id, stage_gate):
+            thread = DownloadThread(url, output_path, format, use_sponsorblock, is_playlist, selected_segment_types, download_sections, stage_gate, playlist_concurrency, sync, encode_workers, mp3_output_path,
+                                    self.config.get('progress_rate_hz', 10.0), self.get_worker_pool(), f"gui-{job_id}")
+            # Signals are routed by job ID: the same URL may be queued more than once
+            thread.update_progress.connect(lambda u, percentage, stage, j=job_id: self.update_progress(j, percentage, stage))
+            thread.finished.connect(lambda u, result, j=job_id, pid=playlist_id, vid=video_id:
+                                    self.download_finished(j, u, result, pid, vid))
+            return thread
+
+        # Single videos go ahead of playlists
+        job_id = self.scheduler.submit(make_thread, priority=1 if is_playlist else 0)
+        self.jobs[job_id] = (url, playlist_id, video_id)
+        self.journal_ids[job_id] = journal_id if journal_id is not None else get_journal().add_job(url, options)
         self.active_downloads.add(url)
-        self.progress_text.append(f"Starting {'playlist' if is_playlist else 'video'} download: {url} ({format})")
-
-        # Add item to download list with text spinner
-        item_widget = QWidget()
-        item_layout = QHBoxLayout(item_widget)
-        item_layout.addWidget(QLabel(f"{'Playlist' if is_playlist else 'Video'} {format.upper()} - {url}"))
-        spinner = TextSpinner()
-        item_layout.addWidget(spinner)
-        item_widget.setLayout(item_layout)
-
-        list_item = QListWidgetItem(self.download_list)
-        list_item.setSizeHint(item_widget.sizeHint())
-        self.download_list.addItem(list_item)
-        self.download_list.setItemWidget(list_item, item_widget)
-
-        # Store the spinner in a dictionary for easy access
-        if not hasattr(self, 'spinners'):
-            self.spinners = {}
-        self.spinners[url] = spinner
+        self.logger.info(f"Starting {'playlist' if is_playlist else 'video'} download: {url} ({format})")
+
+        # Add a row to the download list; the view animates every row's spinner from one timer
+        concurrency_label = f" x{playlist_concurrency}" if is_playlist else ""
+        # The info cache is shared with the download stage, so a video seen before shows its title right away
+        title = get_info_cache().get_title(video_id) if video_id and not is_playlist else None
+        title_label = f" - {title}" if title else ""
+        self.download_model.add_job(job_id, f"{'Playlist' if is_playlist else 'Video'} {'MP4+MP3' if format == 'both' else format.upper()}{concurrency_label}{title_label} - {url}")
 
     def is_playlist_url(self, url):
         playlist_patterns = [
@@ -337,39 +589,62 @@ class YouTubeDownloaderGUI(QWidget):
                 return match.group(1)
         return None
 
-    def update_progress(self, url, percentage):
-        if url in self.spinners:
-            spinner = self.spinners[url]
-            if percentage != -1:
-                spinner.set_percentage(f"{percentage:.1f}%")
-            else:
-                spinner.set_percentage("Error")
-
-    def download_finished(self, url, result, playlist_id=None, video_id=None):
-        self.progress_text.append(f"Download completed: {result}")
-        self.progress_text.verticalScrollBar().setValue(self.progress_text.verticalScrollBar().maximum())
+    def update_progress(self, job_id, percentage, stage):
+        # A percentage of -1 marks a failed job
+        self.download_model.set_progress(job_id, percentage, stage)
+
+    def download_finished(self, job_id, url, result, playlist_id=None, video_id=None):
+        self.logger.info(f"Download completed: {result}")
+        summary = job_summary(f"gui-{job_id}")
+        if summary:
+            self.logger.info(f"Timing: {summary}")
+        if self.config.get('metrics_file'):
+            self.write_metrics(self.config['metrics_file'])
+        pool_stats = get_ydl_pool().get_stats()
+        if pool_stats['reused']:
+            self.logger.info(f"YoutubeDL pool: {pool_stats['reused']} reused, ~{pool_stats['saved_seconds']:.1f}s setup saved")
         if playlist_id:
             self.active_playlist_ids.discard(playlist_id)
         if video_id:
             self.active_video_ids.discard(video_id)
         self.active_downloads.discard(url)
 
+        # Finished, failed and cancelled jobs are not resumed after a restart
+        journal_id = self.journal_ids.pop(job_id, None)
+        if journal_id is not None:
+            get_journal().finish_job(journal_id)
+
         # Remove the completed download from the list
-        for i in range(self.download_list.count()):
-            item = self.download_list.item(i)
-            widget = self.download_list.itemWidget(item)
-            if widget.layout().itemAt(0).widget().text().endswith(url):
-                self.download_list.takeItem(i)
-                break
+        self.download_model.remove_job(job_id)
+
+    def update_queue_status(self, queued, running, average_wait):
+        self.queue_label.setText(f"Queued: {queued} | Running: {running} | Avg wait: {average_wait:.1f}s")
+
+    def toggle_pause(self):
+        if self.scheduler.paused:
+            self.scheduler.resume()
+            self.pause_button.setText("Pause Queue")
+        else:
+            self.scheduler.pause()
+            self.pause_button.setText("Resume Queue")
+
+    def cancel_selected(self):
+        index = self.download_list.currentIndex()
+        if not index.isValid():
+            return
+        job_id = index.data(DownloadListModel.JobIdRole)
+        if self.scheduler.cancel(job_id):
+            self.logger.info(f"Cancelling job {job_id}")
+
+    def on_job_cancelled(self, job_id):
+        url, playlist_id, video_id = self.jobs.pop(job_id, (None, None, None))
+        if url is not None:
+            self.download_finished(job_id, url, "Cancelled", playlist_id, video_id)
 
     def on_format_changed(self, state):
         sender = self.sender()
-        if state == Qt.Checked:
-            if sender == self.mp3_check:
-                self.mp4_check.setChecked(False)
-            else:
-                self.mp3_check.setChecked(False)
-        else:
+        # Both formats may be checked at once; each video is then downloaded once for both
+        if state != Qt.Checked:
             # Ensure at least one format is always checked
             if sender == self.mp3_check and not self.mp4_check.isChecked():
                 self.mp4_check.setChecked(True)
@@ -381,8 +656,11 @@ class YouTubeDownloaderGUI(QWidget):
         for checkbox in self.segment_checkboxes.values():
             checkbox.setVisible(use_sponsorblock)
             checkbox.setChecked(use_sponsorblock)
+        self.sections_check.setVisible(use_sponsorblock)
 
 if __name__ == '__main__':
+    # Worker processes of frozen builds start through this executable
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
     
@@ -405,4 +683,6 @@ if __name__ == '__main__':
     
     ex = YouTubeDownloaderGUI()
     ex.show()
+    app.aboutToQuit.connect(get_ydl_pool().close)
+    app.aboutToQuit.connect(close_worker_pool)
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,114 @@
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from archive import categories_key
+from progress import ProgressMessage
+
+InflightKey = Tuple[str, str, str, str]
+
+def inflight_key(video_id: str, format: str, segment_types: Optional[List[str]], output_path: str) -> InflightKey:
+    """Key of a job in the registry: video ID, output format, the segment categories removed and the output directory."""
+    return (video_id, format, categories_key(segment_types), os.path.realpath(output_path))
+
+class InflightJob:
+    """
+    A job that is being processed, shared by every request for the same key.
+
+    The owner reports progress through publish() and the result through the registry;
+    attached requests listen to the progress and wait() for the result.
+    """
+
+    def __init__(self, key: InflightKey):
+        self.key = key
+        self.done = threading.Event()
+        self.result: Optional[str] = None
+        self.lock = threading.Lock()
+        self.listeners: List[Callable[[ProgressMessage], None]] = []
+
+    def add_listener(self, listener: Callable[[ProgressMessage], None]):
+        with self.lock:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[ProgressMessage], None]):
+        with self.lock:
+            if listener in self.listeners:
+                self.listeners.remove(listener)
+
+    def publish(self, message: ProgressMessage):
+        # Attached listeners must not break the owner's download, e.g. when their job is cancelled
+        with self.lock:
+            listeners = list(self.listeners)
+        for listener in listeners:
+            try:
+                listener(message)
+            except Exception:
+                self.remove_listener(listener)
+
+    def wait(self, check_cancelled: Callable[[], None] = None) -> Optional[str]:
+        """
+        Wait for the owner to finish.
+
+        Args:
+            check_cancelled (Callable[[], None], optional): Called while waiting; raises to stop waiting.
+
+        Returns:
+            Optional[str]: The owner's result, None if it failed.
+        """
+        while not self.done.wait(0.5):
+            if check_cancelled:
+                check_cancelled()
+        return self.result
+
+class InflightRegistry:
+    """
+    Jobs in progress keyed by (video ID, format, segment categories, output directory).
+
+    A request first claims its key. The first claimant owns the job and processes it; later
+    identical requests get the same job back and attach to it instead of downloading again.
+    A request for another output directory is not identical: it would get a file outside its own.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs: Dict[InflightKey, InflightJob] = {}
+
+    def claim(self, key: InflightKey) -> Tuple[InflightJob, bool]:
+        """
+        Claim a key.
+
+        Returns:
+            Tuple[InflightJob, bool]: The job, and True if the caller owns it and must finish() it.
+        """
+        with self.lock:
+            job = self.jobs.get(key)
+            if job is not None:
+                return job, False
+            job = self.jobs[key] = InflightJob(key)
+            return job, True
+
+    def get(self, key: InflightKey) -> Optional[InflightJob]:
+        with self.lock:
+            return self.jobs.get(key)
+
+    def find(self, video_id: str, format: str, segment_types: Optional[List[str]] = None) -> Optional[InflightJob]:
+        """Return a job for the video, format and segment categories, whatever its output directory."""
+        categories = categories_key(segment_types)
+        with self.lock:
+            for key, job in self.jobs.items():
+                if key[:3] == (video_id, format, categories):
+                    return job
+        return None
+
+    def finish(self, job: InflightJob, result: Optional[str]):
+        """Publish the owner's result to the attached requests and release the key."""
+        with self.lock:
+            if self.jobs.get(job.key) is job:
+                del self.jobs[job.key]
+        job.result = result
+        job.done.set()
+
+_registry = InflightRegistry()
+
+def get_inflight_registry() -> InflightRegistry:
+    """Return the process-wide in-flight job registry."""
+    return _registry
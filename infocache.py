@@ -0,0 +1,171 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+DEFAULT_INFO_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ytdlp-gui", "info.sqlite3")
+INFO_TTL = 6 * 60 * 60              # Upper bound even when no format URL carries an expiry
+EXPIRY_MARGIN = 10 * 60             # Leave time for the download itself before a signed URL expires
+MAX_CACHE_BYTES = 64 * 1024 * 1024  # Least recently used entries are evicted past this size
+
+# Large fields that are never needed to download or cut a video
+_DROPPED_KEYS = ('automatic_captions', 'heatmap', 'thumbnails')
+
+_EXPIRE_RE = re.compile(r'[?&/]expire[=/](\d+)')
+
+def url_expiry(info: dict) -> Optional[float]:
+    """
+    Earliest expiry of the signed format URLs of an info dict.
+
+    YouTube signs format and manifest URLs with an 'expire' timestamp, either as a query
+    parameter or as a path component.
+
+    Args:
+        info (dict): A resolved yt-dlp info dict.
+
+    Returns:
+        Optional[float]: Unix time at which the first URL stops working, or None if no URL is signed.
+    """
+    expiries = []
+    for fmt in info.get('formats') or []:
+        for key in ('url', 'manifest_url', 'fragment_base_url'):
+            match = _EXPIRE_RE.search(fmt.get(key) or '')
+            if match:
+                expiries.append(float(match.group(1)))
+    return min(expiries) if expiries else None
+
+class InfoCache:
+    """
+    On-disk cache of resolved yt-dlp info dicts keyed by video ID.
+
+    Each entry holds the sanitized info dict (title, duration, formats, chapters, ...) and the
+    final path of the last file produced from it. An entry expires after the TTL or shortly
+    before its signed format URLs do, whichever comes first; past MAX_CACHE_BYTES the least
+    recently used entries are evicted.
+    """
+
+    def __init__(self, path: str = DEFAULT_INFO_CACHE_PATH, ttl: float = INFO_TTL, max_bytes: int = MAX_CACHE_BYTES):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS info (
+            video_id TEXT PRIMARY KEY,
+            title TEXT,
+            info TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            file_path TEXT,
+            expires_at REAL NOT NULL,
+            accessed_at REAL NOT NULL)""")
+        self.conn.commit()
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'stores': 0, 'evicted': 0}
+
+    def get(self, video_id: str) -> Optional[dict]:
+        """
+        Look up the info dict of a video.
+
+        Args:
+            video_id (str): The YouTube video ID.
+
+        Returns:
+            Optional[dict]: The cached info dict, or None on a miss or if its format URLs expired.
+        """
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT info, expires_at FROM info WHERE video_id = ?", (video_id,)).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            if now >= row[1]:
+                self.stats['expired'] += 1
+                self.conn.execute("DELETE FROM info WHERE video_id = ?", (video_id,))
+                self.conn.commit()
+                return None
+            self.conn.execute("UPDATE info SET accessed_at = ? WHERE video_id = ?", (now, video_id))
+            self.conn.commit()
+            self.stats['hits'] += 1
+        return json.loads(row[0])
+
+    def put(self, video_id: str, info: dict, file_path: Optional[str] = None):
+        """
+        Store the info dict of a video.
+
+        Args:
+            video_id (str): The YouTube video ID.
+            info (dict): The resolved info dict, as returned by extract_info or process_ie_result.
+            file_path (Optional[str]): Final path of the file produced from it, if any.
+        """
+        # The GUI reads titles from the cache at startup; yt-dlp is only needed to store entries
+        from yt_dlp import YoutubeDL
+        sanitized = YoutubeDL.sanitize_info(info, remove_private_keys=True)
+        for key in _DROPPED_KEYS:
+            sanitized.pop(key, None)
+        data = json.dumps(sanitized)
+        now = time.time()
+        expires_at = now + self.ttl
+        expiry = url_expiry(sanitized)
+        if expiry is not None:
+            expires_at = min(expires_at, expiry - EXPIRY_MARGIN)
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO info VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              (video_id, sanitized.get('title'), data, len(data), file_path, expires_at, now))
+            self.stats['stores'] += 1
+            self._evict()
+            self.conn.commit()
+
+    def set_file_path(self, video_id: str, file_path: str):
+        with self.lock:
+            self.conn.execute("UPDATE info SET file_path = ? WHERE video_id = ?", (file_path, video_id))
+            self.conn.commit()
+
+    def get_title(self, video_id: str) -> Optional[str]:
+        """Return the cached title of a video. Titles do not expire with the format URLs."""
+        with self.lock:
+            row = self.conn.execute("SELECT title FROM info WHERE video_id = ?", (video_id,)).fetchone()
+        return row[0] if row else None
+
+    def get_file_path(self, video_id: str) -> Optional[str]:
+        with self.lock:
+            row = self.conn.execute("SELECT file_path FROM info WHERE video_id = ?", (video_id,)).fetchone()
+        return row[0] if row else None
+
+    def invalidate(self, video_id: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM info WHERE video_id = ?", (video_id,))
+            self.conn.commit()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.lock:
+            stats = dict(self.stats)
+            stats['entries'], stats['bytes'] = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM info").fetchone()
+        return stats
+
+    def _evict(self):
+        # Called with the lock held: drop expired rows, then least recently used ones until under the limit
+        self.conn.execute("DELETE FROM info WHERE expires_at <= ?", (time.time(),))
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM info").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for video_id, size in self.conn.execute("SELECT video_id, size FROM info ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            stale.append((video_id,))
+            total -= size
+        self.conn.executemany("DELETE FROM info WHERE video_id = ?", stale)
+        self.stats['evicted'] += len(stale)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_info_cache() -> InfoCache:
+    """Return the shared info-dict cache, opening it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = InfoCache()
+        return _cache
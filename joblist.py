@@ -0,0 +1,137 @@
+from typing import Dict, List, Optional
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QRect, QSize, Qt, QTimer
+from PyQt5.QtWidgets import QListView, QStyle, QStyledItemDelegate
+
+SPINNER_CHARS = ['|', '/', '-', '\\']
+
+class JobRow:
+    __slots__ = ('job_id', 'text', 'percent', 'stage')
+
+    def __init__(self, job_id: int, text: str):
+        self.job_id = job_id
+        self.text = text
+        self.percent: Optional[float] = None  # -1 marks a failed job
+        self.stage = ''
+
+class DownloadListModel(QAbstractListModel):
+    """
+    Rows of the download list, one per scheduled job.
+
+    Rows are looked up by job ID through a dict, so progress updates and removals do not scan
+    the list. A progress update only marks its own row as changed.
+    """
+    JobIdRole = Qt.UserRole
+    PercentRole = Qt.UserRole + 1
+    StageRole = Qt.UserRole + 2
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows: List[JobRow] = []
+        self.row_of: Dict[int, int] = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.rows):
+            return None
+        row = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            return row.text
+        if role == self.JobIdRole:
+            return row.job_id
+        if role == self.PercentRole:
+            return row.percent
+        if role == self.StageRole:
+            return row.stage
+        return None
+
+    def add_job(self, job_id: int, text: str):
+        position = len(self.rows)
+        self.beginInsertRows(QModelIndex(), position, position)
+        self.rows.append(JobRow(job_id, text))
+        self.row_of[job_id] = position
+        self.endInsertRows()
+
+    def remove_job(self, job_id: int) -> bool:
+        position = self.row_of.pop(job_id, None)
+        if position is None:
+            return False
+        self.beginRemoveRows(QModelIndex(), position, position)
+        del self.rows[position]
+        # Only the rows after the removed one move up
+        for i in range(position, len(self.rows)):
+            self.row_of[self.rows[i].job_id] = i
+        self.endRemoveRows()
+        return True
+
+    def set_progress(self, job_id: int, percent: float, stage: str = ''):
+        position = self.row_of.get(job_id)
+        if position is None:
+            return
+        row = self.rows[position]
+        row.percent = percent
+        row.stage = stage
+        index = self.index(position)
+        self.dataChanged.emit(index, index, [self.PercentRole, self.StageRole])
+
+class DownloadItemDelegate(QStyledItemDelegate):
+    """Draws a row: the job label on the left, the spinner and progress on the right."""
+    ROW_HEIGHT = 28
+
+    def paint(self, painter, option, index):
+        painter.save()
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        painter.setPen(option.palette.highlightedText().color() if option.state & QStyle.State_Selected else option.palette.text().color())
+
+        percent = index.data(DownloadListModel.PercentRole)
+        if percent == -1:
+            status = "Error"
+        else:
+            spinner = SPINNER_CHARS[getattr(self.parent(), 'frame', 0) % len(SPINNER_CHARS)]
+            stage = 'Cutting ' if index.data(DownloadListModel.StageRole) == 'cut' else ''
+            status = f"{spinner} {stage}{percent:.1f}%" if percent is not None else spinner
+
+        rect = option.rect.adjusted(8, 0, -8, 0)
+        status_width = option.fontMetrics.horizontalAdvance(status) + 8
+        text_rect = QRect(rect.left(), rect.top(), max(0, rect.width() - status_width), rect.height())
+        text = option.fontMetrics.elidedText(index.data(Qt.DisplayRole) or '', Qt.ElideMiddle, text_rect.width())
+        painter.drawText(text_rect, Qt.AlignVCenter | Qt.AlignLeft, text)
+        painter.drawText(rect, Qt.AlignVCenter | Qt.AlignRight, status)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+class DownloadListView(QListView):
+    """
+    List view of the download jobs with one animation clock for every spinner.
+
+    The clock ticks only while there are rows, and each tick repaints the viewport, so only the
+    rows on screen are drawn again however many jobs are queued.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.frame = 0
+        self.setUniformItemSizes(True)
+        self.setItemDelegate(DownloadItemDelegate(self))
+        self.clock = QTimer(self)
+        self.clock.setInterval(100)
+        self.clock.timeout.connect(self.tick)
+
+    def setModel(self, model):
+        super().setModel(model)
+        model.rowsInserted.connect(self.update_clock)
+        model.rowsRemoved.connect(self.update_clock)
+
+    def update_clock(self, *args):
+        if self.model().rowCount() and not self.clock.isActive():
+            self.clock.start()
+        elif not self.model().rowCount():
+            self.clock.stop()
+
+    def tick(self):
+        self.frame += 1
+        self.viewport().update()
@@ -0,0 +1,146 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+from archive import categories_key
+
+DEFAULT_JOURNAL_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ytdlp-gui", "journal.sqlite3")
+STALE_AFTER = 7 * 24 * 60 * 60     # Unfinished entries older than this are not resumed
+
+# Stages of a video in the order they complete. The info dict is not journaled: the info cache
+# already keeps it on disk, so a resumed job does not extract again.
+STAGES = ('segments', 'downloaded', 'cut')
+
+def stage_key(video_id: str, format: str, segment_types: Optional[List[str]] = None) -> str:
+    """Journal key of a video's processing: video ID, output format and the segment categories removed."""
+    return f"{video_id}|{format}|{categories_key(segment_types)}"
+
+class StageEntry:
+    """
+    Progress of one video through the pipeline, as recorded in the journal.
+
+    Args:
+        stage (str): Last completed stage, one of STAGES.
+        segments (Optional[List[Tuple[float, float]]]): The segments to remove, once fetched.
+        file_path (Optional[str]): The downloaded file, or the output once cut.
+        media (Optional[dict]): Duration and codecs of the downloaded file.
+    """
+
+    def __init__(self, stage: str, segments: Optional[List[Tuple[float, float]]] = None, file_path: Optional[str] = None,
+                 media: Optional[dict] = None):
+        self.stage = stage
+        self.segments = segments
+        self.file_path = file_path
+        self.media = media
+
+    def reached(self, stage: str) -> bool:
+        return STAGES.index(self.stage) >= STAGES.index(stage)
+
+class JobJournal:
+    """
+    Persistent record of submitted jobs and of the stages each video has completed.
+
+    Jobs are recorded when they are queued and removed when they end, so the ones left at
+    startup were interrupted and can be queued again. Stage entries let a resumed job skip
+    the work already done: the segment lookup, the download, or the cut. A finished video's
+    entry is removed, so a later request for it starts over as usual.
+    """
+
+    def __init__(self, path: str = DEFAULT_JOURNAL_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT NOT NULL,
+            options TEXT NOT NULL,
+            created_at REAL NOT NULL)""")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS stages (
+            key TEXT PRIMARY KEY,
+            stage TEXT NOT NULL,
+            segments TEXT,
+            file_path TEXT,
+            media TEXT,
+            updated_at REAL NOT NULL)""")
+        cutoff = time.time() - STALE_AFTER
+        self.conn.execute("DELETE FROM jobs WHERE created_at < ?", (cutoff,))
+        self.conn.execute("DELETE FROM stages WHERE updated_at < ?", (cutoff,))
+        self.conn.commit()
+
+    def add_job(self, url: str, options: dict) -> int:
+        """
+        Record a queued job.
+
+        Args:
+            url (str): The video or playlist URL.
+            options (dict): JSON-serializable options needed to queue the job again.
+
+        Returns:
+            int: The journal ID of the job, for finish_job().
+        """
+        with self.lock:
+            cursor = self.conn.execute("INSERT INTO jobs (url, options, created_at) VALUES (?, ?, ?)", (url, json.dumps(options), time.time()))
+            self.conn.commit()
+            return cursor.lastrowid
+
+    def finish_job(self, journal_id: int):
+        with self.lock:
+            self.conn.execute("DELETE FROM jobs WHERE id = ?", (journal_id,))
+            self.conn.commit()
+
+    def unfinished_jobs(self) -> List[Tuple[int, str, dict]]:
+        """Return (journal ID, URL, options) of the jobs that were queued but never ended, oldest first."""
+        with self.lock:
+            rows = self.conn.execute("SELECT id, url, options FROM jobs ORDER BY id").fetchall()
+        return [(journal_id, url, json.loads(options)) for journal_id, url, options in rows]
+
+    def record(self, key: str, stage: str, segments: Optional[List[Tuple[float, float]]] = None, file_path: Optional[str] = None,
+               media: Optional[dict] = None):
+        """
+        Record that a video completed a stage. Fields not given keep their recorded values.
+
+        Args:
+            key (str): The stage_key() of the video.
+            stage (str): The completed stage, one of STAGES.
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage: {stage}")
+        with self.lock:
+            self.conn.execute("""INSERT INTO stages (key, stage, segments, file_path, media, updated_at)
+                                 VALUES (?, ?, ?, ?, ?, ?)
+                                 ON CONFLICT(key) DO UPDATE SET stage = excluded.stage,
+                                     segments = COALESCE(excluded.segments, segments),
+                                     file_path = COALESCE(excluded.file_path, file_path),
+                                     media = COALESCE(excluded.media, media),
+                                     updated_at = excluded.updated_at""",
+                              (key, stage, None if segments is None else json.dumps(segments), file_path,
+                               None if media is None else json.dumps(media), time.time()))
+            self.conn.commit()
+
+    def get(self, key: str) -> Optional[StageEntry]:
+        with self.lock:
+            row = self.conn.execute("SELECT stage, segments, file_path, media FROM stages WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        stage, segments, file_path, media = row
+        return StageEntry(stage, [tuple(segment) for segment in json.loads(segments)] if segments else None,
+                          file_path, json.loads(media) if media else None)
+
+    def finalize(self, key: str):
+        """The video is done; forget its stages."""
+        with self.lock:
+            self.conn.execute("DELETE FROM stages WHERE key = ?", (key,))
+            self.conn.commit()
+
+_journal = None
+_journal_lock = threading.Lock()
+
+def get_journal() -> JobJournal:
+    """Return the shared job journal, opening it on first use."""
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = JobJournal()
+        return _journal
@@ -0,0 +1,98 @@
+import logging
+import logging.handlers
+import os
+import threading
+from collections import deque
+from typing import List, Optional, Tuple
+
+LOGGER_NAME = 'ytdlp_gui'
+DEFAULT_LOG_CAPACITY = 5000                 # Lines kept in memory for the console
+DEFAULT_LOG_FILE_BYTES = 5 * 1024 * 1024    # Size at which the log file is rotated
+DEFAULT_LOG_FILE_BACKUPS = 3
+
+LEVELS = {'DEBUG': logging.DEBUG, 'INFO': logging.INFO, 'WARNING': logging.WARNING, 'ERROR': logging.ERROR}
+
+class LogSink(logging.Handler):
+    """
+    Logging handler that keeps the last `capacity` lines in a ring buffer for the GUI console.
+
+    Records are only queued here; the GUI drains them on a timer and appends each batch to
+    its widget at once. Lines below the view level are kept in the buffer but not shown, so
+    lowering the level brings back the recent ones.
+
+    Args:
+        capacity (int): Number of lines kept; older lines are dropped.
+        view_level (int): Minimum level of the lines returned by drain() and lines().
+    """
+
+    def __init__(self, capacity: int = DEFAULT_LOG_CAPACITY, view_level: int = logging.INFO):
+        super().__init__(logging.DEBUG)
+        self.setFormatter(logging.Formatter('%(message)s'))
+        self.capacity = capacity
+        self.view_level = view_level
+        self.buffer_lock = threading.Lock()
+        self.records: deque = deque(maxlen=capacity)
+        self.pending: deque = deque(maxlen=capacity)
+        self.dropped = 0
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            entry = (record.levelno, self.format(record))
+        except Exception:
+            self.handleError(record)
+            return
+        with self.buffer_lock:
+            if len(self.pending) == self.capacity:
+                # The console fell a whole buffer behind; the oldest pending line is lost
+                self.dropped += 1
+            self.records.append(entry)
+            self.pending.append(entry)
+
+    def drain(self) -> List[str]:
+        """Return and clear the lines logged since the last drain, at or above the view level."""
+        with self.buffer_lock:
+            pending = list(self.pending)
+            self.pending.clear()
+        return [text for levelno, text in pending if levelno >= self.view_level]
+
+    def lines(self) -> List[str]:
+        """Return every buffered line at or above the view level, oldest first."""
+        with self.buffer_lock:
+            records: List[Tuple[int, str]] = list(self.records)
+        return [text for levelno, text in records if levelno >= self.view_level]
+
+    def set_view_level(self, level: int):
+        self.view_level = level
+
+def get_logger() -> logging.Logger:
+    """Return the application logger. Messages for the console go through it."""
+    logger = logging.getLogger(LOGGER_NAME)
+    if logger.level == logging.NOTSET:
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+    return logger
+
+def add_log_file(path: str, max_bytes: int = DEFAULT_LOG_FILE_BYTES, backup_count: int = DEFAULT_LOG_FILE_BACKUPS,
+                 level: int = logging.INFO) -> Optional[logging.Handler]:
+    """
+    Also write the application log to a rotating file.
+
+    Args:
+        path (str): Log file path.
+        max_bytes (int): Size at which the file is rotated.
+        backup_count (int): Number of rotated files kept.
+        level (int): Minimum level written to the file.
+
+    Returns:
+        Optional[logging.Handler]: The file handler, or None if the file cannot be opened.
+    """
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    except OSError as e:
+        print(f"Cannot open log file {path}: {e}")
+        return None
+    handler.setLevel(level)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+    get_logger().addHandler(handler)
+    return handler
@@ -1,53 +1,348 @@
 import os
+import queue
 import subprocess
 import re
-from typing import List, Optional  # Modified this line
-from download import download_video
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple  # Modified this line
+from download import download_and_cut, download_playlist, download_video, download_video_ranges
 from sponser import get_sponsor_segments
-from cutseg import cut_segments_mp3, cut_segments_mp4
+from cutseg import cut_segments_both, cut_segments_mp3, cut_segments_mp4, extract_audio_mp3, removed_duration
+from archive import categories_key, get_archive, segments_fingerprint
+from mediainfo import MediaInfo
+from inflight import InflightJob, get_inflight_registry, inflight_key
+from progress import labelled
+from journal import StageEntry, get_journal, stage_key
+from tracing import current_job, job_context, span
 
-def process_video(url: str, output_path: str, format: str = 'mp4', use_sponsorblock: bool = True, segment_types: Optional[List[str]] = None, progress_callback=None):
+def process_video(url: str, output_path: str, format: str = 'mp4', use_sponsorblock: bool = True, segment_types: Optional[List[str]] = None, progress_callback=None, download_sections: bool = False, single_pass: bool = True, stage_gate=None, encode_workers: Optional[int] = None,
+                  mp3_output_path: Optional[str] = None):
     # Extract video ID from URL
     video_id = extract_video_id(url)
     if not video_id:
         print("Invalid YouTube URL. Unable to extract video ID.")
         return None
 
+    # 'both' downloads the video once and writes the MP4 to output_path and the MP3 to mp3_output_path
+    if format == 'both':
+        return _process_both(url, video_id, output_path, mp3_output_path or output_path, use_sponsorblock, segment_types, progress_callback, stage_gate, encode_workers)
+
+    # Identical requests share one job: the first one does the work, later ones wait for its result
+    registry = get_inflight_registry()
+    categories = segment_types if use_sponsorblock else None
+    job, owner = registry.claim(inflight_key(video_id, format, categories, output_path))
+    if not owner:
+        return _attach(job, progress_callback, stage_gate)
+
+    result = None
+    try:
+        # An MP4 of the same video with the same cut is already on its way, in any folder; take the audio from it
+        source = registry.find(video_id, 'mp4', categories) if format == 'mp3' else None
+        if source is not None:
+            result = _derive_mp3(source, output_path, progress_callback, stage_gate)
+        if result is None:
+            result = _process_video(url, video_id, output_path, format, use_sponsorblock, segment_types, _shared_progress(job, progress_callback),
+                                    download_sections, single_pass, stage_gate, encode_workers)
+        return result
+    finally:
+        registry.finish(job, result)
+
+def _fetch_segments(video_id: str, use_sponsorblock: bool, segment_types: Optional[List[str]]) -> List[Tuple[float, float]]:
+    if not use_sponsorblock:
+        return []
+    print("Fetching sponsor segments...")
+    with span('segments'):
+        sponsor_segments = get_sponsor_segments(video_id, segment_types or [])
+    print(sponsor_segments)
+    if not sponsor_segments:
+        print("No sponsor segments found. The video will remain unedited.")
+    return sponsor_segments
+
+def _process_video(url: str, video_id: str, output_path: str, format: str, use_sponsorblock: bool, segment_types: Optional[List[str]], progress_callback,
+                   download_sections: bool, single_pass: bool, stage_gate, encode_workers: Optional[int]):
+    # Stages completed before a crash or restart are recorded in the journal and not done again
+    journal = get_journal()
+    key = stage_key(video_id, format, segment_types if use_sponsorblock else None)
+    entry = journal.get(key)
+    if entry is not None:
+        video_path = _resume_video(entry, format, stage_gate, encode_workers, progress_callback)
+        if video_path:
+            journal.finalize(key)
+            return video_path
+
+    # Get sponsor segments before downloading so the cut can happen during the download
+    if entry is not None and entry.segments is not None:
+        sponsor_segments = entry.segments
+    else:
+        sponsor_segments = _fetch_segments(video_id, use_sponsorblock, segment_types)
+        journal.record(key, 'segments', segments=sponsor_segments)
+
+    # Only download the kept ranges
+    if download_sections and sponsor_segments:
+        print("Downloading kept sections only...")
+        _enter_stage(stage_gate, 'network')
+        video_path = download_video_ranges(url, output_path, format, sponsor_segments, progress_callback=progress_callback)
+        if video_path:
+            print(f"Video processing complete. Output file: {video_path}")
+            journal.finalize(key)
+            return video_path
+        print("Section download not supported for this video. Falling back to full download.")
+
+    # Download and cut in yt-dlp's postprocessor chain
+    if single_pass:
+        print("Downloading video...")
+        _enter_stage(stage_gate, 'network')
+        video_path = download_and_cut(url, output_path, format, sponsor_segments, progress_callback=progress_callback, stage_gate=stage_gate, encode_workers=encode_workers,
+                                      stage_callback=lambda stage, path: journal.record(key, stage, file_path=path))
+        if not video_path:
+            print("Failed to download the video.")
+            return None
+        print(f"Video processing complete. Output file: {video_path}")
+        journal.finalize(key)
+        return video_path
+
     # Download the video
     print("Downloading video...")
-    video_path = download_video(url, output_path, format, progress_callback=progress_callback)
+    _enter_stage(stage_gate, 'network')
+    media_info = download_video(url, output_path, format, progress_callback=progress_callback)
     
-    if not video_path:
+    if not media_info:
         print("Failed to download the video.")
         return None
+    journal.record(key, 'downloaded', file_path=media_info.file_path, media=_journal_media(media_info))
 
-    # Get sponsor segments
-    if use_sponsorblock:
-        print("Fetching sponsor segments...")
-        sponsor_segments = get_sponsor_segments(video_id, segment_types or [])
-        print(sponsor_segments)
-        if not sponsor_segments:
-            print("No sponsor segments found. The video will remain unedited.")
-    else:
-        sponsor_segments = []
-    
     # Cut the video
+    video_path = cut_video(media_info.file_path, format, sponsor_segments, stage_gate, media_info, encode_workers, progress_callback)
+    journal.finalize(key)
+    return video_path
+
+def _journal_media(media_info: MediaInfo) -> dict:
+    # The size and mtime tell a resumed job whether the file was already replaced by its cut
+    stat = os.stat(media_info.file_path)
+    return {'duration': media_info.duration, 'duration_exact': media_info.duration_exact, 'vcodec': media_info.vcodec, 'acodec': media_info.acodec,
+            'size': stat.st_size, 'mtime': stat.st_mtime}
+
+def _is_downloaded_file(entry: StageEntry) -> bool:
+    # True if the journaled file is still the download, i.e. it has not been cut yet
+    media = entry.media or {}
+    try:
+        stat = os.stat(entry.file_path)
+    except OSError:
+        return False
+    return stat.st_size == media.get('size') and stat.st_mtime == media.get('mtime')
+
+def _resume_video(entry: StageEntry, format: str, stage_gate, encode_workers: Optional[int], progress_callback) -> Optional[str]:
+    """
+    Finish a video from the last stage recorded in the journal.
+
+    Returns:
+        Optional[str]: The output path, or None if the download has to run (again).
+    """
+    if not entry.file_path or not entry.reached('downloaded'):
+        return None
+    video_path = entry.file_path
+    if entry.reached('cut'):
+        if os.path.exists(video_path):
+            print(f"Already processed before a restart: {video_path}")
+            return video_path
+        return None
+
+    temp_output_file = os.path.join(os.path.dirname(video_path), f"temp_{os.path.basename(video_path)}")
+    if not os.path.exists(video_path):
+        if os.path.exists(temp_output_file):
+            # Interrupted between removing the download and renaming the finished cut
+            os.rename(temp_output_file, video_path)
+            return video_path
+        return None
+    if not _is_downloaded_file(entry):
+        print(f"Already cut before a restart: {video_path}")
+        return video_path
+    if os.path.exists(temp_output_file):
+        # Left over from a cut that was interrupted; the cut starts over
+        os.remove(temp_output_file)
+
+    print(f"Resuming at the cut stage: {video_path}")
+    media_info = MediaInfo(video_path, entry.media.get('duration'), entry.media.get('vcodec'), entry.media.get('acodec'),
+                           duration_exact=entry.media.get('duration_exact', False))
+    return cut_video(video_path, format, entry.segments or [], stage_gate, media_info, encode_workers, progress_callback)
+
+def _process_both(url: str, video_id: str, output_path: str, mp3_output_path: str, use_sponsorblock: bool, segment_types: Optional[List[str]], progress_callback,
+                  stage_gate, encode_workers: Optional[int]) -> Optional[str]:
+    """
+    Download a video once and produce both the cut MP4 and the cut MP3.
+
+    The segments are looked up once and the MP3 is encoded locally from the downloaded
+    source with the same cut plan as the MP4. Both outputs are registered as in-flight jobs,
+    so separate MP3 or MP4 requests for the video attach to this one.
+
+    Returns:
+        Optional[str]: Path of the MP4. The MP3 path is reported through progress_callback.
+    """
+    registry = get_inflight_registry()
+    categories = segment_types if use_sponsorblock else None
+    mp4_job, mp4_owner = registry.claim(inflight_key(video_id, 'mp4', categories, output_path))
+    if not mp4_owner:
+        # Another job is fetching the MP4; the MP3 request derives its output from that download
+        process_video(url, mp3_output_path, 'mp3', use_sponsorblock, segment_types, progress_callback, stage_gate=stage_gate)
+        return _attach(mp4_job, progress_callback, stage_gate)
+
+    mp3_job, mp3_owner = registry.claim(inflight_key(video_id, 'mp3', categories, mp3_output_path))
+    mp4_path = mp3_path = None
+    try:
+        progress_callback = _shared_progress(mp4_job, progress_callback)
+        if not mp3_owner:
+            # The MP3 is already in progress elsewhere; only the MP4 is left to do
+            mp4_path = _process_video(url, video_id, output_path, 'mp4', use_sponsorblock, segment_types, progress_callback, False, True, stage_gate, encode_workers)
+            return mp4_path
+
+        journal = get_journal()
+        key = stage_key(video_id, 'both', categories)
+        entry = journal.get(key)
+        if entry is not None:
+            mp4_path, mp3_path = _resume_both(entry, mp3_output_path, stage_gate, encode_workers, progress_callback)
+        if mp4_path is None:
+            if entry is not None and entry.segments is not None:
+                sponsor_segments = entry.segments
+            else:
+                sponsor_segments = _fetch_segments(video_id, use_sponsorblock, segment_types)
+                journal.record(key, 'segments', segments=sponsor_segments)
+            print("Downloading video...")
+            _enter_stage(stage_gate, 'network')
+            media_info = download_video(url, output_path, 'mp4', progress_callback=progress_callback)
+            if not media_info:
+                print("Failed to download the video.")
+                return None
+            journal.record(key, 'downloaded', file_path=media_info.file_path, media=_journal_media(media_info))
+            mp4_path, mp3_path = cut_video_both(media_info, mp3_output_path, sponsor_segments, stage_gate, encode_workers, progress_callback)
+        journal.finalize(key)
+        if mp3_path and progress_callback:
+            progress_callback(f"MP3 saved: {mp3_path}")
+        return mp4_path
+    finally:
+        registry.finish(mp4_job, mp4_path)
+        if mp3_owner:
+            registry.finish(mp3_job, mp3_path)
+
+def _shared_progress(job: InflightJob, progress_callback=None):
+    # The owner's progress also goes to every request attached to its job
+    def callback(message):
+        if progress_callback:
+            progress_callback(message)
+        job.publish(message)
+    return callback
+
+def _attach(job: InflightJob, progress_callback=None, stage_gate=None) -> Optional[str]:
+    video_id, format, _, _ = job.key
+    print(f"{video_id} ({format}) is already in progress. Attaching to the running job.")
+    if progress_callback:
+        job.add_listener(progress_callback)
+    try:
+        return job.wait(stage_gate.check_cancelled if stage_gate is not None else None)
+    finally:
+        if progress_callback:
+            job.remove_listener(progress_callback)
+
+def _derive_mp3(source: InflightJob, output_path: str, progress_callback=None, stage_gate=None) -> Optional[str]:
+    """
+    Produce an MP3 from the result of an in-flight MP4 job instead of downloading again.
+
+    Args:
+        source (InflightJob): The MP4 job, already cut with the same segment categories.
+        output_path (str): Directory of the MP3 output.
+        progress_callback (optional): A callback function to report progress.
+        stage_gate (optional): Scheduler gate; the extraction waits for a CPU slot.
+
+    Returns:
+        Optional[str]: Path of the MP3, or None if the MP4 job failed and the caller should download.
+    """
+    print("MP4 of this video is already downloading. The MP3 will be extracted from it.")
+    if progress_callback:
+        progress_callback("Waiting for the MP4 download of this video...")
+    mp4_path = source.wait(stage_gate.check_cancelled if stage_gate is not None else None)
+    if not mp4_path or not os.path.exists(mp4_path):
+        print("MP4 job failed. Downloading the MP3 separately.")
+        return None
+
+    _enter_stage(stage_gate, 'cpu')
+    os.makedirs(output_path, exist_ok=True)
+    mp3_path = os.path.join(output_path, f"{os.path.splitext(os.path.basename(mp4_path))[0]}.mp3")
+    with span('cut'):
+        extracted = extract_audio_mp3(mp4_path, mp3_path)
+    if not extracted:
+        return None
+    print(f"Video processing complete. Output file: {mp3_path}")
+    return mp3_path
+
+def _resume_both(entry: StageEntry, mp3_output_path: str, stage_gate, encode_workers: Optional[int], progress_callback) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Finish a 'both' job from the last stage recorded in the journal.
+
+    Returns:
+        Tuple[Optional[str], Optional[str]]: Paths of the MP4 and the MP3, or (None, None) if the download has to run again.
+    """
+    video_path = entry.file_path
+    if not video_path or not entry.reached('downloaded') or not os.path.exists(video_path):
+        return None, None
+    if _is_downloaded_file(entry):
+        print(f"Resuming at the cut stage: {video_path}")
+        media_info = MediaInfo(video_path, entry.media.get('duration'), entry.media.get('vcodec'), entry.media.get('acodec'),
+                           duration_exact=entry.media.get('duration_exact', False))
+        return cut_video_both(media_info, mp3_output_path, entry.segments or [], stage_gate, encode_workers, progress_callback)
+
+    # The MP4 was cut before the restart; the MP3 follows from it without cutting again
+    mp3_path = os.path.join(mp3_output_path, f"{os.path.splitext(os.path.basename(video_path))[0]}.mp3")
+    if not os.path.exists(mp3_path):
+        _enter_stage(stage_gate, 'cpu')
+        os.makedirs(mp3_output_path, exist_ok=True)
+        with span('cut'):
+            if not extract_audio_mp3(video_path, mp3_path, progress_callback=progress_callback):
+                mp3_path = None
+    print(f"Already cut before a restart: {video_path}")
+    return video_path, mp3_path
+
+def cut_video(video_path: str, format: str, sponsor_segments: List[Tuple[float, float]], stage_gate=None, media_info: Optional[MediaInfo] = None,
+              encode_workers: Optional[int] = None, progress_callback=None) -> str:
+    """
+    Cut segments out of an already downloaded file, replacing it in place.
+
+    Args:
+        video_path (str): Path of the downloaded file.
+        format (str): The file format ('mp3' or 'mp4').
+        sponsor_segments (List[Tuple[float, float]]): List of (start, end) timestamps to remove.
+        stage_gate (optional): Scheduler gate; the cut waits for a CPU slot before running.
+        media_info (Optional[MediaInfo]): Metadata from the download stage, so the cutter does not probe the file.
+        encode_workers (Optional[int]): ffmpeg processes used if an mp4 has to be re-encoded.
+        progress_callback (optional): Receives cut-stage ProgressEvents while ffmpeg runs.
+
+    Returns:
+        str: The path of the output file.
+    """
+    duration = media_info.duration if media_info else None
+    if sponsor_segments and removed_duration(sponsor_segments, duration) <= 0:
+        print("Sponsor segments cover no time in this file. The original video will be kept.")
+        return video_path
+
     if sponsor_segments:
         print("Cutting out sponsor segments...")
-        temp_output_file = os.path.join(output_path, f"temp_{os.path.basename(video_path)}")
+        _enter_stage(stage_gate, 'cpu')
+        temp_output_file = os.path.join(os.path.dirname(video_path), f"temp_{os.path.basename(video_path)}")
         
-        if format.lower() == 'mp3':
-            success = cut_segments_mp3(video_path, temp_output_file, sponsor_segments)
-        elif format.lower() == 'mp4':
-            success = cut_segments_mp4(video_path, temp_output_file, sponsor_segments)
-        else:
-            print(f"Unsupported format: {format}")
-            return video_path
+        with span('cut', media_seconds=duration):
+            if format.lower() == 'mp3':
+                success = cut_segments_mp3(video_path, temp_output_file, sponsor_segments, media_info=media_info, progress_callback=progress_callback)
+            elif format.lower() == 'mp4':
+                success = cut_segments_mp4(video_path, temp_output_file, sponsor_segments, media_info=media_info, workers=encode_workers,
+                                           progress_callback=progress_callback)
+            else:
+                print(f"Unsupported format: {format}")
+                return video_path
         
         if success:
             # Remove the original file and rename the processed file
-            os.remove(video_path)
-            os.rename(temp_output_file, video_path)
+            with span('finalize'):
+                os.remove(video_path)
+                os.rename(temp_output_file, video_path)
             print(f"Video processing complete. Output file: {video_path}")
             return video_path
         else:
@@ -59,6 +354,250 @@ def process_video(url: str, output_path: str, format: str = 'mp4', use_sponsorbl
         print("No segments to cut. The original video will be kept.")
         return video_path
 
+def cut_video_both(media_info: MediaInfo, mp3_output_path: str, sponsor_segments: List[Tuple[float, float]], stage_gate=None,
+                   encode_workers: Optional[int] = None, progress_callback=None) -> Tuple[str, Optional[str]]:
+    """
+    Cut a downloaded MP4 in place and write the matching MP3 from the same source.
+
+    Args:
+        media_info (MediaInfo): The downloaded MP4.
+        mp3_output_path (str): Directory of the MP3 output.
+        sponsor_segments (List[Tuple[float, float]]): List of (start, end) timestamps to remove.
+        stage_gate (optional): Scheduler gate; the cut waits for a CPU slot before running.
+        encode_workers (Optional[int]): ffmpeg processes used if the mp4 has to be re-encoded.
+        progress_callback (optional): Receives cut-stage ProgressEvents while ffmpeg runs.
+
+    Returns:
+        Tuple[str, Optional[str]]: Path of the MP4, and of the MP3 or None if it could not be written.
+    """
+    video_path = media_info.file_path
+    os.makedirs(mp3_output_path, exist_ok=True)
+    mp3_path = os.path.join(mp3_output_path, f"{os.path.splitext(os.path.basename(video_path))[0]}.mp3")
+    _enter_stage(stage_gate, 'cpu')
+
+    if not sponsor_segments or removed_duration(sponsor_segments, media_info.duration) <= 0:
+        print("No segments to cut. Extracting the MP3 only.")
+        with span('cut', media_seconds=media_info.duration):
+            extracted = extract_audio_mp3(video_path, mp3_path, progress_callback=progress_callback)
+        return video_path, mp3_path if extracted else None
+
+    print("Cutting out sponsor segments from the MP4 and the MP3...")
+    temp_output_file = os.path.join(os.path.dirname(video_path), f"temp_{os.path.basename(video_path)}")
+    with span('cut', media_seconds=media_info.duration):
+        mp4_success, mp3_success = cut_segments_both(video_path, temp_output_file, mp3_path, sponsor_segments, media_info=media_info, workers=encode_workers,
+                                                      progress_callback=progress_callback)
+    if mp4_success:
+        with span('finalize'):
+            os.replace(temp_output_file, video_path)
+    else:
+        print("Failed to cut segments. The original video will be kept.")
+        if os.path.exists(temp_output_file):
+            os.remove(temp_output_file)
+    print(f"Video processing complete. Output files: {video_path}, {mp3_path if mp3_success else 'no MP3'}")
+    return video_path, mp3_path if mp3_success else None
+
+def process_playlist(url: str, output_path: str, format: str = 'mp4', use_sponsorblock: bool = True, segment_types: Optional[List[str]] = None, progress_callback=None, concurrency: int = 1, cut_workers: int = 1, queue_size: int = 4, stage_gate=None, sync: bool = False, encode_workers: Optional[int] = None,
+                     mp3_output_path: Optional[str] = None) -> Tuple[List[str], Dict[str, Dict[str, float]]]:
+    """
+    Download a playlist and cut each entry as soon as it lands.
+
+    The download stage feeds a bounded queue and cut workers pull from it, so ffmpeg runs on
+    entry N while entry N+1 is downloading. A full queue makes the downloaders wait.
+
+    Args:
+        url (str): The YouTube playlist URL.
+        output_path (str): The path where the videos will be saved.
+        format (str): The desired format ('mp3', 'mp4', or 'both' to download each entry once and
+                      write the MP4 to output_path and the MP3 to mp3_output_path).
+        use_sponsorblock (bool): Cut SponsorBlock segments out of each entry.
+        segment_types (Optional[List[str]]): Segment types to remove.
+        progress_callback (optional): A callback function to report progress.
+        concurrency (int): Number of entries downloaded at the same time.
+        cut_workers (int): Number of entries cut at the same time.
+        queue_size (int): Downloaded entries allowed to wait for a cut worker.
+        stage_gate (optional): Scheduler gate; the playlist holds a network slot while downloading,
+                    and each cut takes a CPU slot of its own.
+        sync (bool): Skip entries the archive index already holds with the same format, segment
+                     categories and segments, as long as the recorded file is still on disk.
+                     Entries another job is already processing into the same folder are never downloaded twice either;
+                     their results are taken from that job and listed after the playlist's own.
+        encode_workers (Optional[int]): ffmpeg processes each cut worker uses if an mp4 has to be re-encoded.
+        mp3_output_path (Optional[str]): Directory of the MP3 outputs when format is 'both'.
+
+    Returns:
+        Tuple[List[str], Dict[str, Dict[str, float]]]: Paths of the processed files in playlist order,
+            and per-stage throughput figures (items, busy seconds, items per minute).
+    """
+    work = queue.Queue(maxsize=max(1, queue_size))
+    results = {}
+    mp3_results = {}
+    output_formats = ['mp4', 'mp3'] if format == 'both' else [format]
+    stats = {'download': {'items': 0, 'seconds': 0.0}, 'cut': {'items': 0, 'seconds': 0.0}, 'skipped': {'items': 0}, 'shared': {'items': 0}}
+    stats_lock = threading.Lock()
+    archive = get_archive()
+    categories = categories_key(segment_types) if use_sponsorblock else ''
+    registry = get_inflight_registry()
+    claims = {}      # video ID -> {format: in-flight job this playlist owns}
+    attached = []    # in-flight jobs of other requests this playlist waits for
+    derived = []     # (another request's MP4 job, our MP3 job): MP3s extracted from that MP4
+
+    def entry_segments(video_id):
+        return get_sponsor_segments(video_id, segment_types or []) if use_sponsorblock and video_id else []
+
+    def is_current(entry):
+        video_id = entry.get('id')
+        if not video_id:
+            return False
+        fingerprint = segments_fingerprint(entry_segments(video_id))
+        if not all(archive.is_current(video_id, output_format, categories, fingerprint) for output_format in output_formats):
+            return False
+        with stats_lock:
+            stats['skipped']['items'] += 1
+        return True
+
+    def skip_entry(entry):
+        if sync and is_current(entry):
+            return True
+        video_id = entry.get('id')
+        if not video_id:
+            return False
+        # Like _process_both, a 'both' entry claims its MP4 and its MP3 separately, so MP4-only
+        # and MP3-only requests for the same video attach to this playlist and the other way round
+        claim_types = segment_types if use_sponsorblock else None
+        job, owner = registry.claim(inflight_key(video_id, output_formats[0], claim_types, output_path))
+        mp3_job, mp3_owner = registry.claim(inflight_key(video_id, 'mp3', claim_types, mp3_output_path or output_path)) if format == 'both' else (None, False)
+        with stats_lock:
+            if mp3_job is not None and not mp3_owner:
+                attached.append(mp3_job)
+            if owner:
+                claims[video_id] = {output_formats[0]: job, **({'mp3': mp3_job} if mp3_owner else {})}
+                return False
+            attached.append(job)
+            if mp3_owner:
+                derived.append((job, mp3_job))
+            stats['shared']['items'] += 1
+        print(f"{video_id} is already being processed by another job. Sharing its result.")
+        return True
+
+    def release(video_id, result, mp3_result=None):
+        with stats_lock:
+            owned = claims.pop(video_id, {})
+        for output_format, job in owned.items():
+            registry.finish(job, mp3_result if format == 'both' and output_format == 'mp3' else result)
+
+    def on_entry_downloaded(index, video_id, media_info):
+        with stats_lock:
+            stats['download']['items'] += 1
+        work.put((index, video_id, media_info))
+
+    # Cut threads start with an empty context; their spans belong to this job
+    trace_job = current_job()
+
+    def cut_worker():
+        with job_context(trace_job):
+            cut_loop()
+
+    def cut_loop():
+        while True:
+            item = work.get()
+            if item is None:
+                return
+            index, video_id, media_info = item
+            file_path = media_info.file_path
+            entry_progress = (lambda message, label=f"[{index}] ": progress_callback(labelled(message, label))) if progress_callback else None
+            started = time.monotonic()
+            try:
+                segments = entry_segments(video_id)
+                cut_state = 'cut' if segments else 'uncut'
+                with stats_lock:
+                    # The MP3 of this video is in progress elsewhere; only the MP4 is left to do
+                    mp4_only = format == 'both' and video_id in claims and 'mp3' not in claims[video_id]
+                with _cpu_slot(stage_gate):
+                    if mp4_only:
+                        results[index] = cut_video(file_path, 'mp4', segments, media_info=media_info, encode_workers=encode_workers,
+                                                   progress_callback=entry_progress)
+                    elif format == 'both':
+                        results[index], mp3_results[index] = cut_video_both(media_info, mp3_output_path or output_path, segments, encode_workers=encode_workers,
+                                                                            progress_callback=entry_progress)
+                    else:
+                        results[index] = cut_video(file_path, format, segments, media_info=media_info, encode_workers=encode_workers,
+                                                   progress_callback=entry_progress)
+                if format == 'both' and video_id and mp3_results.get(index):
+                    archive.record(video_id, 'mp3', categories, mp3_results[index], cut_state, segments_fingerprint(segments))
+                if video_id:
+                    archive.record(video_id, 'mp4' if format == 'both' else format, categories, results[index], cut_state, segments_fingerprint(segments))
+            except Exception as e:
+                print(f"Failed to cut {file_path}: {e}")
+                results[index] = file_path
+            release(video_id, results[index], mp3_results.get(index))
+            with stats_lock:
+                stats['cut']['items'] += 1
+                stats['cut']['seconds'] += time.monotonic() - started
+
+    workers = [threading.Thread(target=cut_worker, daemon=True) for _ in range(max(1, cut_workers))]
+    for worker in workers:
+        worker.start()
+
+    started = time.monotonic()
+    try:
+        _enter_stage(stage_gate, 'network')
+        download_playlist(url, output_path, 'mp4' if format == 'both' else format, progress_callback, prefetch_segments=use_sponsorblock,
+                          concurrency=concurrency, entry_callback=on_entry_downloaded, skip_entry=skip_entry,
+                          check_cancelled=stage_gate.check_cancelled if stage_gate is not None else None)
+    finally:
+        stats['download']['seconds'] = time.monotonic() - started
+        for _ in workers:
+            work.put(None)
+        for worker in workers:
+            worker.join()
+        # Entries that failed to download still hold their claim
+        for video_id in list(claims):
+            release(video_id, None)
+
+    if stage_gate is not None and attached:
+        # The jobs we wait for may still need a network slot; holding ours could leave none for them
+        stage_gate.leave()
+    for mp4_job, mp3_job in derived:
+        mp3_path = None
+        try:
+            mp3_path = _derive_mp3(mp4_job, mp3_output_path or output_path, progress_callback, stage_gate)
+        finally:
+            registry.finish(mp3_job, mp3_path)
+        # Listed with the shared results
+        attached.append(mp3_job)
+    shared_results = [job.wait(stage_gate.check_cancelled if stage_gate is not None else None) for job in attached]
+
+    for stage in (stats['download'], stats['cut']):
+        stage['per_minute'] = stage['items'] * 60 / stage['seconds'] if stage['seconds'] else 0.0
+    print(f"Pipeline throughput: download {stats['download']['per_minute']:.1f}/min, "
+          f"cut {stats['cut']['per_minute']:.1f}/min, {stats['skipped']['items']} already up to date, "
+          f"{stats['shared']['items']} shared with other jobs")
+    paths = []
+    for index in sorted(results):
+        paths.append(results[index])
+        if mp3_results.get(index):
+            paths.append(mp3_results[index])
+    return paths + [path for path in shared_results if path], stats
+
+@contextmanager
+def _cpu_slot(stage_gate):
+    # A playlist's cut workers run while it holds its network slot; each cut takes a CPU slot of its own
+    if stage_gate is None:
+        yield
+        return
+    with span('wait'):
+        stage_gate.acquire('cpu')
+    try:
+        yield
+    finally:
+        stage_gate.release('cpu')
+
+def _enter_stage(stage_gate, stage: str):
+    # Wait for a slot of the given kind when running under the job scheduler
+    if stage_gate is not None:
+        with span('wait'):
+            stage_gate.enter(stage)
+
 def extract_video_id(url: str) -> Optional[str]:
     # Regular expression to match YouTube video IDs
     patterns = [
@@ -0,0 +1,73 @@
+from typing import List, Optional
+
+# yt-dlp reports codecs as RFC 6381 strings ('avc1.64001F'); the cutters use ffmpeg's names
+_CODEC_NAMES = {
+    'avc1': 'h264',
+    'avc3': 'h264',
+    'hev1': 'hevc',
+    'hvc1': 'hevc',
+    'vp09': 'vp9',
+    'av01': 'av1',
+    'mp4a': 'aac',
+}
+
+def _codec_name(codec: Optional[str]) -> Optional[str]:
+    if not codec or codec == 'none':
+        return None
+    name = codec.split('.')[0].lower()
+    return _CODEC_NAMES.get(name, name)
+
+class MediaInfo:
+    """
+    What the cutters need to know about a downloaded file.
+
+    Built from the info dict yt-dlp already has, so the cut stage does not have to run
+    ffprobe. Fields that are unknown are None; the cutters probe the file for those only.
+
+    Args:
+        file_path (str): Exact path of the file on disk.
+        duration (Optional[float]): Duration in seconds.
+        duration_exact (bool): False if the duration is yt-dlp's, which is rounded to whole seconds.
+        vcodec (Optional[str]): ffmpeg name of the video codec, None for audio-only files.
+        acodec (Optional[str]): ffmpeg name of the audio codec.
+        keyframes (Optional[List[float]]): Sorted keyframe timestamps of the video stream.
+    """
+
+    def __init__(self, file_path: str, duration: Optional[float] = None, vcodec: Optional[str] = None,
+                 acodec: Optional[str] = None, keyframes: Optional[List[float]] = None, duration_exact: bool = True):
+        self.file_path = file_path
+        self.duration = duration
+        self.duration_exact = duration_exact
+        self.vcodec = vcodec
+        self.acodec = acodec
+        self.keyframes = keyframes
+
+    @property
+    def streams(self) -> List[str]:
+        return [kind for kind, codec in (('video', self.vcodec), ('audio', self.acodec)) if codec]
+
+    @classmethod
+    def from_info_dict(cls, info: dict, file_path: Optional[str] = None) -> 'MediaInfo':
+        """
+        Build a MediaInfo from a yt-dlp info dict after the download.
+
+        Args:
+            info (dict): The info dict returned by extract_info or passed to a postprocessor.
+            file_path (Optional[str]): Path of the file, if it differs from the one in the info dict.
+
+        Returns:
+            MediaInfo: The file's metadata.
+        """
+        requested_downloads = info.get('requested_downloads') or []
+        download = requested_downloads[0] if requested_downloads else info
+        file_path = file_path or download.get('filepath') or info.get('filepath')
+        vcodec = _codec_name(download.get('vcodec'))
+        acodec = _codec_name(download.get('acodec'))
+        if (file_path or '').endswith('.mp3'):
+            # Extracted by a postprocessor; the info dict still describes the source format
+            vcodec, acodec = None, 'mp3'
+        # YouTube reports the length in whole seconds; the cutters probe the file when the end matters
+        return cls(file_path, info.get('duration'), vcodec, acodec, duration_exact=False)
+
+    def __repr__(self):
+        return f"MediaInfo({self.file_path!r}, duration={self.duration}, streams={self.streams})"
@@ -0,0 +1,104 @@
+import os
+from typing import Callable, List, Optional, Tuple
+from yt_dlp.postprocessor.ffmpeg import FFmpegPostProcessor, FFmpegPostProcessorError
+from yt_dlp.utils import prepend_extension, replace_extension
+from cutseg import audio_trim_filter, cut_duration, cut_segments_mp4, merge_segments, removed_duration, segments_to_keep
+from mediainfo import MediaInfo
+from tracing import span
+
+class SponsorBlockCutPP(FFmpegPostProcessor):
+    """
+    yt-dlp postprocessor that removes SponsorBlock segments as part of the download.
+
+    For mp3 it replaces FFmpegExtractAudio: the downloaded audio is decoded, trimmed and
+    encoded to mp3 in a single ffmpeg invocation, so the output is written once.
+
+    MP4 is not single-write: the cut runs after yt-dlp's merge (a stream-copy remux of the
+    video and audio downloads) and rewrites the merged file, so a video with segments is
+    written twice. What this saves over cutting afterwards is a separate pass of the
+    pipeline, not the second write; a video without segments is written once, by the merge.
+    """
+
+    def __init__(self, downloader=None, segments_to_remove: List[Tuple[float, float]] = None, format: str = 'mp4', preferredquality: str = '192', cut_mode: str = 'smart', stage_gate=None, encode_workers: Optional[int] = None,
+                 progress_callback=None, stage_callback: Optional[Callable[[str, str], None]] = None):
+        FFmpegPostProcessor.__init__(self, downloader)
+        self.segments_to_remove = merge_segments(segments_to_remove or [])
+        self.format = format
+        self.preferredquality = preferredquality
+        self.cut_mode = cut_mode
+        self.stage_gate = stage_gate
+        self.encode_workers = encode_workers
+        self.progress_callback = progress_callback
+        # Told ('cut', path) as soon as the output is final, so a restart does not cut it twice;
+        # not told when the cut failed and the uncut file was kept
+        self.stage_callback = stage_callback
+
+    def run(self, info):
+        if self.stage_gate is not None:
+            # The download is done; give up the network slot and wait for a CPU one
+            with span('wait'):
+                self.stage_gate.enter('cpu')
+        filepath = info['filepath']
+        media_info = MediaInfo.from_info_dict(info, filepath)
+        # Probes the file when the info dict's whole-second duration would cut off its end
+        if cut_duration(filepath, media_info, self.segments_to_remove) is None:
+            with span('probe'):
+                media_info.duration = self._get_real_video_duration(filepath)
+        with span('cut', media_seconds=media_info.duration):
+            return self._cut(filepath, media_info, info)
+
+    def _cut(self, filepath: str, media_info: MediaInfo, info: dict):
+        # Segments that cover no time inside the media are dropped, so no cut runs for them
+        segments = self.segments_to_remove if removed_duration(self.segments_to_remove, media_info.duration) > 0 else []
+        keep = segments_to_keep(segments, media_info.duration)
+
+        if self.format == 'mp3':
+            files_to_delete, info, cut = self._extract_mp3(filepath, segments, keep, info)
+            if cut:
+                self._report_cut(info['filepath'])
+            return files_to_delete, info
+
+        if not segments:
+            self._report_cut(filepath)
+            return [], info
+        temp_filename = prepend_extension(filepath, 'temp')
+        self.to_screen(f'Removing {len(segments)} segment(s) from "{filepath}"')
+        if cut_segments_mp4(filepath, temp_filename, segments, mode=self.cut_mode, media_info=media_info, workers=self.encode_workers,
+                            progress_callback=self.progress_callback):
+            os.replace(temp_filename, filepath)
+            self._report_cut(filepath)
+        else:
+            # Not reported as cut, so a resumed job does not take the uncut file for its output
+            self.report_warning('Failed to cut segments. The original video will be kept.')
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+        return [], info
+
+    def _report_cut(self, filepath: str):
+        if self.stage_callback is not None:
+            self.stage_callback('cut', filepath)
+
+    def _extract_mp3(self, filepath: str, segments: List[Tuple[float, float]], keep: List[Tuple[float, float]], info: dict):
+        out_path = replace_extension(filepath, 'mp3')
+        temp_filename = prepend_extension(out_path, 'temp')
+        encode_args = ['-vn', '-c:a', 'libmp3lame', '-b:a', f'{self.preferredquality}k']
+
+        self.to_screen(f'Extracting audio and removing {len(segments)} segment(s) in one pass')
+        cut = True
+        try:
+            if segments:
+                self.run_ffmpeg(filepath, temp_filename, ['-filter_complex', audio_trim_filter(keep), '-map', '[outa]'] + encode_args)
+            else:
+                self.run_ffmpeg(filepath, temp_filename, ['-map', '0:a:0'] + encode_args)
+        except FFmpegPostProcessorError as e:
+            if not segments:
+                raise
+            self.report_warning(f'Failed to cut segments ({e}). Extracting the full audio instead.')
+            self.run_ffmpeg(filepath, temp_filename, ['-map', '0:a:0'] + encode_args)
+            cut = False
+        os.replace(temp_filename, out_path)
+
+        info['filepath'] = out_path
+        info['ext'] = 'mp3'
+        files_to_delete = [] if out_path == filepath else [filepath]
+        return files_to_delete, info, cut
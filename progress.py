@@ -0,0 +1,119 @@
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, Union
+
+class ProgressEvent:
+    """
+    A progress update of one stage of a job.
+
+    Download events carry byte counts and a speed in bytes per second. Cut events carry the
+    seconds of media processed and a speed as a realtime factor. The percentage and ETA are
+    filled in from those when they are not given.
+
+    Args:
+        stage (str): 'download' or 'cut'.
+        done (Optional[float]): Bytes downloaded, or seconds of media cut so far.
+        total (Optional[float]): Total bytes, or total seconds of media to cut.
+        speed (Optional[float]): Bytes per second for downloads, realtime factor for cuts.
+        eta (Optional[float]): Seconds left.
+        label (str): Prefix telling entries of a playlist apart, e.g. '[3] '.
+    """
+
+    def __init__(self, stage: str, done: Optional[float] = None, total: Optional[float] = None, speed: Optional[float] = None,
+                 eta: Optional[float] = None, label: str = ''):
+        self.stage = stage
+        self.done = done
+        self.total = total
+        self.speed = speed
+        self.eta = eta
+        self.label = label
+        if self.eta is None and speed and done is not None and total:
+            # Bytes left at bytes per second, or media seconds left at the realtime factor
+            self.eta = max(0.0, total - done) / speed
+
+    @property
+    def percent(self) -> Optional[float]:
+        if self.done is None or not self.total:
+            return None
+        return min(100.0, 100.0 * self.done / self.total)
+
+    @property
+    def finished(self) -> bool:
+        return self.total is not None and self.done is not None and self.done >= self.total
+
+    def with_label(self, label: str) -> 'ProgressEvent':
+        return ProgressEvent(self.stage, self.done, self.total, self.speed, self.eta, label + self.label)
+
+    def __str__(self):
+        percent = f"{self.percent:.1f}%" if self.percent is not None else "?%"
+        if self.stage == 'download':
+            speed = f" at {self.speed / 1024 / 1024:.2f}MiB/s" if self.speed else ""
+            text = f"Downloading: {percent}{speed}"
+        else:
+            speed = f" at {self.speed:.1f}x" if self.speed else ""
+            text = f"Cutting: {percent}{speed}"
+        if self.eta is not None:
+            text += f" ETA {int(self.eta) // 60:02d}:{int(self.eta) % 60:02d}"
+        return f"{self.label}{text}"
+
+ProgressMessage = Union[str, ProgressEvent]
+
+def labelled(message: ProgressMessage, label: str) -> ProgressMessage:
+    """Prefix a progress message, text or event, with a label such as '[3] '."""
+    if isinstance(message, ProgressEvent):
+        return message.with_label(label)
+    return f"{label}{message}"
+
+class ProgressThrottle:
+    """
+    Coalesces progress events to at most `rate` per second for each label and stage.
+
+    Events arriving faster are dropped, except the first event of a stage and the final one,
+    which always get through. Text messages are passed through unchanged.
+
+    Args:
+        callback (Callable[[ProgressMessage], None]): Receives the events that get through.
+        rate (float): Maximum events per second per label and stage.
+    """
+
+    def __init__(self, callback: Callable[[ProgressMessage], None], rate: float = 10.0):
+        self.callback = callback
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.lock = threading.Lock()
+        self.last_sent: Dict[Tuple[str, str], float] = {}
+
+    def __call__(self, message: ProgressMessage):
+        if isinstance(message, ProgressEvent):
+            key = (message.label, message.stage)
+            now = time.monotonic()
+            with self.lock:
+                last = self.last_sent.get(key)
+                if last is not None and now - last < self.interval and not message.finished:
+                    return
+                self.last_sent[key] = now
+        self.callback(message)
+
+def parse_ffmpeg_progress(line: str, state: dict) -> bool:
+    """
+    Feed one line of ffmpeg's `-progress` output into a state dict.
+
+    Args:
+        line (str): A 'key=value' line.
+        state (dict): Updated with 'seconds' (media time written) and 'speed' (realtime factor).
+
+    Returns:
+        bool: True at the end of a progress block, when the state is worth reporting.
+    """
+    key, _, value = line.strip().partition('=')
+    if key in ('out_time_us', 'out_time_ms'):
+        # Both are in microseconds; out_time_ms is misnamed in ffmpeg
+        try:
+            state['seconds'] = max(0.0, int(value) / 1000000)
+        except ValueError:
+            pass
+    elif key == 'speed':
+        try:
+            state['speed'] = float(value.rstrip('x'))
+        except ValueError:
+            pass
+    return key == 'progress'
@@ -0,0 +1,214 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+
+def _job_cancelled() -> type:
+    # Raised from progress callbacks, i.e. inside yt-dlp, which reports and skips any exception there
+    # when ignoreerrors is set except DownloadCancelled. yt-dlp takes longer to import than the window
+    # takes to show, so the subclass is defined on first use.
+    global JobCancelled
+    if 'JobCancelled' not in globals():
+        from yt_dlp.utils import DownloadCancelled
+
+        class JobCancelled(DownloadCancelled):
+            """Raised inside a worker when its job has been cancelled."""
+            msg = 'The job was cancelled'
+    return JobCancelled
+
+def __getattr__(name):
+    if name == 'JobCancelled':
+        return _job_cancelled()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class ResourceSlots:
+    """
+    Separate concurrency limits for the network and CPU stages of jobs.
+
+    Args:
+        max_network_jobs (int): Jobs allowed to download at the same time.
+        max_cpu_jobs (int): Jobs allowed to run ffmpeg at the same time.
+    """
+
+    def __init__(self, max_network_jobs: int = 2, max_cpu_jobs: int = 2):
+        self.limits = {'network': max(1, max_network_jobs), 'cpu': max(1, max_cpu_jobs)}
+        self.semaphores = {stage: threading.BoundedSemaphore(limit) for stage, limit in self.limits.items()}
+
+class StageGate:
+    """
+    Tracks which resource slot a single job holds.
+
+    Entering a stage releases the slot of the previous stage before waiting for the new one,
+    so a job never holds a network slot while it is cutting. Work a job runs beside its stage,
+    like the cuts of a playlist that is still downloading, takes extra slots with acquire().
+    """
+
+    def __init__(self, slots: Optional[ResourceSlots] = None):
+        self.slots = slots
+        self.stage = None
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+        self.extra = []
+
+    def enter(self, stage: str):
+        self.check_cancelled()
+        if stage == self.stage:
+            return
+        self.leave()
+        self._wait(stage)
+        self.stage = stage
+
+    def leave(self):
+        if self.stage is not None and self.slots is not None:
+            self.slots.semaphores[self.stage].release()
+        self.stage = None
+
+    def acquire(self, stage: str):
+        """Take an extra slot of the given kind, keeping the current stage. Give it back with release()."""
+        self.check_cancelled()
+        self._wait(stage)
+        with self.lock:
+            self.extra.append(stage)
+
+    def release(self, stage: str):
+        with self.lock:
+            if stage not in self.extra:
+                return
+            self.extra.remove(stage)
+        if self.slots is not None:
+            self.slots.semaphores[stage].release()
+
+    def release_all(self):
+        """Give back the current stage and any extra slots, e.g. when the job ends."""
+        self.leave()
+        for stage in list(self.extra):
+            self.release(stage)
+
+    def _wait(self, stage: str):
+        if self.slots is not None:
+            semaphore = self.slots.semaphores[stage]
+            # Poll so a cancelled job does not wait for a slot forever
+            while not semaphore.acquire(timeout=0.5):
+                self.check_cancelled()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def check_cancelled(self):
+        if self.cancelled.is_set():
+            raise _job_cancelled()()
+
+class Job:
+    def __init__(self, job_id: int, priority: int, thread: QThread, gate: StageGate):
+        self.job_id = job_id
+        self.priority = priority
+        self.thread = thread
+        self.gate = gate
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+
+class JobScheduler(QObject):
+    """
+    Priority queue of download jobs with bounded concurrency.
+
+    Jobs with a lower priority value start first; equal priorities run in submission order.
+    At most max_network_jobs + max_cpu_jobs workers run at once, and the ResourceSlots shared
+    through each job's StageGate keep the network and CPU stages within their own limits.
+    """
+    queue_changed = pyqtSignal(int, int, float)  # queued, running, average wait in seconds
+    job_started = pyqtSignal(int)
+    job_finished = pyqtSignal(int)
+    job_cancelled = pyqtSignal(int)  # a queued job was dropped before it started
+
+    def __init__(self, max_network_jobs: int = 2, max_cpu_jobs: int = 2, parent=None):
+        super().__init__(parent)
+        self.slots = ResourceSlots(max_network_jobs, max_cpu_jobs)
+        self.max_running = self.slots.limits['network'] + self.slots.limits['cpu']
+        self.queue = []
+        self.running: Dict[int, Job] = {}
+        self.paused = False
+        self.counter = itertools.count(1)
+        self.recent_waits = deque(maxlen=50)
+
+    def submit(self, thread_factory: Callable[[int, StageGate], QThread], priority: int = 0) -> int:
+        """
+        Queue a job.
+
+        Args:
+            thread_factory (Callable[[int, StageGate], QThread]): Builds the worker thread for the job from
+                its ID and gate. The worker must pass the gate to the pipeline and emit finished when done.
+            priority (int): Lower values start first.
+
+        Returns:
+            int: The job ID.
+        """
+        job_id = next(self.counter)
+        gate = StageGate(self.slots)
+        job = Job(job_id, priority, thread_factory(job_id, gate), gate)
+        job.thread.finished.connect(lambda *args, j=job: self._on_finished(j))
+        heapq.heappush(self.queue, (priority, job_id, job))
+        self._dispatch()
+        return job_id
+
+    def pause(self):
+        """Stop starting queued jobs. Running jobs continue."""
+        self.paused = True
+        self._emit_queue_changed()
+
+    def resume(self):
+        self.paused = False
+        self._dispatch()
+
+    def cancel(self, job_id: int) -> bool:
+        """
+        Cancel a queued or running job.
+
+        Queued jobs are dropped; running jobs stop at their next progress update or stage change.
+
+        Returns:
+            bool: True if the job was found.
+        """
+        for i, (_, queued_id, job) in enumerate(self.queue):
+            if queued_id == job_id:
+                self.queue.pop(i)
+                heapq.heapify(self.queue)
+                job.thread.deleteLater()
+                self.job_cancelled.emit(job_id)
+                self._emit_queue_changed()
+                return True
+        job = self.running.get(job_id)
+        if job is not None:
+            job.gate.cancel()
+            return True
+        return False
+
+    def average_wait(self) -> float:
+        waits = list(self.recent_waits)
+        now = time.monotonic()
+        waits.extend(now - job.enqueued_at for _, _, job in self.queue)
+        return sum(waits) / len(waits) if waits else 0.0
+
+    def _dispatch(self):
+        while not self.paused and self.queue and len(self.running) < self.max_running:
+            _, job_id, job = heapq.heappop(self.queue)
+            job.started_at = time.monotonic()
+            self.recent_waits.append(job.started_at - job.enqueued_at)
+            self.running[job_id] = job
+            job.thread.start()
+            self.job_started.emit(job_id)
+        self._emit_queue_changed()
+
+    def _on_finished(self, job: Job):
+        # Reap the worker: release any slot it still holds and let Qt delete the thread
+        job.thread.wait()
+        job.gate.release_all()
+        self.running.pop(job.job_id, None)
+        job.thread.deleteLater()
+        self.job_finished.emit(job.job_id)
+        self._dispatch()
+
+    def _emit_queue_changed(self):
+        self.queue_changed.emit(len(self.queue), len(self.running), self.average_wait())
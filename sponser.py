@@ -1,26 +1,212 @@
-import sponsorblock as sb
-from typing import List, Tuple
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterable, List, Optional, Tuple
 
-def get_sponsor_segments(video_id: str, segment_types: List[str] = ['sponsor']) -> List[Tuple[float, float]]:
+ALL_SEGMENT_TYPES = ['sponsor', 'selfpromo', 'interaction', 'intro', 'outro', 'preview', 'music_offtopic', 'filler']
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ytdlp-gui", "sponsorblock.sqlite3")
+API_URL = "https://sponsor.ajay.app"
+HASH_PREFIX_LENGTH = 4    # Shortest prefix the API accepts; shorter prefixes group more IDs per request
+MAX_WORKERS = 8
+
+HIT_TTL = 24 * 60 * 60    # Segments get added and voted on, so refresh known videos daily
+EMPTY_TTL = 60 * 60       # Videos without segments often get them soon after upload
+
+class SegmentCache:
+    """
+    On-disk cache of raw SponsorBlock segments keyed by video ID.
+
+    All categories are stored, so one fetch serves every segment type selection.
+    Empty results are cached too, with their own (shorter) TTL.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, hit_ttl: float = HIT_TTL, empty_ttl: float = EMPTY_TTL):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.hit_ttl = hit_ttl
+        self.empty_ttl = empty_ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS segments (video_id TEXT PRIMARY KEY, segments TEXT NOT NULL, fetched_at REAL NOT NULL)")
+        self.conn.commit()
+        self.stats = {'hits': 0, 'empty_hits': 0, 'misses': 0, 'expired': 0, 'stores': 0}
+
+    def get(self, video_id: str, allow_expired: bool = False) -> Optional[List[Tuple[str, float, float]]]:
+        """
+        Look up the cached segments of a video.
+
+        Args:
+            video_id (str): The YouTube video ID.
+            allow_expired (bool): Return entries that are past their TTL.
+
+        Returns:
+            Optional[List[Tuple[str, float, float]]]: (category, start, end) tuples, or None on a miss.
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT segments, fetched_at FROM segments WHERE video_id = ?", (video_id,)).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            segments = [tuple(segment) for segment in json.loads(row[0])]
+            ttl = self.hit_ttl if segments else self.empty_ttl
+            if not allow_expired and time.time() - row[1] > ttl:
+                self.stats['expired'] += 1
+                return None
+            self.stats['hits' if segments else 'empty_hits'] += 1
+            return segments
+
+    def put(self, video_id: str, segments: List[Tuple[str, float, float]]):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO segments (video_id, segments, fetched_at) VALUES (?, ?, ?)",
+                              (video_id, json.dumps(segments), time.time()))
+            self.conn.commit()
+            self.stats['stores'] += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.lock:
+            stats = dict(self.stats)
+            stats['entries'] = self.conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        return stats
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_segment_cache() -> SegmentCache:
+    """Return the shared segment cache, opening it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SegmentCache()
+        return _cache
+
+def get_cache_stats() -> Dict[str, int]:
+    """Return hit/miss counters and the number of entries of the shared segment cache."""
+    return get_segment_cache().get_stats()
+
+def get_sponsor_segments(video_id: str, segment_types: List[str] = ['sponsor'], offline: bool = False, base_url: str = API_URL) -> List[Tuple[float, float]]:
     """
     Retrieves specified segment types for a given YouTube video ID using the SponsorBlock API.
-    
+
+    Results are served from the on-disk segment cache when it holds a fresh entry.
+
     Args:
         video_id (str): The YouTube video ID.
         segment_types (List[str]): List of segment types to include. Default is ['sponsor'].
                                    Available types: sponsor, selfpromo, interaction, intro, outro,
                                    preview, music_offtopic, filler
-    
+        offline (bool): Only serve from the cache (expired entries included), never call the API.
+        base_url (str): SponsorBlock server to query.
+
     Returns:
         List[Tuple[float, float]]: A list of tuples containing start and end times of specified segments.
     """
-    client = sb.Client()
-    try:
-        segments = client.get_skip_segments(video_id)
-        return [(segment.start, segment.end) for segment in segments if segment.category in segment_types]
-    except Exception as e:
-        print(f"Error fetching sponsor segments: {e}")
+    cache = get_segment_cache()
+    segments = cache.get(video_id, allow_expired=offline)
+    if segments is None:
+        if offline:
+            print(f"No cached sponsor segments for {video_id} (offline mode)")
+            return []
+        try:
+            segments = _fetch_video(video_id, base_url)
+        except (requests.RequestException, ValueError) as e:
+            print(f"Error fetching sponsor segments: {e}")
+            return []
+        cache.put(video_id, segments)
+    return [(start, end) for category, start, end in segments if category in segment_types]
+
+_session = None
+_session_lock = threading.Lock()
+
+def _get_session() -> requests.Session:
+    # One keep-alive connection pool shared by every lookup
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS, max_retries=2)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+def _parse_segments(segments: List[dict]) -> List[Tuple[str, float, float]]:
+    return [(segment['category'], segment['segment'][0], segment['segment'][1]) for segment in segments]
+
+def _fetch_video(video_id: str, base_url: str) -> List[Tuple[str, float, float]]:
+    response = _get_session().get(f"{base_url}/api/skipSegments",
+                                  params={'videoID': video_id, 'categories': json.dumps(ALL_SEGMENT_TYPES)}, timeout=15)
+    if response.status_code == 404:
         return []
+    response.raise_for_status()
+    return _parse_segments(response.json())
+
+def _fetch_hash_prefix(prefix: str, base_url: str) -> Dict[str, List[Tuple[str, float, float]]]:
+    response = _get_session().get(f"{base_url}/api/skipSegments/{prefix}",
+                                  params={'categories': json.dumps(ALL_SEGMENT_TYPES)}, timeout=15)
+    if response.status_code == 404:
+        return {}
+    response.raise_for_status()
+    return {
+        entry['videoID']: _parse_segments(entry.get('segments', []))
+        for entry in response.json()
+    }
+
+def get_sponsor_segments_batch(video_ids: Iterable[str], segment_types: List[str] = ['sponsor'], max_workers: int = MAX_WORKERS,
+                               base_url: str = API_URL, offline: bool = False) -> Dict[str, List[Tuple[float, float]]]:
+    """
+    Retrieves segments for many videos at once.
+
+    Cached videos are served from the segment cache. The rest are grouped by the prefix of
+    their SHA-256 hash and looked up through the hash-prefix endpoint, one request per
+    prefix, on a bounded thread pool sharing one keep-alive session.
+
+    Args:
+        video_ids (Iterable[str]): The YouTube video IDs.
+        segment_types (List[str]): List of segment types to include. Default is ['sponsor'].
+        max_workers (int): Maximum number of concurrent API requests.
+        base_url (str): SponsorBlock server to query.
+        offline (bool): Only serve from the cache (expired entries included), never call the API.
+
+    Returns:
+        Dict[str, List[Tuple[float, float]]]: Start and end times of the segments of each video.
+    """
+    video_ids = list(dict.fromkeys(video_ids))
+    cache = get_segment_cache()
+    raw = {}
+    missing = {}
+    for video_id in video_ids:
+        segments = cache.get(video_id, allow_expired=offline)
+        if segments is not None:
+            raw[video_id] = segments
+        elif not offline:
+            prefix = hashlib.sha256(video_id.encode('utf-8')).hexdigest()[:HASH_PREFIX_LENGTH]
+            missing.setdefault(prefix, []).append(video_id)
+
+    def fetch(prefix):
+        try:
+            return prefix, _fetch_hash_prefix(prefix, base_url)
+        except (requests.RequestException, ValueError) as e:
+            print(f"Error fetching sponsor segments for prefix {prefix}: {e}")
+            return prefix, None
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            for prefix, found in executor.map(fetch, missing):
+                if found is None:
+                    continue
+                for video_id in missing[prefix]:
+                    raw[video_id] = found.get(video_id, [])
+                    cache.put(video_id, raw[video_id])
+
+    return {
+        video_id: [(start, end) for category, start, end in raw.get(video_id, []) if category in segment_types]
+        for video_id in video_ids
+    }
 
 # Example usage:
-# print(get_sponsor_segments("UPrkC1LdlLY", ['sponsor', 'intro', 'outro']))
\ No newline at end of file
+# print(get_sponsor_segments("UPrkC1LdlLY", ['sponsor', 'intro', 'outro']))
@@ -0,0 +1,55 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cutseg
+from mediainfo import MediaInfo
+
+def streams(**overrides):
+    probed = {'vcodec': 'h264', 'profile': 'High', 'level': 31, 'pix_fmt': 'yuv420p', 'acodec': 'aac'}
+    probed.update(overrides)
+    return probed
+
+class SmartCutEncoderTest(unittest.TestCase):
+    def encoder(self, probed, media_info=None):
+        with mock.patch.object(cutseg, '_probe_streams', return_value=probed) as probe:
+            result = cutseg._smart_cut_encoder('video.mp4', media_info)
+        return result, probe.called
+
+    def test_h264_keeps_profile_level_and_pix_fmt(self):
+        (codec, encoder), _ = self.encoder(streams())
+        self.assertEqual(codec, 'h264')
+        self.assertEqual(encoder[encoder.index('-pix_fmt') + 1], 'yuv420p')
+        self.assertEqual(encoder[encoder.index('-profile:v') + 1], 'high')
+        self.assertEqual(encoder[encoder.index('-level') + 1], '3.1')
+
+    def test_vp9_8bit_is_supported(self):
+        (codec, encoder), _ = self.encoder(streams(vcodec='vp9', profile='Profile 0', level=-99))
+        self.assertEqual(codec, 'vp9')
+        self.assertNotIn('-level', encoder)
+
+    def test_unmatched_sources_are_refused(self):
+        for probed in (streams(pix_fmt='yuv420p10le'), streams(vcodec='vp9', pix_fmt='yuv420p10le'),
+                       streams(acodec='opus'), streams(profile='High 10'), streams(vcodec='mpeg4')):
+            with self.subTest(probed=probed):
+                self.assertIsNone(self.encoder(probed)[0])
+
+    def test_unsupported_codec_from_media_info_is_not_probed(self):
+        result, probed = self.encoder(streams(), MediaInfo('video.mp4', 10.0, 'mpeg4', 'aac'))
+        self.assertIsNone(result)
+        self.assertFalse(probed)
+
+    def test_cut_falls_back_to_full_reencode(self):
+        with mock.patch.object(cutseg, '_probe_streams', return_value=streams(pix_fmt='yuv420p10le')), \
+                mock.patch.object(cutseg, '_parallel_cut_mp4') as parallel, \
+                mock.patch.object(cutseg, '_reencode_cut_mp4', return_value=True) as reencode:
+            self.assertTrue(cutseg.cut_segments_mp4('video.mp4', 'out.mp4', [(10.0, 20.0)], mode='smart',
+                                                    media_info=MediaInfo('video.mp4', 60.0, 'h264', 'aac')))
+        parallel.assert_not_called()
+        reencode.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
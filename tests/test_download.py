@@ -0,0 +1,83 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yt_dlp
+from yt_dlp.utils import DownloadError
+
+import download
+
+PLAYLIST_URL = 'https://www.youtube.com/playlist?list=PL0123456789'
+WATCH_URL = 'https://www.youtube.com/watch?v=aaaaaaaaaaa&list=PL0123456789'
+
+ENTRIES = [
+    {'_type': 'url', 'ie_key': 'Youtube', 'id': 'aaaaaaaaaaa', 'url': 'https://www.youtube.com/watch?v=aaaaaaaaaaa'},
+    {'_type': 'url', 'ie_key': 'Youtube', 'id': 'bbbbbbbbbbb', 'url': 'https://www.youtube.com/watch?v=bbbbbbbbbbb'},
+]
+
+def fake_extract_info(results):
+    """Return an extract_info replacement that answers each URL from results and records the calls."""
+    calls = []
+
+    def extract_info(self, url, download=True, ie_key=None, extra_info=None, process=True, force_generic_extractor=False):
+        calls.append((url, ie_key, process))
+        return results[url]
+
+    return extract_info, calls
+
+def video_info(duration):
+    return {
+        'id': 'aaaaaaaaaaa', 'title': 'Video', 'extractor': 'youtube', 'extractor_key': 'Youtube',
+        'webpage_url': 'https://www.youtube.com/watch?v=aaaaaaaaaaa', 'duration': duration,
+        'formats': [{'format_id': '18', 'url': 'http://127.0.0.1:9/video.mp4', 'ext': 'mp4', 'vcodec': 'avc1', 'acodec': 'mp4a'}],
+    }
+
+class DownloadRangesTest(unittest.TestCase):
+    def download_ranges(self, keep):
+        with yt_dlp.YoutubeDL({'simulate': True, 'quiet': True}) as ydl:
+            return download._download_ranges(ydl, video_info(100), keep)['requested_downloads']
+
+    def test_range_to_the_end_is_left_open(self):
+        # The real file may run past the whole-second duration
+        requested = self.download_ranges([(30.0, 100.0)])
+        self.assertEqual(requested[0]['section_start'], 30.0)
+        self.assertIsNone(requested[0].get('section_end'))
+
+    def test_only_the_last_range_is_left_open(self):
+        requested = self.download_ranges([(0.0, 10.0), (20.0, 100.0)])
+        self.assertEqual([(section.get('section_start'), section.get('section_end')) for section in requested], [(0.0, 10.0), (20.0, None)])
+
+    def test_range_before_the_end_keeps_its_end(self):
+        requested = self.download_ranges([(0.0, 10.0), (20.0, 90.0)])
+        self.assertEqual([(section.get('section_start'), section.get('section_end')) for section in requested], [(0.0, 10.0), (20.0, 90.0)])
+
+class IterPlaylistEntriesTest(unittest.TestCase):
+    def test_follows_redirect_to_playlist(self):
+        extract_info, calls = fake_extract_info({
+            WATCH_URL: {'_type': 'url', 'ie_key': 'YoutubeTab', 'url': PLAYLIST_URL},
+            PLAYLIST_URL: {'_type': 'playlist', 'id': 'PL0123456789', 'entries': iter(ENTRIES)},
+        })
+        with mock.patch.object(yt_dlp.YoutubeDL, 'extract_info', extract_info):
+            entries = list(download.iter_playlist_entries(WATCH_URL))
+        self.assertEqual([entry['id'] for entry in entries], ['aaaaaaaaaaa', 'bbbbbbbbbbb'])
+        self.assertEqual(calls, [(WATCH_URL, None, False), (PLAYLIST_URL, 'YoutubeTab', False)])
+
+    def test_single_video_is_yielded_as_is(self):
+        video = {'id': 'aaaaaaaaaaa', 'title': 'Video', 'formats': []}
+        extract_info, calls = fake_extract_info({ENTRIES[0]['url']: video})
+        with mock.patch.object(yt_dlp.YoutubeDL, 'extract_info', extract_info):
+            self.assertEqual(list(download.iter_playlist_entries(ENTRIES[0]['url'])), [video])
+        self.assertEqual(len(calls), 1)
+
+    def test_redirect_loop_is_an_error(self):
+        extract_info, calls = fake_extract_info({WATCH_URL: {'_type': 'url_transparent', 'url': WATCH_URL}})
+        with mock.patch.object(yt_dlp.YoutubeDL, 'extract_info', extract_info):
+            with self.assertRaises(DownloadError):
+                list(download.iter_playlist_entries(WATCH_URL))
+        self.assertEqual(len(calls), download.MAX_REDIRECTS + 1)
+
+if __name__ == '__main__':
+    unittest.main()
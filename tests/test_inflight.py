@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inflight import InflightRegistry, inflight_key
+
+class InflightRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.folders = [os.path.join(self.tempdir.name, name) for name in ('videos', 'other')]
+        self.registry = InflightRegistry()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_same_folder_attaches(self):
+        job, owner = self.registry.claim(inflight_key('aaaaaaaaaaa', 'mp4', ['sponsor'], self.folders[0]))
+        # The same folder spelled differently is still the same request
+        same, same_owner = self.registry.claim(inflight_key('aaaaaaaaaaa', 'mp4', ['sponsor'], os.path.join(self.folders[0], '.')))
+        self.assertTrue(owner)
+        self.assertFalse(same_owner)
+        self.assertIs(same, job)
+
+    def test_other_folder_gets_its_own_job(self):
+        job, _ = self.registry.claim(inflight_key('aaaaaaaaaaa', 'mp4', ['sponsor'], self.folders[0]))
+        other, owner = self.registry.claim(inflight_key('aaaaaaaaaaa', 'mp4', ['sponsor'], self.folders[1]))
+        self.assertTrue(owner)
+        self.assertIsNot(other, job)
+
+    def test_find_ignores_the_folder(self):
+        job, _ = self.registry.claim(inflight_key('aaaaaaaaaaa', 'mp4', ['sponsor'], self.folders[0]))
+        self.assertIs(self.registry.find('aaaaaaaaaaa', 'mp4', ['sponsor']), job)
+        self.assertIsNone(self.registry.find('aaaaaaaaaaa', 'mp4', ['intro']))
+        self.registry.finish(job, None)
+        self.assertIsNone(self.registry.find('aaaaaaaaaaa', 'mp4', ['sponsor']))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sponser
+
+SEGMENTS = {
+    'aaaaaaaaaaa': [{'category': 'sponsor', 'segment': [10.0, 20.0]}, {'category': 'intro', 'segment': [0.0, 5.0]}],
+    'bbbbbbbbbbb': [{'category': 'outro', 'segment': [90.0, 100.0]}],
+}
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves the skipSegments endpoints of a SponsorBlock server from SEGMENTS."""
+
+    requests_seen = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.requests_seen.append(url.path)
+        if url.path == '/api/skipSegments':
+            body = SEGMENTS.get(query['videoID'][0])
+        elif url.path.startswith('/api/skipSegments/'):
+            prefix = url.path.rsplit('/', 1)[1]
+            body = [{'videoID': video_id, 'segments': segments} for video_id, segments in SEGMENTS.items()
+                    if hashlib.sha256(video_id.encode('utf-8')).hexdigest().startswith(prefix)]
+        else:
+            body = None
+        if not body:
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class SponsorSegmentsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        sponser._cache = sponser.SegmentCache(os.path.join(self.tempdir.name, 'segments.sqlite3'))
+        StandInHandler.requests_seen.clear()
+
+    def tearDown(self):
+        sponser._cache.conn.close()
+        sponser._cache = None
+        self.tempdir.cleanup()
+
+    def test_single_lookup(self):
+        segments = sponser.get_sponsor_segments('aaaaaaaaaaa', ['sponsor', 'intro'], base_url=self.base_url)
+        self.assertEqual(segments, [(10.0, 20.0), (0.0, 5.0)])
+        self.assertEqual(StandInHandler.requests_seen, ['/api/skipSegments'])
+
+        # Every category is cached, so another selection is served without a request
+        self.assertEqual(sponser.get_sponsor_segments('aaaaaaaaaaa', ['intro'], base_url=self.base_url), [(0.0, 5.0)])
+        self.assertEqual(len(StandInHandler.requests_seen), 1)
+
+    def test_single_lookup_without_segments(self):
+        self.assertEqual(sponser.get_sponsor_segments('ccccccccccc', base_url=self.base_url), [])
+        self.assertEqual(sponser.get_segment_cache().get('ccccccccccc'), [])
+
+    def test_batch_lookup(self):
+        results = sponser.get_sponsor_segments_batch(['aaaaaaaaaaa', 'bbbbbbbbbbb', 'ccccccccccc'], ['sponsor', 'outro'],
+                                                     base_url=self.base_url)
+        self.assertEqual(results, {'aaaaaaaaaaa': [(10.0, 20.0)], 'bbbbbbbbbbb': [(90.0, 100.0)], 'ccccccccccc': []})
+        self.assertTrue(all(path.startswith('/api/skipSegments/') for path in StandInHandler.requests_seen))
+
+        seen = len(StandInHandler.requests_seen)
+        self.assertEqual(sponser.get_sponsor_segments('bbbbbbbbbbb', ['outro'], base_url=self.base_url), [(90.0, 100.0)])
+        self.assertEqual(len(StandInHandler.requests_seen), seen)
+
+    def test_offline_lookup_skips_the_server(self):
+        self.assertEqual(sponser.get_sponsor_segments('aaaaaaaaaaa', offline=True, base_url=self.base_url), [])
+        self.assertEqual(sponser.get_sponsor_segments_batch(['aaaaaaaaaaa'], offline=True, base_url=self.base_url), {'aaaaaaaaaaa': []})
+        self.assertEqual(StandInHandler.requests_seen, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,267 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, child CPU time is not recorded
+    resource = None
+
+MAX_SPANS = 10000   # Finished spans kept in memory for summaries and exports
+
+# Order of the stages in summaries; stages not listed follow in the order they ran
+STAGE_ORDER = ('wait', 'segments', 'extract', 'download', 'probe', 'cut', 'finalize')
+
+_end_lock = threading.Lock()
+_current_job = contextvars.ContextVar('trace_job', default=None)
+_current_span = contextvars.ContextVar('trace_span', default=None)
+
+def _children_cpu() -> Optional[float]:
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+class Span:
+    """
+    Timing of one stage of a job.
+
+    Child CPU time is the CPU used by subprocesses (ffmpeg, ffprobe) that exited during the
+    span and not during a nested span. The operating system reports it per process, not per thread, so with several jobs
+    cutting at once a span also counts the other jobs' ffmpeg runs that ended meanwhile.
+
+    Args:
+        name (str): Stage name, e.g. 'download' or 'cut'.
+        job (Optional[str]): Job the span belongs to, from job_context().
+        parent (Optional[Span]): The enclosing span in the same thread; its own time excludes this one.
+    """
+
+    def __init__(self, name: str, job: Optional[str] = None, parent: Optional['Span'] = None):
+        self.name = name
+        self.job = job
+        self.parent = parent
+        self.children_wall = 0.0
+        self.children_cpu = 0.0
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.wall: Optional[float] = None
+        self.bytes: Optional[int] = None
+        self.media_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self._cpu_start = _children_cpu()
+        self.child_cpu: Optional[float] = None
+
+    @property
+    def self_time(self) -> Optional[float]:
+        """Wall time not spent in child spans, e.g. the download without the extraction and the cut."""
+        if self.wall is None:
+            return None
+        return max(0.0, self.wall - self.children_wall)
+
+    @property
+    def speed(self) -> Optional[float]:
+        """Media seconds processed per second of wall time, e.g. 12.0 for a cut at 12x realtime."""
+        if self.media_seconds is None or not self.wall:
+            return None
+        return self.media_seconds / self.wall
+
+    def add_bytes(self, count: int):
+        self.bytes = (self.bytes or 0) + count
+
+    def end(self):
+        """Stop the clock. Later calls do nothing."""
+        with _end_lock:
+            # Progress hooks of concurrent fragment downloads may end a span from several threads
+            if self.wall is not None:
+                return
+            self.wall = time.perf_counter() - self.started
+        cpu = _children_cpu()
+        cpu_total = cpu - self._cpu_start if cpu is not None and self._cpu_start is not None else None
+        if cpu_total is not None:
+            # Like the time, the CPU of nested spans is reported by those spans only
+            self.child_cpu = max(0.0, cpu_total - self.children_cpu)
+        if self.parent is not None:
+            self.parent.children_wall += self.wall
+            self.parent.children_cpu += cpu_total or 0.0
+        get_tracer().add(self)
+
+    def to_dict(self) -> dict:
+        return {'span': self.name, 'job': self.job, 'parent': self.parent.name if self.parent is not None else None,
+                'start': round(self.started_at, 3), 'wall': self.wall, 'self': self.self_time, 'bytes': self.bytes, 'child_cpu': self.child_cpu,
+                'media_seconds': self.media_seconds, 'speed': self.speed, 'error': self.error}
+
+    @classmethod
+    def from_dict(cls, data: dict, job: Optional[str] = None) -> 'Span':
+        """Rebuild a finished span, e.g. one sent back by a worker process, optionally under another job."""
+        span = cls(data['span'], job or data.get('job'))
+        span.started_at = data.get('start', span.started_at)
+        span.wall = data.get('wall')
+        if span.wall is not None and data.get('self') is not None:
+            span.children_wall = span.wall - data['self']
+        span.bytes = data.get('bytes')
+        span.child_cpu = data.get('child_cpu')
+        span.media_seconds = data.get('media_seconds')
+        span.error = data.get('error')
+        return span
+
+class Tracer:
+    """
+    Collects finished spans, keeps running totals per stage and optionally appends each span
+    to a JSON-lines file.
+    """
+
+    def __init__(self, max_spans: int = MAX_SPANS):
+        self.lock = threading.Lock()
+        self.spans: deque = deque(maxlen=max_spans)
+        self.totals: Dict[str, Dict[str, float]] = {}
+        self.trace_file = None
+
+    def add(self, span: Span):
+        with self.lock:
+            self.spans.append(span)
+            totals = self.totals.setdefault(span.name, {'count': 0, 'errors': 0, 'seconds': 0.0, 'bytes': 0, 'child_cpu': 0.0, 'media_seconds': 0.0})
+            totals['count'] += 1
+            totals['errors'] += 1 if span.error else 0
+            totals['seconds'] += span.self_time or 0.0
+            totals['bytes'] += span.bytes or 0
+            totals['child_cpu'] += span.child_cpu or 0.0
+            totals['media_seconds'] += span.media_seconds or 0.0
+            if self.trace_file is not None:
+                self.trace_file.write(json.dumps(span.to_dict()) + '\n')
+                self.trace_file.flush()
+
+    def set_trace_file(self, path: Optional[str]):
+        """Append every finished span to a JSON-lines file, or stop when path is None."""
+        with self.lock:
+            if self.trace_file is not None:
+                self.trace_file.close()
+            self.trace_file = open(path, 'a', encoding='utf-8') if path else None
+
+    def job_spans(self, job: str) -> List[Span]:
+        with self.lock:
+            return [span for span in self.spans if span.job == job]
+
+    def json_lines(self) -> str:
+        with self.lock:
+            spans = list(self.spans)
+        return ''.join(json.dumps(span.to_dict()) + '\n' for span in spans)
+
+    def prometheus_text(self) -> str:
+        """Totals per stage in the Prometheus text exposition format."""
+        with self.lock:
+            totals = {stage: dict(values) for stage, values in self.totals.items()}
+        metrics = [
+            ('ytdlp_stage_runs_total', 'counter', "Spans finished per stage.", 'count'),
+            ('ytdlp_stage_errors_total', 'counter', "Spans that ended with an error per stage.", 'errors'),
+            ('ytdlp_stage_seconds_total', 'counter', "Wall time spent per stage, excluding nested stages.", 'seconds'),
+            ('ytdlp_stage_bytes_total', 'counter', "Bytes moved per stage.", 'bytes'),
+            ('ytdlp_stage_child_cpu_seconds_total', 'counter', "CPU time of ffmpeg/ffprobe subprocesses per stage.", 'child_cpu'),
+            ('ytdlp_stage_media_seconds_total', 'counter', "Seconds of media processed per stage.", 'media_seconds'),
+        ]
+        lines = []
+        for name, kind, help_text, field in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for stage in sorted(totals):
+                value = totals[stage][field]
+                # Counts and bytes stay integers; %g would round them to six digits
+                lines.append(f'{name}{{stage="{stage}"}} {value if isinstance(value, int) else round(value, 6)}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str):
+        """
+        Write prometheus_text() to a file, e.g. for node_exporter's textfile collector. The text
+        goes to a temporary file first, so a scrape never reads half of it.
+        """
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(temp_path, path)
+
+_tracer = Tracer()
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer."""
+    return _tracer
+
+@contextmanager
+def job_context(job: str) -> Iterator[None]:
+    """Attribute the spans started in this thread to a job."""
+    token = _current_job.set(job)
+    try:
+        yield
+    finally:
+        _current_job.reset(token)
+
+def current_job() -> Optional[str]:
+    return _current_job.get()
+
+@contextmanager
+def span(name: str, media_seconds: Optional[float] = None) -> Iterator[Span]:
+    """
+    Time a stage. The span records the wall time, the child CPU time and, when given,
+    bytes (span.add_bytes) and media seconds for the realtime factor.
+
+    Args:
+        name (str): Stage name.
+        media_seconds (Optional[float]): Seconds of media the stage processes.
+    """
+    current = Span(name, _current_job.get(), _current_span.get())
+    current.media_seconds = media_seconds
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+def start_span(name: str) -> Span:
+    """Start a span that is ended explicitly with end(), e.g. from a callback."""
+    return Span(name, _current_job.get(), _current_span.get())
+
+def _format_bytes(count: int) -> str:
+    return f"{count / 1024 / 1024:.1f} MiB"
+
+def job_summary(job: str) -> Optional[str]:
+    """
+    One-line summary of where a job's time went, by each stage's own time, e.g.
+    'segments 0.3s, extract 1.2s, download 10.3s (45.1 MiB at 4.4 MiB/s), cut 3.2s (12.0x realtime, ffmpeg CPU 8.1s)'.
+
+    Returns:
+        Optional[str]: The summary, or None if the job recorded no spans.
+    """
+    spans = get_tracer().job_spans(job)
+    if not spans:
+        return None
+    stages: Dict[str, Span] = {}
+    for item in spans:
+        total = stages.setdefault(item.name, Span(item.name, job))
+        total.wall = (total.wall or 0.0) + (item.self_time or 0.0)
+        if item.bytes is not None:
+            total.add_bytes(item.bytes)
+        if item.child_cpu is not None:
+            total.child_cpu = (total.child_cpu or 0.0) + item.child_cpu
+        if item.media_seconds is not None:
+            total.media_seconds = (total.media_seconds or 0.0) + item.media_seconds
+    names = [name for name in STAGE_ORDER if name in stages] + [name for name in stages if name not in STAGE_ORDER]
+    parts = []
+    for name in names:
+        total = stages[name]
+        details = []
+        if total.bytes:
+            rate = f" at {_format_bytes(total.bytes / total.wall)}/s" if total.wall else ""
+            details.append(f"{_format_bytes(total.bytes)}{rate}")
+        if total.speed:
+            details.append(f"{total.speed:.1f}x realtime")
+        if total.child_cpu and total.child_cpu >= 0.05:
+            details.append(f"ffmpeg CPU {total.child_cpu:.1f}s")
+        parts.append(f"{name} {total.wall:.1f}s" + (f" ({', '.join(details)})" if details else ""))
+    return ', '.join(parts)
@@ -0,0 +1,317 @@
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, List, Optional
+from progress import ProgressEvent, ProgressThrottle
+from tracing import get_tracer, job_context
+
+# Jobs a worker can run: functions of the main module taking progress_callback and stage_gate
+JOB_KINDS = ('process_video', 'process_playlist')
+TERMINAL_EVENTS = ('result', 'error', 'cancelled')
+
+def _worker_cancelled() -> type:
+    # A DownloadCancelled, so yt-dlp re-raises it from progress hooks; defined on first use like
+    # scheduler.JobCancelled, since the GUI imports this module before yt-dlp is loaded
+    global WorkerCancelled
+    if 'WorkerCancelled' not in globals():
+        from yt_dlp.utils import DownloadCancelled
+
+        class WorkerCancelled(DownloadCancelled):
+            """Raised inside a worker process when its job has been cancelled."""
+            msg = 'The job was cancelled'
+    return WorkerCancelled
+
+def __getattr__(name):
+    if name == 'WorkerCancelled':
+        return _worker_cancelled()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class WorkerError(Exception):
+    """A job failed inside a worker process, or the process died while running it."""
+
+class _RemoteGate:
+    """
+    Stage gate of a job running in a worker process.
+
+    Entering a stage asks the parent for the slot and waits for its answer, so the network and
+    CPU limits of the scheduler hold across processes.
+    """
+
+    def __init__(self, index: int, job_id: int, events, replies, cancel):
+        self.index = index
+        self.job_id = job_id
+        self.events = events
+        self.replies = replies
+        self.cancel = cancel
+        self.lock = threading.Lock()
+
+    def enter(self, stage: str):
+        self._request('stage', stage)
+
+    def acquire(self, stage: str):
+        self._request('acquire', stage)
+
+    def release(self, stage: str):
+        self.events.put(('release', self.index, self.job_id, stage))
+
+    def _request(self, kind: str, stage: str):
+        # One request at a time: the answers share the worker's reply queue
+        self.check_cancelled()
+        with self.lock:
+            self.events.put((kind, self.index, self.job_id, stage))
+            if not self.replies.get():
+                raise _worker_cancelled()()
+
+    def leave(self):
+        # Releasing a slot cannot fail, so the worker does not wait for an answer
+        self.events.put(('leave', self.index, self.job_id, None))
+
+    def check_cancelled(self):
+        if self.cancel.is_set():
+            raise _worker_cancelled()()
+
+def _worker_main(index: int, tasks, events, replies, cancel, progress_rate: float):
+    # Runs in the worker process; the pipeline is imported once, not per job
+    import main as pipeline
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        job_id, kind, kwargs = task
+        gate = _RemoteGate(index, job_id, events, replies, cancel)
+        throttle = ProgressThrottle(lambda message, j=job_id: events.put(('progress', index, j, message)), progress_rate)
+
+        def progress_callback(message, j=job_id):
+            gate.check_cancelled()
+            if isinstance(message, ProgressEvent):
+                throttle(message)
+            else:
+                events.put(('log', index, j, message))
+
+        trace_job = f"worker-{job_id}"
+        try:
+            with job_context(trace_job):
+                result = getattr(pipeline, kind)(progress_callback=progress_callback, stage_gate=gate, **kwargs)
+            outcome = ('result', index, job_id, result)
+        except _worker_cancelled():
+            outcome = ('cancelled', index, job_id, None)
+        except Exception as e:
+            traceback.print_exc()
+            outcome = ('error', index, job_id, f"{type(e).__name__}: {e}")
+        # The job's timing spans go back to the parent, which owns the metrics
+        events.put(('trace', index, job_id, [span.to_dict() for span in get_tracer().job_spans(trace_job)]))
+        events.put(outcome)
+
+class WorkerJob:
+    """
+    Handle of a job submitted to the worker pool.
+
+    The worker's messages arrive on `events` as (kind, payload) pairs: 'progress' (a progress
+    event), 'log' (a text message), 'stage' and 'acquire' (the worker waits for reply()), 'leave'
+    and 'release' (the worker gave up a slot), 'trace' (the job's
+    finished timing spans, as dicts), and finally one of 'result', 'error' or 'cancelled'.
+    """
+
+    def __init__(self, pool: 'WorkerPool', job_id: int, kind: str, kwargs: dict, key: Optional[str] = None):
+        self.pool = pool
+        self.job_id = job_id
+        self.kind = kind
+        self.kwargs = kwargs
+        self.key = key
+        self.events: queue.Queue = queue.Queue()
+        self.worker: Optional['_Worker'] = None
+
+    def reply(self, granted: bool):
+        """Answer a 'stage' event: True once the slot is held, False to cancel the job."""
+        worker = self.worker
+        if worker is not None:
+            worker.replies.put(granted)
+
+    def cancel(self):
+        self.pool.cancel(self)
+
+    def wait_stopped(self):
+        """After cancel(), wait for the worker to let go of the job, refusing any stage it asks for."""
+        while True:
+            kind, payload = self.events.get()
+            if kind in ('stage', 'acquire'):
+                self.reply(False)
+            elif kind in TERMINAL_EVENTS:
+                return
+
+class _Worker:
+    def __init__(self, context, index: int, events, progress_rate: float):
+        self.index = index
+        self.tasks = context.Queue()
+        self.replies = context.Queue()
+        self.cancel = context.Event()
+        self.job: Optional[WorkerJob] = None
+        self.process = context.Process(target=_worker_main, args=(index, self.tasks, events, self.replies, self.cancel, progress_rate),
+                                       name=f"ytdlp-worker-{index}", daemon=True)
+        self.process.start()
+
+class WorkerPool:
+    """
+    Runs process_video and process_playlist jobs in separate worker processes.
+
+    Extraction, JSON parsing and progress hooks then run outside the GUI interpreter and do not
+    compete with the Qt event loop for the GIL. Each worker runs one job at a time; jobs with
+    the same key (e.g. the URL) do not run at once, so a repeated request finds the first one's
+    output in the archive instead of downloading it again. A worker that dies is replaced and
+    its job fails with a WorkerError.
+
+    Args:
+        size (int): Number of worker processes.
+        progress_rate (float): Maximum progress events per second each worker sends back.
+    """
+
+    def __init__(self, size: int = 2, progress_rate: float = 10.0):
+        # spawn, not fork: the parent runs Qt threads, which do not survive a fork
+        self.context = multiprocessing.get_context('spawn')
+        self.progress_rate = progress_rate
+        self.events = self.context.Queue()
+        self.lock = threading.Lock()
+        self.counter = itertools.count(1)
+        self.pending: deque = deque()
+        self.jobs: Dict[int, WorkerJob] = {}
+        self.restarts = 0
+        self.closed = False
+        self.workers: List[_Worker] = [_Worker(self.context, index, self.events, progress_rate) for index in range(max(1, size))]
+        self.reader = threading.Thread(target=self._read_events, name="ytdlp-worker-events", daemon=True)
+        self.reader.start()
+
+    def submit(self, kind: str, kwargs: dict, key: Optional[str] = None) -> WorkerJob:
+        """
+        Queue a job for the next free worker.
+
+        Args:
+            kind (str): 'process_video' or 'process_playlist'.
+            kwargs (dict): Picklable arguments of the function, without progress_callback and stage_gate.
+            key (Optional[str]): Jobs with the same key are not run at the same time.
+
+        Returns:
+            WorkerJob: Handle to follow the job.
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("The worker pool is closed")
+            job = WorkerJob(self, next(self.counter), kind, kwargs, key)
+            self.jobs[job.job_id] = job
+            self.pending.append(job)
+            self._dispatch()
+        return job
+
+    def cancel(self, job: WorkerJob):
+        with self.lock:
+            if job in self.pending:
+                self.pending.remove(job)
+                self.jobs.pop(job.job_id, None)
+                job.events.put(('cancelled', None))
+            elif job.worker is not None and job.worker.job is job:
+                job.worker.cancel.set()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {'workers': len(self.workers), 'busy': sum(1 for worker in self.workers if worker.job is not None),
+                    'pending': len(self.pending), 'restarts': self.restarts}
+
+    def close(self, timeout: float = 2.0):
+        """Stop the workers. Running jobs are cancelled; workers that do not exit in time are terminated."""
+        with self.lock:
+            self.closed = True
+            for job in self.pending:
+                job.events.put(('cancelled', None))
+            self.pending.clear()
+            for worker in self.workers:
+                worker.cancel.set()
+                worker.tasks.put(None)
+        deadline = time.monotonic() + timeout
+        for worker in self.workers:
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                worker.process.terminate()
+        with self.lock:
+            # Release anyone still waiting on a job the workers did not get to report
+            for job in self.jobs.values():
+                job.events.put(('cancelled', None))
+            self.jobs.clear()
+
+    def _dispatch(self):
+        # Called with the lock held
+        running_keys = {worker.job.key for worker in self.workers if worker.job is not None and worker.job.key is not None}
+        for worker in self.workers:
+            if worker.job is not None:
+                continue
+            job = next((job for job in self.pending if job.key is None or job.key not in running_keys), None)
+            if job is None:
+                return
+            self.pending.remove(job)
+            worker.cancel.clear()
+            worker.job = job
+            job.worker = worker
+            if job.key is not None:
+                running_keys.add(job.key)
+            worker.tasks.put((job.job_id, job.kind, job.kwargs))
+
+    def _read_events(self):
+        last_check = time.monotonic()
+        while not self.closed:
+            try:
+                kind, index, job_id, payload = self.events.get(timeout=0.5)
+            except queue.Empty:
+                kind = None
+            except (EOFError, OSError):
+                return
+            if kind is not None:
+                with self.lock:
+                    job = self.jobs.get(job_id)
+                    if kind in TERMINAL_EVENTS:
+                        self.jobs.pop(job_id, None)
+                        worker = self.workers[index]
+                        if worker.job is not None and worker.job.job_id == job_id:
+                            worker.job = None
+                        self._dispatch()
+                if job is not None:
+                    job.events.put((kind, payload))
+            if time.monotonic() - last_check >= 0.5:
+                last_check = time.monotonic()
+                self._restart_dead_workers()
+
+    def _restart_dead_workers(self):
+        with self.lock:
+            if self.closed:
+                return
+            for index, worker in enumerate(self.workers):
+                if worker.process.is_alive():
+                    continue
+                job = worker.job
+                print(f"Worker process {index} exited with code {worker.process.exitcode}; restarting it")
+                self.workers[index] = _Worker(self.context, index, self.events, self.progress_rate)
+                self.restarts += 1
+                if job is not None:
+                    self.jobs.pop(job.job_id, None)
+                    job.events.put(('error', f"Worker process exited with code {worker.process.exitcode}"))
+            self._dispatch()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_worker_pool(size: int = 2, progress_rate: float = 10.0) -> WorkerPool:
+    """Return the shared worker pool, starting it with the given size on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool(size, progress_rate)
+        return _pool
+
+def close_worker_pool():
+    """Stop the shared worker pool if it was started."""
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
@@ -0,0 +1,143 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import yt_dlp
+
+# Base options of each profile; everything job-specific is passed as an override
+PROFILES = {
+    'mp3': {
+        'format': 'bestaudio/best',
+        'postprocessors': [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': 'mp3',
+            'preferredquality': '192',
+        }],
+    },
+    'mp4': {
+        'format': 'bestvideo+bestaudio/best',
+    },
+    # Raw best audio; the caller adds its own postprocessor for the mp3 conversion
+    'audio': {
+        'format': 'bestaudio/best',
+    },
+}
+
+_MISSING = object()
+
+class _PooledYDL:
+    def __init__(self, profile: str):
+        # Imported here so the GUI can read pool stats without loading yt-dlp
+        import yt_dlp
+        self.progress_hook = None
+        started = time.perf_counter()
+        self.ydl = yt_dlp.YoutubeDL(dict(PROFILES[profile], progress_hooks=[self._dispatch_progress]))
+        self.setup_seconds = time.perf_counter() - started
+
+    def _dispatch_progress(self, d):
+        if self.progress_hook:
+            self.progress_hook(d)
+
+class YoutubeDLPool:
+    """
+    Pool of pre-initialized YoutubeDL instances keyed by option profile ('mp3', 'mp4', 'audio').
+
+    Reusing an instance skips option processing and postprocessor setup, and keeps its HTTP
+    sessions and cookies alive across jobs. An instance is only ever used by one job at a time.
+
+    Args:
+        max_idle_per_profile (int): Idle instances kept per profile; extra ones are closed.
+    """
+
+    def __init__(self, max_idle_per_profile: int = 4):
+        self.max_idle_per_profile = max_idle_per_profile
+        self.lock = threading.Lock()
+        self.idle: Dict[str, List[_PooledYDL]] = {profile: [] for profile in PROFILES}
+        self.stats = {'created': 0, 'reused': 0, 'setup_seconds': 0.0, 'saved_seconds': 0.0}
+
+    @contextmanager
+    def acquire(self, profile: str, overrides: Optional[dict] = None, progress_hook: Callable[[dict], None] = None,
+                postprocessors: Optional[List[Tuple[object, str]]] = None) -> Iterator['yt_dlp.YoutubeDL']:
+        """
+        Borrow a YoutubeDL instance for one job.
+
+        Args:
+            profile (str): Option profile, one of PROFILES.
+            overrides (Optional[dict]): Per-job options, e.g. 'outtmpl'. Restored afterwards.
+            progress_hook (Callable[[dict], None], optional): yt-dlp progress hook for this job.
+            postprocessors (Optional[List[Tuple[object, str]]]): (postprocessor, when) pairs added
+                for this job only.
+
+        Returns:
+            Iterator['yt_dlp.YoutubeDL']: Context manager yielding the instance.
+        """
+        pooled = self._checkout(profile)
+        ydl = pooled.ydl
+        saved = {}
+        for key, value in (overrides or {}).items():
+            saved[key] = ydl.params.get(key, _MISSING)
+            if key == 'outtmpl' and isinstance(value, str):
+                # YoutubeDL normalizes outtmpl into a dict when it is constructed
+                value = {'default': value}
+            ydl.params[key] = value
+        for pp, when in postprocessors or []:
+            ydl.add_post_processor(pp, when=when)
+        pooled.progress_hook = progress_hook
+        try:
+            yield ydl
+        finally:
+            pooled.progress_hook = None
+            for pp, when in postprocessors or []:
+                if pp in ydl._pps[when]:
+                    ydl._pps[when].remove(pp)
+            for key, value in saved.items():
+                if value is _MISSING:
+                    ydl.params.pop(key, None)
+                else:
+                    ydl.params[key] = value
+            self._checkin(profile, pooled)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Return instance counts, total setup time spent and the setup time saved by reuse."""
+        with self.lock:
+            return dict(self.stats)
+
+    def close(self):
+        with self.lock:
+            for instances in self.idle.values():
+                for pooled in instances:
+                    pooled.ydl.close()
+                instances.clear()
+
+    def _checkout(self, profile: str) -> _PooledYDL:
+        with self.lock:
+            if self.idle[profile]:
+                pooled = self.idle[profile].pop()
+                self.stats['reused'] += 1
+                self.stats['saved_seconds'] += pooled.setup_seconds
+                return pooled
+        pooled = _PooledYDL(profile)
+        with self.lock:
+            self.stats['created'] += 1
+            self.stats['setup_seconds'] += pooled.setup_seconds
+        return pooled
+
+    def _checkin(self, profile: str, pooled: _PooledYDL):
+        with self.lock:
+            if len(self.idle[profile]) < self.max_idle_per_profile:
+                self.idle[profile].append(pooled)
+                return
+        pooled.ydl.close()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_ydl_pool() -> YoutubeDLPool:
+    """Return the shared YoutubeDL pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = YoutubeDLPool()
+        return _pool